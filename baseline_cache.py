@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Memoized Constant-Level Baseline.
+
+The baseline every recommendation is measured against (constant FL350 at the standard
+cruise TAS and 15 °C, in still air) depends only on the aircraft type, the takeoff
+mass and the waypoint sequence, so what-if runs and repeated requests for the same
+flight can share one computation. `BaselineCache` keeps (fuel kg, minutes) results in
+an in-memory LRU tier, optionally backed by an SQLite file, keyed on exactly those
+inputs plus a format version (bump it when the baseline model changes).
+
+Configuration (environment variables):
+    BASELINE_CACHE_SIZE   Maximum in-memory entries (default: 1024).
+    BASELINE_CACHE_PATH   SQLite file for persisted entries (default: unset, memory only).
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, Counter
+from instrumentation import count
+
+BASELINE_CACHE_SIZE = int(os.getenv('BASELINE_CACHE_SIZE', '1024'))
+BASELINE_CACHE_PATH = os.getenv('BASELINE_CACHE_PATH')
+BASELINE_FORMAT_VERSION = 1
+
+class BaselineCache:
+    """Memory LRU + optional SQLite cache of baseline (fuel kg, minutes), with hit/miss counters."""
+
+    def __init__(self, path=BASELINE_CACHE_PATH, max_entries=BASELINE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.counters = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS baseline (version INTEGER, aircraft_type TEXT, mass_kg REAL, waypoints TEXT, "
+                                 "fuel_kg REAL, minutes REAL, PRIMARY KEY (version, aircraft_type, mass_kg, waypoints))")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Baseline cache disk tier disabled. Error: {e}")
+                self._db = None
+
+    @staticmethod
+    def key(aircraft_type, initial_mass_kg, waypoints):
+        return (BASELINE_FORMAT_VERSION, aircraft_type, float(initial_mass_kg), ','.join(waypoints))
+
+    def get_or_compute(self, aircraft_type, initial_mass_kg, waypoints, compute):
+        """The cached (fuel kg, minutes) for these inputs, calling `compute()` and storing its result on a miss."""
+        key = self.key(aircraft_type, initial_mass_kg, waypoints)
+        cached = self._lookup(key)
+        if cached is not None:
+            self.counters['hits'] += 1
+            count('baseline_cache.hits')
+            return cached
+        self.counters['misses'] += 1
+        count('baseline_cache.misses')
+        value = tuple(float(v) for v in compute())
+        self.put(key, value)
+        return value
+
+    def get_or_compute_many(self, aircraft_type, initial_masses_kg, waypoints, compute):
+        """
+        (fuel kg, minutes) for each takeoff mass; the missing masses go to one
+        `compute(masses)` call, which returns their fuel (array) and the shared minutes.
+        """
+        keys = [self.key(aircraft_type, mass, waypoints) for mass in initial_masses_kg]
+        values = [self._lookup(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.counters['hits'] += len(keys) - len(missing)
+        self.counters['misses'] += len(missing)
+        count('baseline_cache.hits', len(keys) - len(missing))
+        count('baseline_cache.misses', len(missing))
+        if missing:
+            fuel, minutes = compute([float(initial_masses_kg[i]) for i in missing])
+            for i, fuel_kg in zip(missing, fuel):
+                values[i] = (float(fuel_kg), float(minutes))
+                self.put(keys[i], values[i])
+        return values
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO baseline VALUES (?, ?, ?, ?, ?, ?)", (*key, *value))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not write baseline cache entry. Error: {e}")
+
+    def stats(self):
+        """Counter snapshot plus the overall hit rate."""
+        counts = dict(self.counters)
+        lookups = counts.get('hits', 0) + counts.get('misses', 0)
+        counts['hit_rate'] = round(counts.get('hits', 0) / lookups, 4) if lookups else 0.0
+        return counts
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT fuel_kg, minutes FROM baseline WHERE version=? AND aircraft_type=? AND mass_kg=? AND waypoints=?", key).fetchone()
+            if row is None:
+                return None
+            self.counters['disk_hits'] += 1
+            self._remember(key, tuple(row))
+            return tuple(row)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Optimization Runner.
+
+Optimizes every plan in a plan file without the agent, for nightly planning runs:
+plans are streamed in chunks, weather for each chunk's waypoints is prefetched
+once in the parent process (through the shared weather cache) and shipped with
+the chunk, and chunks are optimized on a `ProcessPoolExecutor` sized to the cores.
+Workers are spawned rather than forked: the parent keeps prefetching (HTTP client
+threads, cache locks, SQLite handles) while the pool grows, and a fork taken mid-call
+would copy those locks held.
+Results are appended to the output as chunks finish, so the output doubles as
+the checkpoint: re-running with the same output skips flights already optimized
+successfully and retries those that failed. A retried flight's new record is
+appended after its error record, so the last record per flight_id is current.
+
+Output formats (chosen by extension):
+    .jsonl     One JSON object per line; a partially written last line is dropped on resume.
+    .parquet   A directory of part files, one per chunk; requires `pyarrow`.
+
+An engine is any importable module exposing `prefetch_weather(flight_plans)`,
+returning {waypoint: weather}, and `optimize_plan(flight_plan, weather_data)`,
+returning a result dict; `lambda_handler` and `notebook_style_runner` both do.
+"""
+import os
+import sys
+import json
+import time
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+DEFAULT_CHUNK_SIZE = 32
+
+def _succeeded(record):
+    return record.get('status') == 'success'
+
+class JsonlResultWriter:
+    """Appends result records to a JSONL file, fsyncing after each chunk."""
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self.done = self._recover()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self):
+        if not os.path.exists(self.path):
+            return set()
+        done, good_bytes = set(), 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Torn write from a crash; truncated below.
+                try:
+                    record = json.loads(line)
+                    flight_id = record['flight_id']
+                except (ValueError, KeyError, TypeError):
+                    break
+                if _succeeded(record):
+                    done.add(flight_id)
+                good_bytes += len(line)
+        if good_bytes != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return done
+
+    def write(self, records):
+        self._file.write(''.join(json.dumps(record) + '\n' for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.update(record['flight_id'] for record in records if _succeeded(record))
+
+    def close(self):
+        self._file.close()
+
+class ParquetResultWriter:
+    """Writes each chunk as an atomically renamed part file in a `.parquet` directory."""
+
+    NESTED_FIELDS = ('optimized_route', 'search_stats', 'pareto_front', 'what_if')
+
+    def __init__(self, path, resume=True):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires `pyarrow`; use a .jsonl output instead.") from e
+        self.pq, self.path = pq, path
+        if not resume and os.path.isdir(path):
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+        os.makedirs(path, exist_ok=True)
+        self.parts = sorted(name for name in os.listdir(path) if name.endswith('.parquet'))
+        self.done = set()
+        for name in self.parts:
+            table = pq.read_table(os.path.join(path, name), columns=['flight_id', 'status']).to_pydict()
+            self.done.update(flight_id for flight_id, status in zip(table['flight_id'], table['status']) if status == 'success')
+
+    def write(self, records):
+        import pyarrow as pa
+        rows = [{key: json.dumps(value) if key in self.NESTED_FIELDS else value for key, value in record.items()} for record in records]
+        name = f"part-{len(self.parts):05d}.parquet"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        self.pq.write_table(pa.Table.from_pylist(rows), tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        self.parts.append(name)
+        self.done.update(record['flight_id'] for record in records if _succeeded(record))
+
+    def close(self):
+        pass
+
+def open_result_writer(path, resume=True):
+    if path.endswith('.parquet'):
+        return ParquetResultWriter(path, resume)
+    return JsonlResultWriter(path, resume)
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _init_worker(quiet):
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+
+def optimize_chunk(engine_name, flight_plans, weather_data):
+    """Worker entry point: optimizes a chunk of plans with the engine module's `optimize_plan`."""
+    engine = importlib.import_module(engine_name)
+    records = []
+    for plan in flight_plans:
+        start = time.perf_counter()
+        try:
+            result = engine.optimize_plan(plan, {wp: weather_data[wp] for wp in plan['waypoints'] if wp in weather_data})
+        except Exception as e:
+            result = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+        records.append({"flight_id": plan['flight_id'], **result, "elapsed_s": round(time.perf_counter() - start, 4)})
+    return records
+
+def run_batch(engine_name, flight_plans, output_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, resume=True, quiet=True):
+    """
+    Optimizes `flight_plans` (any iterable, consumed lazily) with the named engine and
+    appends results to `output_path`. Returns counts of written, skipped and failed plans;
+    plans that failed in an earlier run on the same output are tried again.
+    """
+    engine = importlib.import_module(engine_name)
+    writer = open_result_writer(output_path, resume)
+    workers = workers or os.cpu_count() or 1
+    pending_plans = (dict(plan, waypoints=list(plan['waypoints'])) for plan in flight_plans if plan['flight_id'] not in writer.done)
+    counts = {'written': 0, 'failed': 0, 'skipped': len(writer.done)}
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(quiet,)) as pool:
+            in_flight = set()
+            for chunk in _chunks(pending_plans, chunk_size):
+                weather_data = engine.prefetch_weather(chunk)
+                in_flight.add(pool.submit(optimize_chunk, engine_name, chunk, weather_data))
+                if len(in_flight) >= 2 * workers:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _write_finished(writer, finished, counts)
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _write_finished(writer, finished, counts)
+    finally:
+        writer.close()
+    counts['elapsed_s'] = round(time.perf_counter() - start, 2)
+    return counts
+
+def _write_finished(writer, futures, counts):
+    for future in futures:
+        records = future.result()
+        writer.write(records)
+        counts['written'] += len(records)
+        counts['failed'] += sum(1 for record in records if record.get('status') != 'success')
+    print(f"Batch progress: {counts['written']} written, {counts['failed']} failed, {counts['skipped']} skipped (already succeeded).", file=sys.__stdout__)
+
+def add_batch_arguments(parser):
+    """Adds the shared `batch` subcommand options to an argparse parser."""
+    parser.add_argument("--plans", default=None, help="Plan file to optimize (default: the script's flight plans).")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Output path ending in .jsonl or .parquet.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Plans per worker task.")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming from it.")
+    parser.add_argument("--verbose", action="store_true", help="Keep worker output (tool logs) on stdout.")
+
+def run_batch_from_args(engine_name, flight_plans, args):
+    counts = run_batch(engine_name, flight_plans, args.output, args.workers, args.chunk_size,
+                       resume=not args.no_resume, quiet=not args.verbose)
+    print(f"--- Batch Complete: {counts} ---")
+    return counts
+
+def with_default_subcommand(argv, subcommands, default):
+    """Lets `script.py UA123` keep working alongside `script.py batch ...`."""
+    if argv and argv[0] not in subcommands and argv[0] not in ('-h', '--help'):
+        return [default] + list(argv)
+    return list(argv)
+
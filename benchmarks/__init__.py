@@ -0,0 +1 @@
+"""Performance benchmarks for the fuel optimizer. Run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: the constant-FL350 baseline, segment by segment vs. vectorized vs. cached.
+
+Compares the previous baseline loop (one fuel-flow call per segment, each at the mass
+left after the previous one) with `compute_baseline_profile` (all segments per call,
+masses refined from the cumulative burn) and with a warm `baseline_profile` (a cache
+hit), on synthetic great-circle routes. The fuel columns should agree to well under
+a kilogram.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_baseline [--lengths 4 50 200 500] [--aircraft B772 --mass 200000]
+"""
+import argparse
+import time
+import lambda_handler as lh
+from benchmarks.synthetic import great_circle_route
+
+def segment_loop_baseline(aircraft_type, initial_mass_kg, waypoints):
+    """The previous baseline: one scalar fuel-flow evaluation per segment."""
+    mass, fuel = initial_mass_kg, 0.0
+    for distance_km in lh.segment_distances_km(waypoints).tolist():
+        burned = lh.calculate_fuel_burn(aircraft_type, mass, 35000, distance_km, lh.CRUISE_TAS_KTS, 15)
+        fuel += burned; mass -= burned
+    return fuel
+
+def timed(function, *args, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return 1000 * (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the segment-loop, vectorized and cached baseline.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[4, 50, 200, 500], help="Route lengths in waypoints.")
+    parser.add_argument("--aircraft", default="B772", help="Aircraft type.")
+    parser.add_argument("--mass", type=float, default=200000, help="Takeoff mass in kg.")
+    args = parser.parse_args()
+    print(f"{'wps':>4} {'loop_ms':>9} {'vector_ms':>10} {'cached_ms':>10} {'loop_kg':>10} {'vector_kg':>10} {'diff_kg':>8}")
+    for seed, n in enumerate(args.lengths):
+        waypoints = great_circle_route(n, 'KJFK', 'RJTT', lh.WAYPOINT_COORDINATES, seed=seed, prefix="BASE")
+        plan = {'aircraft_type': args.aircraft, 'initial_mass_kg': args.mass, 'waypoints': waypoints}
+        segment_loop_baseline(args.aircraft, args.mass, waypoints)  # Warm the fuel table and geometry.
+        loop_ms, loop_kg = timed(segment_loop_baseline, args.aircraft, args.mass, waypoints)
+        vector_ms, (vector_kg, _) = timed(lh.compute_baseline_profile, args.aircraft, args.mass, waypoints)
+        lh.baseline_profile(plan)
+        cached_ms, _ = timed(lh.baseline_profile, plan, repeat=100)
+        print(f"{n:>4} {loop_ms:>9.3f} {vector_ms:>10.3f} {cached_ms:>10.4f} {loop_kg:>10.2f} {vector_kg:>10.2f} {vector_kg - loop_kg:>8.4f}")
+    print(f"cache: {lh.BASELINE_CACHE.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark: A* expansion step, scalar vs. batched segment costs.
+
+Reports expansions per second for the scalar `calculate_fuel_burn` loop and for
+the batched `segment_fuel_burns`. Their agreement is checked by
+tests/test_segment_costs.py.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_expansion [--repeat 2000]
+"""
+import argparse
+import time
+import numpy as np
+import lambda_handler as lh
+
+SAMPLE_PLANS = [
+    ('B772', 150000, ['KJFK', 'KORD', 'KSFO']),
+    ('A359', 200000, ['KATL', 'KSEA', 'PANC', 'RJTT']),
+    ('A388', 175000, ['YSSY', 'NFFN', 'KLAX', 'KDFW']),
+]
+WEATHER = {'KSFO': {'temperature_c': 18, 'wind_speed_kts': 12}, 'PANC': {'temperature_c': -5, 'wind_speed_kts': 30}}
+
+def expand_scalar(aircraft_type, mass_kg, from_wp, to_wp, weather_data):
+    """The pre-batching expansion loop: one fuel-burn call per candidate flight level."""
+    burns = []
+    for next_fl in lh.FLIGHT_LEVELS:
+        lat1, lon1 = lh.WAYPOINT_COORDINATES[from_wp]
+        lat2, lon2 = lh.WAYPOINT_COORDINATES[to_wp]
+        distance_km = lh.haversine(lat1, lon1, lat2, lon2)
+        weather = weather_data.get(to_wp, {})
+        temp_c, wind_speed_kts = weather.get('temperature_c', 15), weather.get('wind_speed_kts', 0)
+        burns.append(lh.calculate_fuel_burn(aircraft_type, mass_kg, next_fl * 100, distance_km, 450, temp_c, 450 + wind_speed_kts))
+    return np.array(burns)
+
+def expansions_per_second(expand, repeat):
+    aircraft_type, mass_kg, waypoints = SAMPLE_PLANS[0]
+    expand(aircraft_type, mass_kg, waypoints[0], waypoints[1], WEATHER)  # Warm the fuel table.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expand(aircraft_type, mass_kg, waypoints[0], waypoints[1], WEATHER)
+    return repeat / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the A* expansion step.")
+    parser.add_argument("--repeat", type=int, default=2000, help="Expansions to time per implementation.")
+    args = parser.parse_args()
+    before = expansions_per_second(expand_scalar, args.repeat)
+    after = expansions_per_second(lh.segment_fuel_burns, args.repeat)
+    print(f"scalar loop : {before:12,.0f} expansions/s")
+    print(f"batched     : {after:12,.0f} expansions/s  ({after / before:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: FlightPlanStore load time and lookup latency on a large plan file.
+
+Writes a synthetic tab-separated plan file with `--rows` plans, then reports the
+one-off load time and the mean latency of id and secondary-index lookups.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_flight_plans [--rows 100000]
+"""
+import os
+import random
+import argparse
+import tempfile
+import time
+from flight_plan_store import FlightPlanStore
+
+AIRPORTS = ['KJFK', 'KORD', 'KSFO', 'KLAX', 'EGLL', 'EDDF', 'RJTT', 'YSSY', 'OMDB', 'WSSS']
+AIRCRAFT = ['B772', 'B789', 'A359', 'A388', 'B744', 'B77W']
+
+def write_plan_file(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write("flight_id\torigin_airport\tdestination_airport\twaypoints\tinitial_mass_kg\taircraft_type\n")
+        for i in range(rows):
+            route = rng.sample(AIRPORTS, rng.randint(3, 6))
+            f.write(f"FL{i:06d}\t{route[0]}\t{route[-1]}\t[{', '.join(route)}]\t{rng.randint(150, 250) * 1000}\t{rng.choice(AIRCRAFT)}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark flight plan store loading and lookups.")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of synthetic plans.")
+    parser.add_argument("--lookups", type=int, default=100000, help="Number of id lookups to time.")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'plans.tsv')
+        write_plan_file(path, args.rows)
+        store = FlightPlanStore(path)
+        start = time.perf_counter()
+        print(f"loaded {len(store):,} plans in {time.perf_counter() - start:.2f} s")
+        ids = [f"FL{random.randrange(args.rows):06d}" for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for flight_id in ids:
+            store.get(flight_id)
+        print(f"get(flight_id)       : {(time.perf_counter() - start) / args.lookups * 1e6:8.2f} us/lookup")
+        start = time.perf_counter()
+        matches = store.find(origin_airport='KJFK', aircraft_type='A359')
+        print(f"find(origin, type)   : {(time.perf_counter() - start) * 1e3:8.2f} ms ({len(matches):,} plans)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: SQS batch handler throughput with an in-memory queue and fixture weather.
+
+Feeds synthetic 10-record events (including a repeated flight_id and an unknown
+one) to `lambda_handler.handler`, checks that only the unknown flight's message is
+reported in `batchItemFailures` and that each flight is published once, then
+reports events per second. No AWS or network access is needed.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_handler [--events 20] [--workers 4]
+"""
+import os
+import argparse
+import time
+
+for var, value in (('AWS_ACCESS_KEY_ID', 'local'), ('AWS_SECRET_ACCESS_KEY', 'local'),
+                   ('AWS_DEFAULT_REGION', 'us-east-1'), ('SQS_OUTPUT_QUEUE_URL', 'local://recommendations')):
+    os.environ.setdefault(var, value)
+
+import lambda_handler as lh
+from sqs_publisher import BatchPublisher
+from weather_providers import FixtureWeatherProvider
+from benchmarks.local_sqs import InMemorySQS, synthetic_sqs_event
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQS batch handler locally.")
+    parser.add_argument("--events", type=int, default=20, help="Number of 10-record events to process.")
+    parser.add_argument("--workers", type=int, default=lh.HANDLER_MAX_WORKERS, help="Handler worker pool size.")
+    args = parser.parse_args()
+    sqs = InMemorySQS()
+    lh.RECOMMENDATION_PUBLISHER = BatchPublisher(os.environ['SQS_OUTPUT_QUEUE_URL'], client=sqs)
+    lh.WEATHER_PROVIDER = FixtureWeatherProvider({})
+    lh.HANDLER_MAX_WORKERS = args.workers
+    flight_ids = lh.FLIGHT_PLAN_STORE.flight_ids()[:8]
+    event = synthetic_sqs_event(flight_ids + [flight_ids[0], 'UNKNOWN'])
+
+    start = time.perf_counter()
+    for _ in range(args.events):
+        response = lh.handler(event, None)
+    elapsed = time.perf_counter() - start
+
+    failed = [item['itemIdentifier'] for item in response['batchItemFailures']]
+    assert failed == [event['Records'][-1]['messageId']], failed
+    published = [body['flight_id'] for body in sqs.bodies(os.environ['SQS_OUTPUT_QUEUE_URL'])]
+    assert sorted(published) == sorted(flight_ids * args.events), "each flight must be published once per event"
+    print(f"{args.events} events x {len(event['Records'])} records in {elapsed:.2f} s "
+          f"({args.events / elapsed:.1f} events/s, {len(published)} recommendations published)")
+    print(f"publisher: {lh.RECOMMENDATION_PUBLISHER.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: mass-bucketed A* states vs. the previous (waypoint, flight level) search.
+
+Runs three searches on QF202 and DL789 and on densified versions of the same
+long-haul city pairs (synthetic routes with more waypoints):
+
+    legacy      (waypoint, level) states with one mass per key (the previous behavior)
+    buckets     (waypoint index, level, mass bucket) states without dominance pruning
+    dominance   mass-bucket states with dominance pruning (the default)
+
+and reports states expanded/pushed, the most states kept at one (waypoint, level),
+wall time and fuel. Every search is repeated on the same weather-free inputs, with
+free level changes as in the legacy search.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_mass_states [--lengths 4 50 100 200] [--bucket-kg 250]
+"""
+import json
+import heapq
+import argparse
+import time
+import lambda_handler as lh
+from benchmarks.synthetic import great_circle_route
+
+def legacy_a_star_search(flight_plan, weather_data, stats=None):
+    """The previous search: states keyed on (waypoint, level), mass merged per key."""
+    heuristic = lh.build_heuristic(flight_plan, weather_data)
+    segment_km = lh.segment_distances_km(flight_plan['waypoints']).tolist()
+    nodes_expanded, nodes_pushed = 0, 1
+    start_node = (flight_plan['waypoints'][0], lh.FLIGHT_LEVELS[3])
+    open_set, came_from = [(0, start_node)], {}
+    g_score = {start_node: 0}
+    mass_at_node = {start_node: flight_plan['initial_mass_kg']}
+    while open_set:
+        _, (current_wp, current_fl) = heapq.heappop(open_set)
+        current_mass = mass_at_node[(current_wp, current_fl)]
+        if current_wp == flight_plan['destination_airport']:
+            stats.update(nodes_expanded=nodes_expanded, nodes_pushed=nodes_pushed, max_states_per_node=1)
+            return True, g_score[(current_wp, current_fl)]
+        idx = flight_plan['waypoints'].index(current_wp)
+        nodes_expanded += 1
+        next_wp = flight_plan['waypoints'][idx + 1]
+        burns = lh.segment_fuel_burns(flight_plan['aircraft_type'], current_mass, current_wp, next_wp, weather_data, segment_km[idx])
+        for next_fl, fuel_burned in zip(lh.FLIGHT_LEVELS, burns.tolist()):
+            tentative = g_score[(current_wp, current_fl)] + fuel_burned
+            if tentative < g_score.get((next_wp, next_fl), float('inf')):
+                came_from[(next_wp, next_fl)], g_score[(next_wp, next_fl)] = (current_wp, current_fl), tentative
+                mass_at_node[(next_wp, next_fl)] = current_mass - fuel_burned
+                heapq.heappush(open_set, (tentative + heuristic[idx + 1], (next_wp, next_fl)))
+                nodes_pushed += 1
+    return None, float('inf')
+
+def run(search, flight_plan, **kwargs):
+    stats = {}
+    start = time.perf_counter()
+    _, fuel = search(flight_plan, {}, stats=stats, **kwargs)
+    return time.perf_counter() - start, fuel, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare mass-bucketed A* states against the previous search.")
+    parser.add_argument("--flights", nargs="+", default=["QF202", "DL789"], help="Flight IDs from flight_plans.csv.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[4, 50, 100, 200], help="Route lengths (4 = the plan as filed).")
+    parser.add_argument("--bucket-kg", type=float, default=lh.MASS_BUCKET_KG, help="Mass bucket width in kg.")
+    args = parser.parse_args()
+    searches = {
+        'legacy': (legacy_a_star_search, {}),
+        'buckets': (lh.a_star_search, {'mass_bucket_kg': args.bucket_kg, 'dominance': False, 'step_climbs': False}),
+        'dominance': (lh.a_star_search, {'mass_bucket_kg': args.bucket_kg, 'dominance': True, 'step_climbs': False}),
+    }
+    print(f"{'flight':>8} {'wps':>4} {'search':>10} {'expanded':>9} {'pushed':>8} {'max/node':>8} {'time_s':>8} {'fuel_kg':>10}")
+    for flight_id in args.flights:
+        plan = json.loads(lh.get_flight_plan(flight_id))
+        for seed, n in enumerate(args.lengths):
+            route = dict(plan)
+            if n != len(plan['waypoints']):
+                route["waypoints"] = great_circle_route(n, plan['origin_airport'], plan['destination_airport'], lh.WAYPOINT_COORDINATES, seed=seed, prefix=flight_id)
+            lh.dp_search(route, {})  # Warm the fuel table and geometry outside the timed region.
+            for name, (search, kwargs) in searches.items():
+                elapsed, fuel, stats = run(search, route, **kwargs)
+                print(f"{flight_id:>8} {len(route['waypoints']):>4} {name:>10} {stats.get('nodes_expanded', 0):>9} "
+                      f"{stats.get('nodes_pushed', 0):>8} {stats.get('max_states_per_node', 0):>8} {elapsed:>8.3f} {fuel:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: peak memory (tracemalloc) of the notebook optimizer on long routes.
+
+Compares the previous notebook A*, where every heap entry carried a copy of its
+whole path, with the shared node-pool search in optimizer.py, on synthetic
+great-circle routes of 100+ waypoints. Reports peak traced memory, wall time,
+nodes pushed and fuel; the fuel columns should agree (level changes are free in both,
+as they were in the previous search). `--no-heuristic` runs both
+searches with a zero heuristic (Dijkstra order), where many partial paths are live
+at once and path copying grows quadratically. Exits with status 1 if the node pool
+ever peaks at or above the path-copying search, so a regression cannot go unnoticed.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_memory [--lengths 100 200 400] [--origin KJFK --destination EGLL]
+"""
+import sys
+import heapq
+import argparse
+import time
+import functools
+import tracemalloc
+import notebook_style_runner as nb
+from benchmarks.synthetic import great_circle_route
+
+def path_copying_a_star_search(waypoints, aircraft_type, initial_mass_kg, weather_data, stats=None):
+    """The previous notebook search: each push stores `path + [...]` in the heap entry."""
+    heuristic = nb.build_heuristic(waypoints, aircraft_type, initial_mass_kg)
+    segment_nm = nb.segment_distances_nm(waypoints)
+    nodes_pushed = 1
+    open_set = [(0, (waypoints[0], 35000, 0, initial_mass_kg, [('start', 35000, 0, initial_mass_kg)]))]
+    g_scores = {(waypoints[0], 35000): 0}
+    while open_set:
+        _, (current_waypoint, current_alt, wp_idx, current_mass, path) = heapq.heappop(open_set)
+        if wp_idx == len(waypoints) - 1:
+            stats.update(nodes_pushed=nodes_pushed)
+            return path, g_scores[(current_waypoint, current_alt)]
+        for alt_change in (-2000, 0, 2000):
+            next_alt = current_alt + alt_change
+            if not (29000 <= next_alt <= 41000):
+                continue
+            next_waypoint = waypoints[wp_idx + 1]
+            fuel_burn = nb.calculate_fuel_burn(aircraft_type, current_mass, next_alt, segment_nm[wp_idx], weather_data.get(next_waypoint, {}).get(next_alt, 0))
+            new_g = g_scores[(current_waypoint, current_alt)] + fuel_burn
+            if new_g < g_scores.get((next_waypoint, next_alt), float('inf')):
+                g_scores[(next_waypoint, next_alt)] = new_g
+                next_mass = current_mass - fuel_burn
+                new_path = path + [(next_waypoint, next_alt, round(fuel_burn, 2), round(next_mass, 2))]
+                heapq.heappush(open_set, (new_g + heuristic[wp_idx + 1], (next_waypoint, next_alt, wp_idx + 1, next_mass, new_path)))
+                nodes_pushed += 1
+    return None, float('inf')
+
+def measure(search, waypoints, aircraft_type, mass):
+    stats = {}
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, fuel = search(waypoints, aircraft_type, mass, {}, stats=stats)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, stats.get('nodes_pushed', 0), fuel
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of path-copying vs. node-pool A* on long routes.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 200, 400], help="Route lengths in waypoints.")
+    parser.add_argument("--origin", default="KJFK", help="Origin airport (AIRPORT_COORDS).")
+    parser.add_argument("--destination", default="EGLL", help="Destination airport (AIRPORT_COORDS).")
+    parser.add_argument("--aircraft", default="B772", help="Aircraft type.")
+    parser.add_argument("--mass", type=float, default=150000, help="Initial mass in kg.")
+    parser.add_argument("--no-heuristic", action="store_true", help="Use a zero heuristic for both searches.")
+    args = parser.parse_args()
+    if args.no_heuristic:
+        nb.build_heuristic = lambda waypoints, *_: [0.0] * len(waypoints)
+    searches = {'path-copy': path_copying_a_star_search, 'node-pool': functools.partial(nb.a_star_search, step_climbs=False)}
+    print(f"{'waypoints':>9} {'search':>10} {'peak_kib':>10} {'time_s':>8} {'pushed':>8} {'fuel_kg':>10}")
+    regressions = []
+    for seed, n in enumerate(args.lengths):
+        waypoints = great_circle_route(n, args.origin, args.destination, nb.AIRPORT_COORDS, seed=seed, prefix="MEM")
+        nb.a_star_search(waypoints, args.aircraft, args.mass, {})  # Warm the fuel table and geometry.
+        peaks = {}
+        for name, search in searches.items():
+            peak, elapsed, pushed, fuel = measure(search, waypoints, args.aircraft, args.mass)
+            peaks[name] = peak
+            print(f"{n:>9} {name:>10} {peak / 1024:>10.1f} {elapsed:>8.3f} {pushed:>8} {fuel:>10.1f}")
+        if peaks['node-pool'] >= peaks['path-copy']:
+            regressions.append(n)
+    if regressions:
+        print(f"REGRESSION: the node pool peaks at or above path copying at {regressions} waypoints.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: A* vs. stage-wise dynamic programming on long synthetic routes.
+
+Both optimizers are run on the same synthetic KATL -> RJTT routes of increasing
+length (densified along the great circle, so every length stays within the fuel on
+board); the table reports wall time per search and the fuel found by each.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_optimizers [--lengths 50 100 250 500]
+"""
+import argparse
+import time
+import lambda_handler as lh
+from benchmarks.synthetic import great_circle_route
+
+def time_search(search, flight_plan, weather_data):
+    start = time.perf_counter()
+    _, fuel = search(flight_plan, weather_data)
+    return time.perf_counter() - start, fuel
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the A* and DP optimizers on long routes.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[50, 100, 250, 500], help="Route lengths in waypoints.")
+    parser.add_argument("--aircraft", default="A359", help="Aircraft type to optimize.")
+    args = parser.parse_args()
+    print(f"{'waypoints':>9} {'astar_s':>9} {'dp_s':>9} {'speedup':>8} {'astar_kg':>10} {'dp_kg':>10}")
+    for seed, n in enumerate(args.lengths):
+        waypoints = great_circle_route(n, 'KATL', 'RJTT', lh.WAYPOINT_COORDINATES, seed=seed)
+        flight_plan = {'flight_id': f'SYN{n}', 'origin_airport': 'KATL', 'destination_airport': 'RJTT',
+                       'waypoints': waypoints, 'initial_mass_kg': 200000, 'aircraft_type': args.aircraft}
+        lh.dp_search(flight_plan, {})  # Warm the fuel table outside the timed region.
+        astar_s, astar_kg = time_search(lh.a_star_search, flight_plan, {})
+        dp_s, dp_kg = time_search(lh.dp_search, flight_plan, {})
+        print(f"{n:>9} {astar_s:>9.3f} {dp_s:>9.3f} {astar_s / dp_s:>7.1f}x {astar_kg:>10.0f} {dp_kg:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: one Pareto sweep vs. rerunning the cost-index A* search.
+
+For each flight, computes the fuel/time front with `pareto_front_search` once,
+then reruns `a_star_search` at a range of cost indexes, and reports both wall
+times. For every cost index it also prints the gap between the A* optimum of
+fuel + CI x minutes and the best front point under the same index; the gap
+should stay within the front's epsilon (a small positive gap means thinning
+dropped the exact optimum, a negative one that A* beat the front).
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_pareto [--flights UA123 QF202] [--cost-indexes 0 10 25 50 100]
+"""
+import json
+import argparse
+import time
+import lambda_handler as lh
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a single Pareto sweep against per-cost-index A* reruns.")
+    parser.add_argument("--flights", nargs="+", default=["UA123", "QF202", "DL789"], help="Flight IDs from flight_plans.csv.")
+    parser.add_argument("--cost-indexes", type=float, nargs="+", default=[0, 10, 25, 50, 100], help="Cost indexes in kg/min.")
+    args = parser.parse_args()
+    for flight_id in args.flights:
+        plan = json.loads(lh.get_flight_plan(flight_id))
+        lh.dp_search(plan, {})  # Warm the fuel and transition tables outside the timed region.
+        start = time.perf_counter()
+        front = lh.pareto_front_search(plan, {}, max_points=None)
+        sweep_s = time.perf_counter() - start
+        print(f"{flight_id}: {len(front['fuel_kg'])} front points in {sweep_s:.3f}s")
+        print(f"{'cost_index':>10} {'astar_s':>8} {'fuel_kg':>9} {'time_min':>9} {'gap':>8}")
+        reruns_s = 0.0
+        for cost_index in args.cost_indexes:
+            start = time.perf_counter()
+            path, fuel = lh.a_star_search(plan, {}, cost_index=cost_index, step_climbs=False)
+            elapsed = time.perf_counter() - start
+            reruns_s += elapsed
+            minutes = lh.route_minutes(plan, {}, path)
+            best_on_front = min(f + cost_index * t for f, t in zip(front['fuel_kg'], front['time_min']))
+            print(f"{cost_index:>10.1f} {elapsed:>8.3f} {fuel:>9.0f} {minutes:>9.1f} {best_on_front - (fuel + cost_index * minutes):>8.1f}")
+        print(f"  sweep {sweep_s:.3f}s vs {len(args.cost_indexes)} reruns {reruns_s:.3f}s\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Lambda cold-start cost of `lambda_handler`.
+
+Runs `python -X importtime -c "import lambda_handler"` in a fresh interpreter and
+reports the module's cumulative import time and its most expensive imports. It then
+starts another fresh interpreter that imports the module, handles one SQS event
+(direct workflow, in-memory queue, fixture weather) and a second, warm one, and
+reports the time to the first handled event. Fails (exit code 1) if a dependency
+that should load lazily (strands, boto3, requests, ...) is imported by the module
+itself, or if a `--max-*-ms` budget is exceeded, so regressions are caught.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_startup [--flight UA123] [--max-import-ms 300] [--max-first-event-ms 3000]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import time
+
+MODULE = "lambda_handler"
+DEFERRED_MODULES = ("strands", "boto3", "botocore", "requests", "dotenv", "pandas", "openap", "batch_runner")
+# Lambda sets AWS_LAMBDA_FUNCTION_NAME; with it the module skips .env loading, as in production.
+LAMBDA_ENV = {**os.environ, 'AWS_LAMBDA_FUNCTION_NAME': os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'bench_startup')}
+
+def import_times(module=MODULE):
+    """
+    `module`'s cumulative import time (ms) from -X importtime, and [(cumulative ms, name)]
+    of its direct imports. The report lists each module after everything it imported.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True, env=LAMBDA_ENV)
+    rows = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            _, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((len(name) - len(name.lstrip()), int(cumulative_us) / 1000, name.strip()))
+    end = next(i for i, (_, _, name) in enumerate(rows) if name == module)
+    depth, total_ms, _ = rows[end]
+    start = end
+    while start > 0 and rows[start - 1][0] > depth:
+        start -= 1
+    return total_ms, [(ms, name) for d, ms, name in rows[start:end] if d == depth + 2]
+
+def first_event(flight_id):
+    """Runs in the child interpreter: times the import and the first and second handled events."""
+    start = time.perf_counter()
+    for var, value in (('AWS_ACCESS_KEY_ID', 'local'), ('AWS_SECRET_ACCESS_KEY', 'local'),
+                       ('AWS_DEFAULT_REGION', 'us-east-1'), ('SQS_OUTPUT_QUEUE_URL', 'local://recommendations')):
+        os.environ.setdefault(var, value)
+    import lambda_handler as lh
+    imported = time.perf_counter()
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    from sqs_publisher import BatchPublisher
+    from weather_providers import FixtureWeatherProvider
+    from benchmarks.local_sqs import InMemorySQS, synthetic_sqs_event
+    lh.RECOMMENDATION_PUBLISHER = BatchPublisher(os.environ['SQS_OUTPUT_QUEUE_URL'], client=InMemorySQS())
+    lh.WEATHER_PROVIDER = FixtureWeatherProvider({})
+    event = synthetic_sqs_event([flight_id])
+    timestamps = []
+    for _ in range(2):
+        response = lh.handler(event, None)
+        timestamps.append(time.perf_counter())
+        assert not response['batchItemFailures'], response
+    return {"import_ms": 1000 * (imported - start), "first_event_ms": 1000 * (timestamps[0] - start),
+            "handle_warm_ms": 1000 * (timestamps[1] - timestamps[0]), "loaded_at_import": loaded}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure lambda_handler import time and time to first handled event.")
+    parser.add_argument("--flight", default="UA123", help="Flight ID from flight_plans.csv for the handled events.")
+    parser.add_argument("--top", type=int, default=10, help="Number of most expensive imports to list.")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the cumulative import time exceeds this.")
+    parser.add_argument("--max-first-event-ms", type=float, help="Fail if import plus the first event exceeds this.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(first_event(args.flight)))
+        return
+
+    total_ms, children = import_times()
+    print(f"python -X importtime: import {MODULE} {total_ms:.1f} ms cumulative")
+    for ms, name in sorted(children, reverse=True)[:args.top]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    spawned = time.perf_counter()
+    child = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", "--flight", args.flight],
+                           capture_output=True, text=True, env=LAMBDA_ENV)
+    wall_ms = 1000 * (time.perf_counter() - spawned)
+    if child.returncode != 0:
+        print(f"REGRESSION: handling the first event failed:\n{child.stderr[-2000:]}")
+        sys.exit(1)
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    print(f"fresh process: import {result['import_ms']:.1f} ms, first event handled after {result['first_event_ms']:.1f} ms "
+          f"(next, warm event {result['handle_warm_ms']:.1f} ms), {wall_ms:.0f} ms wall incl. interpreter")
+
+    problems = []
+    if result['loaded_at_import']:
+        problems.append(f"imported at module load: {', '.join(result['loaded_at_import'])}")
+    if args.max_import_ms is not None and total_ms > args.max_import_ms:
+        problems.append(f"import {total_ms:.1f} ms > {args.max_import_ms} ms")
+    if args.max_first_event_ms is not None and result['first_event_ms'] > args.max_first_event_ms:
+        problems.append(f"first event {result['first_event_ms']:.1f} ms > {args.max_first_event_ms} ms")
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
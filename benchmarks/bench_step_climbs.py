@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cost of the step-climb model in the Lambda A* search.
+
+Builds the (level x level x mass bucket) transition table once and reports its
+build time, then runs the search with free level changes and with step-climb
+costs and rules on the filed plan and on densified versions of the same city
+pair. The per-expansion time column shows what the table lookups and the legs
+walked ahead at a newly entered level add; the extra states come from tracking
+steps used (a state with fewer steps and no more fuel prunes the others).
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_step_climbs [--flight QF202] [--lengths 4 50 100]
+"""
+import json
+import argparse
+import time
+import lambda_handler as lh
+from level_transitions import TransitionCostTable
+from benchmarks.synthetic import great_circle_route
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare A* with free level changes against the step-climb model.")
+    parser.add_argument("--flight", default="QF202", help="Flight ID from flight_plans.csv.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[4, 50, 100], help="Route lengths (4 = the plan as filed).")
+    args = parser.parse_args()
+    plan = json.loads(lh.get_flight_plan(args.flight))
+    start = time.perf_counter()
+    table = TransitionCostTable.build(plan['aircraft_type'], lh.FLIGHT_LEVEL_ALTITUDES_FT)
+    print(f"transition table {table.costs.shape} built in {time.perf_counter() - start:.3f}s")
+    print(f"{'wps':>4} {'model':>6} {'expanded':>9} {'pushed':>8} {'time_s':>8} {'ms/exp':>7} {'fuel_kg':>10} {'changes':>7}")
+    for seed, n in enumerate(args.lengths):
+        route = dict(plan)
+        if n != len(plan['waypoints']):
+            route["waypoints"] = great_circle_route(n, plan['origin_airport'], plan['destination_airport'], lh.WAYPOINT_COORDINATES, seed=seed, prefix=args.flight)
+        lh.a_star_search(route, {})  # Warm the fuel and transition tables outside the timed region.
+        for name, step_climbs in (('free', False), ('steps', True)):
+            stats = {}
+            start = time.perf_counter()
+            path, fuel = lh.a_star_search(route, {}, stats=stats, step_climbs=step_climbs)
+            elapsed = time.perf_counter() - start
+            levels = [entry['flight_level'] for entry in path[1:]]
+            changes = sum(a != b for a, b in zip(levels, levels[1:]))
+            print(f"{len(route['waypoints']):>4} {name:>6} {stats['nodes_expanded']:>9} {stats['nodes_pushed']:>8} {elapsed:>8.3f} "
+                  f"{1000 * elapsed / max(1, stats['nodes_expanded']):>7.3f} {fuel:>10.1f} {changes:>7}")
+
+if __name__ == "__main__":
+    main()
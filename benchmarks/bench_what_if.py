@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: a what-if sweep in one batched call vs. one optimization per scenario.
+
+For one synthetic great-circle route, sweeps takeoff masses x perturbed weather members
+with `what_if_sweep` (shared distances, segment weather and transition table, one
+vectorized baseline for all masses, one batched DP) and with the per-scenario calls it
+replaces (`baseline_profile` + `dp_search` for each scenario, on a cold baseline cache).
+Optimized fuel should agree to within rounding and the level profiles exactly.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.bench_what_if [--waypoints 120] [--masses 200000 230000 260000] [--members 4]
+"""
+import argparse
+import time
+import lambda_handler as lh
+from baseline_cache import BaselineCache
+from benchmarks.synthetic import great_circle_route, fixture_weather
+
+def per_scenario(plan, masses, members):
+    """Optimized fuel and level-change profile per scenario, one baseline and one dp_search at a time."""
+    fuel, profiles = [], []
+    for mass in masses:
+        scenario = {**plan, 'initial_mass_kg': mass}
+        lh.baseline_profile(scenario)
+        for weather in members:
+            path, total = lh.dp_search(scenario, weather)
+            fuel.append(total)
+            legs = [step['flight_level'] for step in path[1:]]
+            profiles.append([[i, fl] for i, fl in enumerate(legs) if i == 0 or fl != legs[i - 1]])
+    return fuel, profiles
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a batched what-if sweep with per-scenario optimization.")
+    parser.add_argument("--waypoints", type=int, default=120, help="Route length in waypoints.")
+    parser.add_argument("--masses", type=float, nargs="+", default=[200000, 215000, 230000, 245000, 260000], help="Takeoff masses in kg.")
+    parser.add_argument("--members", type=int, default=4, help="Weather members (the forecast plus perturbed copies).")
+    parser.add_argument("--aircraft", default="B772", help="Aircraft type.")
+    args = parser.parse_args()
+    waypoints = great_circle_route(args.waypoints, 'KJFK', 'RJTT', lh.WAYPOINT_COORDINATES, seed=0, prefix="WHATIF")
+    plan = {'flight_id': 'WHATIF', 'aircraft_type': args.aircraft, 'initial_mass_kg': args.masses[0], 'waypoints': waypoints}
+    members = lh.perturbed_weather_members(fixture_weather(waypoints), args.members)
+    lh.dp_search(plan, members[0])  # Warm the fuel and transition tables and the geometry.
+
+    lh.BASELINE_CACHE = BaselineCache(path=None)
+    start = time.perf_counter()
+    loop_fuel, loop_profiles = per_scenario(plan, args.masses, members)
+    loop_ms = 1000 * (time.perf_counter() - start)
+    lh.BASELINE_CACHE = BaselineCache(path=None)
+    start = time.perf_counter()
+    table = lh.what_if_sweep(plan, args.masses, members)
+    sweep_ms = 1000 * (time.perf_counter() - start)
+
+    fuel_diff = max(abs(a - b) for a, b in zip(loop_fuel, table['optimized_fuel_kg']))
+    print(f"{len(loop_fuel)} scenarios on {len(waypoints)} waypoints ({args.aircraft})")
+    print(f"per-scenario: {loop_ms:9.1f} ms   batched sweep: {sweep_ms:9.1f} ms   speed-up: {loop_ms / sweep_ms:5.1f}x")
+    print(f"max fuel difference: {fuel_diff:.3f} kg   profiles identical: {table['profiles'] == loop_profiles}")
+    print(f"{'mass_kg':>9} {'member':>6} {'baseline':>9} {'optimized':>9} {'saved':>7}  profile")
+    for row in zip(table['initial_mass_kg'], table['weather_member'], table['baseline_fuel_kg'], table['optimized_fuel_kg'], table['fuel_saved_kg'], table['profiles']):
+        print(f"{row[0]:>9,} {row[1]:>6} {row[2]:>9,} {row[3]:>9,} {row[4]:>7,}  {row[5]}")
+
+if __name__ == "__main__":
+    main()
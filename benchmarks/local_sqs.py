@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""In-memory SQS stand-in and synthetic SQS events for running the Lambda handler locally."""
+import json
+import uuid
+import threading
+from collections import deque
+
+class InMemorySQS:
+    """Implements the subset of the boto3 SQS client used by this repo, keyed by queue URL."""
+
+    def __init__(self):
+        self.queues, self._lock = {}, threading.Lock()
+
+    def _queue(self, queue_url):
+        return self.queues.setdefault(queue_url, deque())
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        with self._lock:
+            message_id = str(uuid.uuid4())
+            self._queue(QueueUrl).append({'MessageId': message_id, 'ReceiptHandle': message_id, 'Body': MessageBody})
+        return {'MessageId': message_id}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        successful = [{'Id': entry['Id'], 'MessageId': self.send_message(QueueUrl, entry['MessageBody'])['MessageId']} for entry in Entries]
+        return {'Successful': successful, 'Failed': []}
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, **kwargs):
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            messages = [queue.popleft() for _ in range(min(MaxNumberOfMessages, len(queue)))]
+        return {'Messages': messages} if messages else {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def bodies(self, queue_url):
+        return [json.loads(message['Body']) for message in self._queue(queue_url)]
+
+def synthetic_sqs_event(flight_ids):
+    """An SQS Lambda event with one record per flight_id (repeats allowed)."""
+    return {'Records': [{'messageId': f"msg-{i}", 'receiptHandle': f"rh-{i}", 'body': json.dumps({'flight_id': flight_id}),
+                         'eventSource': 'aws:sqs'} for i, flight_id in enumerate(flight_ids)]}
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite: a synthetic fleet through the Lambda optimizer, with a JSON history.
+
+`run` generates a deterministic fleet (`synthetic_fleet`: random airport pairs from
+WAYPOINT_COORDINATES, great-circle en-route fixes, 3 to 500 waypoints, mixed aircraft
+types) with fixture weather, runs `run_fuel_optimization` on every plan inside a
+flight trace (instrumentation.py), and appends latency statistics by route-length
+bucket for the whole call and for its `baseline_profile` and `a_star_search` spans to
+the history file. One optimization per plan yields all three timings; the enabled
+spans cost about 1% (see bench_instrumentation). Fuel totals are stored as a checksum, so a
+change in results is visible next to a change in speed; plans the optimizer rejects (an
+error status, e.g. more fuel than on board) are left out of both and counted as `failed`. `compare` checks the latest
+entry against the previous one with the same configuration (or any two entries) and
+exits with status 1 if a mean latency regressed beyond `--threshold`.
+
+Each plan's fixes are registered only while it runs, with a fresh waypoint geometry:
+the dense distance matrix grows with the square of all fixes ever seen, which a fleet
+of thousands of long routes would exhaust. Fuel and transition tables are warmed per
+aircraft type before timing. Unset WIND_GRID_PATH so the fixture weather is used.
+
+How to Run (from the repository root):
+
+    python -m benchmarks.suite run [--plans 2000] [--seed 0] [--history benchmarks/history.json]
+    python -m benchmarks.suite compare [--threshold 0.10] [--baseline -2 --candidate -1]
+"""
+import os
+import sys
+import json
+import argparse
+import contextlib
+import platform
+import subprocess
+import time
+import numpy as np
+import instrumentation
+import lambda_handler as lh
+from batch_runner import with_default_subcommand
+from geometry import WaypointGeometry
+from benchmarks.synthetic import synthetic_fleet, fixture_weather
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), 'history.json')
+LENGTH_BUCKETS = ((3, 9), (10, 49), (50, 199), (200, 500))
+CASES = {'baseline': 'baseline.ms', 'a_star_search': 'a_star_search.ms', 'run_fuel_optimization': 'run_fuel_optimization.ms'}
+
+def bucket_name(n_waypoints):
+    return next(f"{low}-{high}" for low, high in LENGTH_BUCKETS if n_waypoints <= high)
+
+def summarize(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {'n': len(samples), 'mean_ms': round(float(samples.mean()), 4),
+            'p50_ms': round(float(np.percentile(samples, 50)), 4), 'p95_ms': round(float(np.percentile(samples, 95)), 4)}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(n_plans, seed, min_waypoints, max_waypoints):
+    """Times every case on every plan; returns the history entry."""
+    airports = dict(lh.WAYPOINT_COORDINATES)
+    fixes = dict(airports)
+    fleet = synthetic_fleet(n_plans, fixes, min_waypoints, max_waypoints, seed=seed)
+    for aircraft_type in sorted({plan['aircraft_type'] for plan in fleet}):
+        warm = {'flight_id': 'WARM', 'waypoints': ['KJFK', 'KORD', 'KSFO'], 'initial_mass_kg': 200000, 'aircraft_type': aircraft_type}
+        lh.a_star_search(warm, {})  # Builds or loads the fuel and transition tables outside the timed region.
+    samples = {case: {} for case in CASES}
+    checksum = {'baseline_fuel_kg': 0.0, 'optimized_fuel_kg': 0.0}
+    failed = 0
+    records, metrics_enabled, instrumentation.METRICS_ENABLED = [], instrumentation.METRICS_ENABLED, True
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):  # The tools log every call.
+        for plan in fleet:
+            lh.WAYPOINT_COORDINATES.clear()
+            lh.WAYPOINT_COORDINATES.update(airports)
+            lh.WAYPOINT_COORDINATES.update({wp: fixes[wp] for wp in plan['waypoints']})
+            lh.GEOMETRY = WaypointGeometry(lh.WAYPOINT_COORDINATES)
+            weather = fixture_weather(plan['waypoints'], seed)
+            with instrumentation.flight_trace(plan['flight_id'], sink=records.append):
+                result = json.loads(lh.run_fuel_optimization(plan, weather))
+            if result.get('status') == 'error':
+                failed += 1
+                continue
+            bucket = bucket_name(len(plan['waypoints']))
+            for case, metric in CASES.items():
+                samples[case].setdefault(bucket, []).append(records[-1][metric])
+            for key in checksum:
+                checksum[key] += result[key]
+    lh.WAYPOINT_COORDINATES.clear()
+    lh.WAYPOINT_COORDINATES.update(airports)
+    lh.GEOMETRY = WaypointGeometry(airports)
+    instrumentation.METRICS_ENABLED = metrics_enabled
+    results = {}
+    for case, by_bucket in samples.items():
+        results[case] = {bucket: summarize(by_bucket[bucket]) for bucket in sorted(by_bucket, key=lambda b: int(b.split('-')[0]))}
+        if by_bucket:
+            results[case]['all'] = summarize([ms for values in by_bucket.values() for ms in values])
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(),
+            'python': platform.python_version(), 'machine': platform.machine(),
+            'config': {'plans': n_plans, 'seed': seed, 'min_waypoints': min_waypoints, 'max_waypoints': max_waypoints},
+            'wall_s': round(time.perf_counter() - start, 2), 'failed': failed, 'results': results,
+            'checksum': {key: round(value, 1) for key, value in checksum.items()}}
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def print_entry(entry):
+    print(f"{entry['timestamp']} commit={entry['commit']} {entry['config']} wall={entry['wall_s']}s failed={entry.get('failed', 0)} checksum={entry['checksum']}")
+    print(f"{'case':>22} {'bucket':>8} {'n':>6} {'mean_ms':>10} {'p50_ms':>10} {'p95_ms':>10}")
+    for case, by_bucket in entry['results'].items():
+        for bucket, stats in by_bucket.items():
+            print(f"{case:>22} {bucket:>8} {stats['n']:>6} {stats['mean_ms']:>10.3f} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}")
+
+def compare_entries(baseline, candidate, threshold, min_delta_ms=0.05):
+    """Prints candidate vs. baseline mean latencies; returns the regressions (case, bucket, ratio)."""
+    regressions = []
+    print(f"baseline {baseline['timestamp']} ({baseline['commit']}) vs candidate {candidate['timestamp']} ({candidate['commit']})")
+    print(f"{'case':>22} {'bucket':>8} {'base_ms':>10} {'cand_ms':>10} {'change':>8}")
+    for case, by_bucket in candidate['results'].items():
+        for bucket, stats in by_bucket.items():
+            base = baseline['results'].get(case, {}).get(bucket)
+            if base is None:
+                continue
+            ratio = stats['mean_ms'] / base['mean_ms'] if base['mean_ms'] else float('inf')
+            regressed = ratio > 1 + threshold and stats['mean_ms'] - base['mean_ms'] > min_delta_ms
+            if regressed:
+                regressions.append((case, bucket, ratio))
+            print(f"{case:>22} {bucket:>8} {base['mean_ms']:>10.3f} {stats['mean_ms']:>10.3f} {100 * (ratio - 1):>+7.1f}%"
+                  + ("  REGRESSION" if regressed else ""))
+    if candidate.get('failed', 0) != baseline.get('failed', 0):
+        print(f"Warning: failed plans changed from {baseline.get('failed', 0)} to {candidate.get('failed', 0)}; the timings cover different plans.")
+    for key, value in candidate['checksum'].items():
+        if not np.isclose(value, baseline['checksum'].get(key, float('nan')), rtol=1e-4):
+            print(f"Warning: {key} changed from {baseline['checksum'].get(key)} to {value}; the optimizer results differ.")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the synthetic-fleet benchmark suite or compare history entries.")
+    subcommands = parser.add_subparsers(dest="command")
+    run_parser = subcommands.add_parser("run", help="Run the suite and append the results to the history (the default).")
+    run_parser.add_argument("--plans", type=int, default=2000, help="Number of synthetic flight plans.")
+    run_parser.add_argument("--seed", type=int, default=0, help="Fleet and weather seed.")
+    run_parser.add_argument("--min-waypoints", type=int, default=3, help="Shortest route.")
+    run_parser.add_argument("--max-waypoints", type=int, default=500, help="Longest route.")
+    run_parser.add_argument("--no-save", action="store_true", help="Print the results without appending them to the history.")
+    compare_parser = subcommands.add_parser("compare", help="Compare two history entries and flag regressions.")
+    compare_parser.add_argument("--baseline", type=int, help="History index of the baseline (default: the previous entry with the candidate's config).")
+    compare_parser.add_argument("--candidate", type=int, default=-1, help="History index of the candidate (default: the latest).")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown of a mean latency.")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file.")
+    args = parser.parse_args(with_default_subcommand(sys.argv[1:] or ["run"], ("run", "compare"), "run"))
+
+    history = load_history(args.history)
+    if args.command == "compare":
+        candidate = history[args.candidate]
+        if args.baseline is not None:
+            baseline = history[args.baseline]
+        else:
+            candidate_index = args.candidate % len(history)
+            earlier = [entry for entry in history[:candidate_index] if entry['config'] == candidate['config']]
+            if not earlier:
+                print("No earlier history entry with the same configuration to compare against.")
+                return
+            baseline = earlier[-1]
+        regressions = compare_entries(baseline, candidate, args.threshold)
+        print(f"{len(regressions)} regression(s) beyond {100 * args.threshold:.0f}%.")
+        sys.exit(1 if regressions else 0)
+
+    entry = run_suite(args.plans, args.seed, args.min_waypoints, args.max_waypoints)
+    print_entry(entry)
+    if not args.no_save:
+        history.append(entry)
+        with open(args.history, 'w') as f:
+            json.dump(history, f, indent=1)
+        print(f"Appended to {args.history} ({len(history)} entries).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Deterministic synthetic routes, fleets and fixture weather for benchmarking."""
+import zlib
+import numpy as np
+
+# Takeoff mass range (kg) drawn for each aircraft type in a synthetic fleet.
+FLEET_MASS_RANGES_KG = {'B772': (150000, 240000), 'B77W': (200000, 330000), 'B789': (150000, 240000),
+                        'B744': (250000, 380000), 'A359': (160000, 260000), 'A388': (350000, 540000)}
+
+def synthetic_route(n_waypoints, origin, destination, coordinates, seed=0, jitter_deg=0.5, prefix="SYN"):
+    """
+    Builds a route of `n_waypoints` fixes from `origin` to `destination` by interpolating
+    along the straight lat/lon line and jittering the intermediate fixes. The generated
+    fixes are registered in `coordinates` (e.g. `WAYPOINT_COORDINATES`) and the waypoint
+    list is returned.
+    """
+    rng = np.random.default_rng(seed)
+    (lat1, lon1), (lat2, lon2) = coordinates[origin], coordinates[destination]
+    waypoints = [origin]
+    for i, t in enumerate(np.linspace(0, 1, n_waypoints)[1:-1], start=1):
+        name = f"{prefix}{seed:03d}{i:04d}"
+        lat = lat1 + t * (lat2 - lat1) + rng.uniform(-jitter_deg, jitter_deg)
+        lon = lon1 + t * (lon2 - lon1) + rng.uniform(-jitter_deg, jitter_deg)
+        coordinates[name] = (float(np.clip(lat, -89.0, 89.0)), float(lon))
+        waypoints.append(name)
+    waypoints.append(destination)
+    return waypoints
+
+def great_circle_route(n_waypoints, origin, destination, coordinates, seed=0, jitter_deg=0.1, prefix="GC"):
+    """
+    Like `synthetic_route`, but places the intermediate fixes along the great circle, so
+    the route length stays close to the real city-pair distance (a densified long-haul plan).
+    """
+    from geometry import intermediate_points
+    rng = np.random.default_rng(seed)
+    (lat1, lon1), (lat2, lon2) = coordinates[origin], coordinates[destination]
+    lats, lons = intermediate_points(lat1, lon1, lat2, lon2, np.linspace(0, 1, n_waypoints)[1:-1])
+    waypoints = [origin]
+    for i, (lat, lon) in enumerate(zip(lats, lons), start=1):
+        name = f"{prefix}{seed:03d}{i:04d}"
+        coordinates[name] = (float(np.clip(lat + rng.uniform(-jitter_deg, jitter_deg), -89.0, 89.0)),
+                             float((lon + rng.uniform(-jitter_deg, jitter_deg) + 540) % 360 - 180))
+        waypoints.append(name)
+    waypoints.append(destination)
+    return waypoints
+
+def synthetic_fleet(n_plans, coordinates, min_waypoints=3, max_waypoints=500, seed=0, mass_ranges=FLEET_MASS_RANGES_KG):
+    """
+    `n_plans` flight plans between random airport pairs of `coordinates` (its 4-letter
+    keys), with route lengths drawn log-uniformly from [min_waypoints, max_waypoints] (so
+    short routes dominate, as in a real schedule) and a mass range per aircraft type. The
+    en-route fixes are great-circle points registered in `coordinates`; the same seed
+    always yields the same fleet.
+    """
+    rng = np.random.default_rng(seed)
+    airports = sorted(code for code in coordinates if len(code) == 4 and code.isalpha())
+    aircraft_types = sorted(mass_ranges)
+    lengths = np.exp(rng.uniform(np.log(min_waypoints), np.log(max_waypoints + 1), n_plans)).astype(int)
+    fleet = []
+    for i, n_waypoints in enumerate(np.clip(lengths, min_waypoints, max_waypoints).tolist()):
+        origin, destination = rng.choice(airports, 2, replace=False).tolist()
+        aircraft_type = aircraft_types[rng.integers(len(aircraft_types))]
+        low, high = mass_ranges[aircraft_type]
+        waypoints = great_circle_route(n_waypoints, origin, destination, coordinates, seed=seed, prefix=f"F{i:05d}_")
+        fleet.append({'flight_id': f"SYN{seed:03d}{i:05d}", 'origin_airport': origin, 'destination_airport': destination,
+                      'waypoints': waypoints, 'initial_mass_kg': int(rng.integers(low // 1000, high // 1000 + 1)) * 1000,
+                      'aircraft_type': aircraft_type})
+    return fleet
+
+def fixture_weather(waypoints, seed=0):
+    """
+    Weather records ({'temperature_c', 'wind_speed_kts'}) for waypoints, as returned by
+    get_weather_for_route. Each waypoint's record depends only on its name and `seed`,
+    so a fix shared by several routes sees the same weather in all of them.
+    """
+    weather = {}
+    for waypoint in waypoints:
+        rng = np.random.default_rng([seed, zlib.crc32(waypoint.encode())])
+        weather[waypoint] = {'temperature_c': round(float(rng.uniform(-10, 35)), 1), 'wind_speed_kts': round(float(rng.uniform(0, 40)), 1)}
+    return weather
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed Flight Plan Store.
+
+Loads the flight plan file once per process (so the parsed plans survive across
+warm Lambda invocations), pre-parses each plan's waypoints into a tuple, and keeps
+a dict index on `flight_id` plus secondary indexes on origin, destination and
+aircraft type. The file is re-read only when its mtime changes.
+
+Configuration (environment variables):
+    FLIGHT_PLANS_PATH  Plan file, tab- or comma-separated (default: flight_plans.csv).
+"""
+import os
+import csv
+import time
+import threading
+
+FLIGHT_PLANS_PATH = os.getenv('FLIGHT_PLANS_PATH', 'flight_plans.csv')
+SECONDARY_KEYS = ('origin_airport', 'destination_airport', 'aircraft_type')
+
+def parse_waypoints(value):
+    """Parses '[KJFK, KORD]', "['KJFK', 'KORD']" or a list into a tuple of waypoint codes."""
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    cleaned = value.strip('[]').replace("'", "").replace('"', '')
+    return tuple(wp.strip() for wp in cleaned.split(',') if wp.strip())
+
+def _parse_number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+def iter_flight_plans(path):
+    """Streams normalized plan records from a tab- or comma-separated plan file."""
+    with open(path, newline='') as f:
+        header = f.readline()
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter='\t' if '\t' in header else ',')
+        for row in reader:
+            if row.get('flight_id'):
+                yield normalize_plan(row)
+
+def read_flight_plans(path):
+    """Reads a tab- or comma-separated plan file into a list of normalized plan records."""
+    return list(iter_flight_plans(path))
+
+def normalize_plan(plan):
+    record = {key.strip(): value.strip() if isinstance(value, str) else value for key, value in plan.items()}
+    record['waypoints'] = parse_waypoints(record['waypoints'])
+    record['initial_mass_kg'] = _parse_number(record['initial_mass_kg'])
+    if record.get('zero_fuel_mass_kg') not in (None, ''):
+        record['zero_fuel_mass_kg'] = _parse_number(record['zero_fuel_mass_kg'])
+    else:
+        record.pop('zero_fuel_mass_kg', None)
+    return record
+
+class FlightPlanStore:
+    """In-memory, indexed view of the flight plan file with mtime-based reloading."""
+
+    def __init__(self, path=FLIGHT_PLANS_PATH, check_interval_s=1.0):
+        self.path, self.check_interval_s = path, check_interval_s
+        self._lock = threading.Lock()
+        self._mtime, self._checked_at = None, 0.0
+        self._by_id, self._indexes = {}, {key: {} for key in SECONDARY_KEYS}
+
+    @classmethod
+    def from_records(cls, records):
+        """A store over in-memory records (no backing file, never reloads)."""
+        store = cls(path=None)
+        store._build_index([normalize_plan(record) for record in records])
+        return store
+
+    def _build_index(self, records):
+        by_id, indexes = {}, {key: {} for key in SECONDARY_KEYS}
+        for record in records:
+            by_id[record['flight_id']] = record
+            for key in SECONDARY_KEYS:
+                indexes[key].setdefault(record.get(key), []).append(record['flight_id'])
+        self._by_id, self._indexes = by_id, indexes
+
+    def refresh(self):
+        """Re-reads the file if its mtime changed. Checks at most once per `check_interval_s`."""
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval_s:
+            return
+        with self._lock:
+            self._checked_at = now
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._mtime:
+                self._build_index(read_flight_plans(self.path))
+                self._mtime = mtime
+
+    @staticmethod
+    def _export(record):
+        return dict(record, waypoints=list(record['waypoints']))
+
+    def get(self, flight_id):
+        """The plan for `flight_id` as a fresh dict (waypoints as a list), or None."""
+        self.refresh()
+        record = self._by_id.get(flight_id)
+        return None if record is None else self._export(record)
+
+    def find(self, origin_airport=None, destination_airport=None, aircraft_type=None):
+        """Plans matching every given field, using the secondary indexes."""
+        self.refresh()
+        criteria = {'origin_airport': origin_airport, 'destination_airport': destination_airport, 'aircraft_type': aircraft_type}
+        candidates = sorted((self._indexes[key].get(value, []) for key, value in criteria.items() if value is not None), key=len)
+        if not candidates:
+            return [self._export(record) for record in self._by_id.values()]
+        ids = candidates[0]
+        for matches in candidates[1:]:
+            allowed = set(matches)
+            ids = [flight_id for flight_id in ids if flight_id in allowed]
+        return [self._export(self._by_id[flight_id]) for flight_id in ids]
+
+    def flight_ids(self):
+        self.refresh()
+        return list(self._by_id)
+
+    def __iter__(self):
+        self.refresh()
+        return (self._export(record) for record in list(self._by_id.values()))
+
+    def __len__(self):
+        self.refresh()
+        return len(self._by_id)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Free-Routing Corridor Search.
+
+Instead of choosing only a flight level at each waypoint of a fixed list, this
+module builds a lateral corridor of candidate nodes around the great-circle track
+between origin and destination and searches the (node x flight level) graph with
+A*. Nodes are stored as flat NumPy arrays, neighbors are generated on demand and
+per-node weather is resolved lazily from the nearest reporting waypoint through
+a bucketed spatial index over the known waypoint coordinates. Level changes after
+the origin pay their climb fuel from a transition table when one is given.
+
+Configuration (environment variables):
+    CORRIDOR_HALF_WIDTH_KM        Lateral extent of the corridor on each side of the track (default: 300).
+    CORRIDOR_LATERAL_SPACING_KM   Spacing between lanes across the track (default: 50).
+    CORRIDOR_STATION_SPACING_KM   Spacing between cross-sections along the track (default: 250).
+    CORRIDOR_MAX_LATERAL_STEP     Lanes a route may shift between consecutive stations (default: 1).
+"""
+import os
+import math
+import heapq
+import numpy as np
+from fuel_tables import min_fuel_per_nm
+from wind_grid import along_track_wind, MS_TO_KTS
+from geometry import haversine_km, initial_bearing_deg, destination_point, midpoint, intermediate_points
+
+# --- Section 1: Configuration ---
+CORRIDOR_HALF_WIDTH_KM = float(os.getenv('CORRIDOR_HALF_WIDTH_KM', '300'))
+CORRIDOR_LATERAL_SPACING_KM = float(os.getenv('CORRIDOR_LATERAL_SPACING_KM', '50'))
+CORRIDOR_STATION_SPACING_KM = float(os.getenv('CORRIDOR_STATION_SPACING_KM', '250'))
+MAX_LATERAL_STEP = int(os.getenv('CORRIDOR_MAX_LATERAL_STEP', '1'))
+WAYPOINT_SNAP_KM = 25          # Corridor nodes this close to a named fix are labelled with it.
+WEATHER_RADIUS_KM = 1000       # Farther than this from any report, default weather is used.
+
+# --- Section 2: Spatial Index Over Named Waypoints ---
+class SpatialIndex:
+    """Lat/lon bucket index over named points for nearest-neighbour queries."""
+
+    def __init__(self, coordinates, cell_deg=5.0):
+        self.cell_deg = cell_deg
+        self._n_lon_cells = int(round(360 / cell_deg))
+        self.names = list(coordinates)
+        self.lats = np.array([coordinates[name][0] for name in self.names], dtype=float)
+        self.lons = np.array([coordinates[name][1] for name in self.names], dtype=float)
+        self._buckets = {}
+        for i, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            self._buckets.setdefault(self._cell(lat, lon), []).append(i)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor((lon % 360) / self.cell_deg)) % self._n_lon_cells
+
+    def nearest(self, lat, lon, max_km=float('inf')):
+        """
+        Returns (name, distance_km) of the nearest point, or (None, distance) if it lies
+        beyond `max_km`. Rings of cells are searched outward until a hit is found, plus
+        one more ring to catch closer points just across a cell boundary.
+        """
+        if not self.names:
+            return None, float('inf')
+        ci, cj = self._cell(lat, lon)
+        candidates, found_ring = [], None
+        for ring in range(int(180 / self.cell_deg) + 1):
+            for di in range(-ring, ring + 1):
+                for dj in range(-ring, ring + 1):
+                    if max(abs(di), abs(dj)) == ring:
+                        candidates.extend(self._buckets.get((ci + di, (cj + dj) % self._n_lon_cells), ()))
+            if candidates and found_ring is None:
+                found_ring = ring
+            if found_ring is not None and ring > found_ring:
+                break
+        idx = np.array(candidates)
+        distances = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        k = int(np.argmin(distances))
+        name = self.names[idx[k]] if distances[k] <= max_km else None
+        return name, float(distances[k])
+
+# --- Section 3: Corridor Graph ---
+class CorridorGraph:
+    """
+    Candidate nodes on `n_stations` cross-sections of the great-circle track, each with
+    `n_lateral` lanes offset perpendicular to the track. Node ids are
+    `station * n_lateral + lane`; coordinates live in flat `lat`/`lon` arrays.
+    """
+
+    def __init__(self, origin, destination, half_width_km=CORRIDOR_HALF_WIDTH_KM,
+                 lateral_spacing_km=CORRIDOR_LATERAL_SPACING_KM, station_spacing_km=CORRIDOR_STATION_SPACING_KM,
+                 max_lateral_step=MAX_LATERAL_STEP):
+        (lat1, lon1), (lat2, lon2) = origin, destination
+        total_km = float(haversine_km(lat1, lon1, lat2, lon2))
+        self.n_stations = max(2, int(math.ceil(total_km / station_spacing_km)) + 1)
+        self.n_lateral = 2 * int(half_width_km // lateral_spacing_km) + 1
+        self.center = self.n_lateral // 2
+        self.max_lateral_step = max_lateral_step
+        track_lat, track_lon = intermediate_points(lat1, lon1, lat2, lon2, np.linspace(0, 1, self.n_stations))
+        bearings = initial_bearing_deg(track_lat[:-1], track_lon[:-1], track_lat[1:], track_lon[1:])
+        bearings = np.append(bearings, bearings[-1])
+        offsets = (np.arange(self.n_lateral) - self.center) * lateral_spacing_km
+        lat, lon = destination_point(track_lat[:, np.newaxis], track_lon[:, np.newaxis],
+                                     bearings[:, np.newaxis] + 90, offsets[np.newaxis, :])
+        self.lat, self.lon = lat.ravel(), lon.ravel()
+
+    @property
+    def n_nodes(self):
+        return self.n_stations * self.n_lateral
+
+    @property
+    def start(self):
+        return self.center
+
+    @property
+    def goal(self):
+        return (self.n_stations - 1) * self.n_lateral + self.center
+
+    def neighbors(self, node):
+        """Nodes on the next station within the lateral step that can still reach the goal."""
+        station, lane = divmod(int(node), self.n_lateral)
+        if station + 1 >= self.n_stations:
+            return np.empty(0, dtype=np.intp)
+        reach = (self.n_stations - 2 - station) * self.max_lateral_step
+        low = max(lane - self.max_lateral_step, self.center - reach, 0)
+        high = min(lane + self.max_lateral_step, self.center + reach, self.n_lateral - 1)
+        return (station + 1) * self.n_lateral + np.arange(low, high + 1)
+
+# --- Section 4: Corridor A* Search ---
+def free_route_search(flight_plan, weather_data, coordinates, flight_levels, fuel_burn, start_level,
+                      tas_kts=450, wind_grid=None, min_mass_kg=None, transition_cost=None, stats=None, **corridor):
+    """
+    A* over (corridor node x flight level) from origin to destination. `fuel_burn` has the
+    signature of `calculate_fuel_burn` (fuel flow at TAS, time at ground speed) and must
+    broadcast over arrays. States are packed as
+    `node * n_levels + level_idx` into dense g/mass/parent arrays. With a `WindGrid`, each
+    edge uses the along-track wind and temperature per level at the edge midpoint instead
+    of the nearest surface report. States lighter than `min_mass_kg` (the zero-fuel mass)
+    are infeasible and never pushed. `transition_cost(level_idx, mass)` gives the extra fuel
+    of leaving a level for each level index (as in the fixed-route A*); the level chosen at
+    the origin is free. Step-climb distance and count limits are not applied here. `corridor`
+    takes CorridorGraph's keyword arguments (half width, spacings, lateral step). Returns
+    (path, total_fuel) where each path entry also carries the node's lat/lon.
+    """
+    graph = CorridorGraph(coordinates[flight_plan['origin_airport']], coordinates[flight_plan['destination_airport']], **corridor)
+    n_levels = len(flight_levels)
+    altitudes_ft = np.asarray(flight_levels, dtype=float) * 100
+    reporting = {wp: coordinates[wp] for wp in weather_data if wp in coordinates}
+    weather_index = SpatialIndex(reporting)
+    node_temp = np.full(graph.n_nodes, np.nan)
+    node_wind = np.full(graph.n_nodes, np.nan)
+
+    def weather_at(nodes):
+        for node in nodes[np.isnan(node_temp[nodes])]:
+            name, _ = weather_index.nearest(graph.lat[node], graph.lon[node], max_km=WEATHER_RADIUS_KM)
+            weather = weather_data.get(name, {}) if name else {}
+            node_temp[node], node_wind[node] = weather.get('temperature_c', 15), weather.get('wind_speed_kts', 0)
+        return node_temp[nodes], node_wind[nodes]
+
+    dest_lat, dest_lon = graph.lat[graph.goal], graph.lon[graph.goal]
+    winds = [w.get('wind_speed_kts', 0) for w in weather_data.values()] or [0]
+    if wind_grid is not None:
+        winds = [-wind_grid.max_wind_kts, wind_grid.max_wind_kts]
+    min_kg_per_km = min_fuel_per_nm(flight_plan['aircraft_type'], flight_plan['initial_mass_kg'],
+                                    (altitudes_ft[0], altitudes_ft[-1]), (tas_kts, tas_kts), max_tailwind_kts=max(0, *winds)) / 1.852
+
+    g = np.full(graph.n_nodes * n_levels, np.inf)
+    mass = np.zeros(graph.n_nodes * n_levels)
+    parent = np.full(graph.n_nodes * n_levels, -1, dtype=np.int64)
+    start = graph.start * n_levels + flight_levels.index(start_level)
+    g[start], mass[start] = 0, flight_plan['initial_mass_kg']
+    open_set, nodes_expanded, nodes_pushed = [(0.0, 0.0, start)], 0, 1
+    level_offsets = np.arange(n_levels)
+    goal_state = None
+    while open_set:
+        _, g_popped, state = heapq.heappop(open_set)
+        if g_popped > g[state]:
+            continue
+        node = state // n_levels
+        if node == graph.goal:
+            goal_state = state
+            break
+        nodes_expanded += 1
+        neighbors = graph.neighbors(node)
+        distance_km = haversine_km(graph.lat[node], graph.lon[node], graph.lat[neighbors], graph.lon[neighbors])
+        if wind_grid is not None:
+            mid_lat, mid_lon = midpoint(graph.lat[node], graph.lon[node], graph.lat[neighbors], graph.lon[neighbors])
+            bearing = initial_bearing_deg(graph.lat[node], graph.lon[node], graph.lat[neighbors], graph.lon[neighbors])
+            levels = np.asarray(flight_levels, dtype=float)[np.newaxis, :]
+            u, v, temp_c = wind_grid.interpolate(mid_lat[:, np.newaxis], mid_lon[:, np.newaxis], levels)
+            ground_speed_kts = tas_kts + along_track_wind(u, v, bearing[:, np.newaxis]) * MS_TO_KTS
+        else:
+            temp_c, wind_kts = weather_at(neighbors)
+            temp_c, ground_speed_kts = temp_c[:, np.newaxis], (tas_kts + wind_kts)[:, np.newaxis]
+        burns = fuel_burn(flight_plan['aircraft_type'], mass[state], altitudes_ft[np.newaxis, :], distance_km[:, np.newaxis],
+                          tas_kts, temp_c, ground_speed_kts)
+        if transition_cost is not None and node != graph.start:
+            burns = burns + transition_cost(state % n_levels, mass[state])[np.newaxis, :]
+        tentative = g[state] + burns
+        targets = neighbors[:, np.newaxis] * n_levels + level_offsets[np.newaxis, :]
+        better = tentative < g[targets]
+        if min_mass_kg is not None:
+            better &= mass[state] - burns >= min_mass_kg
+        if not better.any():
+            continue
+        h = haversine_km(graph.lat[neighbors], graph.lon[neighbors], dest_lat, dest_lon) * min_kg_per_km
+        h = np.broadcast_to(h[:, np.newaxis], targets.shape)
+        for target, new_g, burn, h_score in zip(targets[better], tentative[better], burns[better], h[better]):
+            g[target], mass[target], parent[target] = new_g, mass[state] - burn, state
+            heapq.heappush(open_set, (new_g + h_score, new_g, int(target)))
+            nodes_pushed += 1
+    if stats is not None:
+        stats.update(nodes_expanded=nodes_expanded, nodes_pushed=nodes_pushed, corridor_nodes=graph.n_nodes)
+    if goal_state is None:
+        return None, float('inf')
+    label_index = SpatialIndex(coordinates)
+    path, state = [], goal_state
+    while state != -1:
+        node, level_idx = divmod(int(state), n_levels)
+        lat, lon = float(graph.lat[node]), float(graph.lon[node])
+        name, _ = label_index.nearest(lat, lon, max_km=WAYPOINT_SNAP_KM)
+        path.append({'waypoint': name or f"{lat:.2f},{lon:.2f}", 'flight_level': flight_levels[level_idx],
+                     'lat': round(lat, 4), 'lon': round(lon, 4)})
+        state = parent[state]
+    return list(reversed(path)), float(g[goal_state])
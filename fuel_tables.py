@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed Fuel-Flow Lookup Tables.
+
+Constructing an OpenAP `FuelFlow` model and evaluating it one segment at a time
+dominates optimizer CPU time. This module samples the model once per aircraft
+type over a regular grid of mass x altitude x TAS x ISA deviation, persists the
+grid to an `.npz` file and answers lookups by multilinear interpolation. Points
+outside the grid fall back to live OpenAP.
+
+Configuration (environment variables):
+    FUEL_TABLE_DIR        Directory for persisted tables (default: <tmp>/fuel_tables).
+    FUEL_TABLE_TOLERANCE  Maximum relative error vs. live OpenAP (default: 0.01).
+"""
+import os
+import itertools
+import tempfile
+import threading
+import functools
+import numpy as np
+from instrumentation import span, count
+
+# --- Section 1: Configuration and Grid Definition ---
+FUEL_TABLE_DIR = os.getenv('FUEL_TABLE_DIR', os.path.join(tempfile.gettempdir(), 'fuel_tables'))
+FUEL_TABLE_TOLERANCE = float(os.getenv('FUEL_TABLE_TOLERANCE', '0.01'))
+TABLE_FORMAT_VERSION = 1
+
+MASS_GRID_KG = np.linspace(50000, 600000, 23)
+ALT_GRID_FT = np.arange(25000, 43001, 2000, dtype=float)
+TAS_GRID_KTS = np.arange(350, 601, 25, dtype=float)
+ISA_DEV_GRID_C = np.arange(-40, 101, 5, dtype=float)
+DEFAULT_AXES = (MASS_GRID_KG, ALT_GRID_FT, TAS_GRID_KTS, ISA_DEV_GRID_C)
+
+# --- Section 2: Live OpenAP Access ---
+@functools.lru_cache(maxsize=None)
+def _fuel_flow_model(aircraft_type):
+    from openap import FuelFlow
+    return FuelFlow(ac=aircraft_type, pax=0)
+
+def openap_fuel_flow(aircraft_type, mass_kg, altitude_ft, tas_kts, isa_dev, vs_fpm=0):
+    """Evaluates the live OpenAP model (kg/s), level or with a vertical speed. Accepts scalars or NumPy arrays."""
+    with span('fuel_model.openap'):
+        ff = _fuel_flow_model(aircraft_type)
+        return ff.enroute(mass=mass_kg, tas=tas_kts, alt=altitude_ft, vs=vs_fpm, dT=isa_dev)
+
+# --- Section 3: The Lookup Table ---
+class FuelFlowTable:
+    """Fuel flow (kg/s) for one aircraft type, sampled on a regular 4-D grid."""
+
+    def __init__(self, aircraft_type, axes, values, max_error=float('nan')):
+        self.aircraft_type = aircraft_type
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+        self.values = np.asarray(values, dtype=float)
+        self.max_error = float(max_error)
+        self._lower = np.array([axis[0] for axis in self.axes])
+        self._upper = np.array([axis[-1] for axis in self.axes])
+
+    @classmethod
+    def build(cls, aircraft_type, axes=DEFAULT_AXES):
+        """Samples OpenAP over the full grid in a single vectorized call."""
+        grids = np.meshgrid(*axes, indexing='ij')
+        flow = openap_fuel_flow(aircraft_type, *(grid.ravel() for grid in grids))
+        values = np.broadcast_to(np.asarray(flow, dtype=float), grids[0].size).reshape(grids[0].shape)
+        return cls(aircraft_type, axes, values)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != TABLE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported fuel table version in {path}")
+            axes = (data['mass'], data['alt'], data['tas'], data['isa_dev'])
+            return cls(str(data['aircraft_type']), axes, data['values'], float(data['max_error']))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        mass, alt, tas, isa_dev = self.axes
+        np.savez_compressed(tmp_path, version=TABLE_FORMAT_VERSION, aircraft_type=self.aircraft_type,
+                            mass=mass, alt=alt, tas=tas, isa_dev=isa_dev, values=self.values,
+                            max_error=self.max_error)
+        os.replace(tmp_path, path)
+
+    def validate(self, samples=256, seed=0):
+        """Returns the max relative error against live OpenAP at random off-grid points."""
+        rng = np.random.default_rng(seed)
+        points = [rng.uniform(axis[0], axis[-1], samples) for axis in self.axes]
+        expected = np.asarray(openap_fuel_flow(self.aircraft_type, *points), dtype=float)
+        actual = self._interpolate(points)
+        valid = np.abs(expected) > 1e-9
+        if not valid.any():
+            return 0.0
+        self.max_error = float(np.max(np.abs(actual[valid] - expected[valid]) / np.abs(expected[valid])))
+        return self.max_error
+
+    def contains(self, mass_kg, altitude_ft, tas_kts, isa_dev):
+        points = np.stack(np.broadcast_arrays(mass_kg, altitude_ft, tas_kts, isa_dev), axis=-1)
+        return np.all((points >= self._lower) & (points <= self._upper), axis=-1)
+
+    def fuel_flow(self, mass_kg, altitude_ft, tas_kts, isa_dev):
+        """
+        Interpolated fuel flow in kg/s. Inputs broadcast against each other, so a
+        single call can evaluate many candidate states at once.
+        """
+        points = [np.asarray(p, dtype=float) for p in np.broadcast_arrays(mass_kg, altitude_ft, tas_kts, isa_dev)]
+        shape = points[0].shape
+        points = [p.ravel() for p in points]
+        inside = self.contains(*points)
+        result = np.empty(points[0].shape)
+        if inside.any():
+            result[inside] = self._interpolate([p[inside] for p in points])
+        if not inside.all():
+            outside = ~inside
+            live = openap_fuel_flow(self.aircraft_type, *(p[outside] for p in points))
+            result[outside] = np.broadcast_to(np.asarray(live, dtype=float), outside.sum())
+        return result.reshape(shape)
+
+    def min_fuel_per_nm(self, max_mass_kg, alt_range_ft, tas_range_kts, max_tailwind_kts=0.0):
+        """
+        Lower bound on fuel burned per nautical mile over the ground (kg/nm) for any
+        interpolated state with mass <= max_mass_kg, altitude/TAS inside the given (low, high)
+        ranges and a tailwind of at most `max_tailwind_kts`. Interpolated values are convex
+        combinations of grid values, so the minimum over the enclosing grid cells (divided by
+        each cell's highest ground speed) is a true bound. States outside the grid are answered
+        by live OpenAP, which the grid cannot bound, so then the bound is 0.0.
+        """
+        if not self._covers(max_mass_kg, alt_range_ft, tas_range_kts):
+            return 0.0
+        mass_sel = self._enclosing_nodes(0, self.axes[0][0], max_mass_kg)
+        alt_sel = self._enclosing_nodes(1, *alt_range_ft)
+        tas_sel = self._enclosing_nodes(2, *tas_range_kts)
+        per_tas = self.values[mass_sel, alt_sel, tas_sel].min(axis=(0, 1, 3))
+        tas = self.axes[2][tas_sel]
+        per_cell = np.minimum(per_tas[:-1], per_tas[1:]) / (tas[1:] + max(0.0, max_tailwind_kts))
+        return max(0.0, float(per_cell.min()) * 3600)
+
+    def max_mass_sensitivity_per_nm(self, max_mass_kg, alt_range_ft, tas_range_kts, min_tailwind_kts=0.0):
+        """
+        Upper bound on d(kg/nm)/d(mass) over the ground for interpolated states in the given
+        ranges: the largest mass-axis slope of any enclosing cell, divided by the cell's lowest
+        ground speed (TAS plus the strongest headwind, `min_tailwind_kts` < 0). Carrying an
+        extra kg over `d` nm costs at most `d` times this much extra fuel. inf (no bound) if
+        the ranges leave the grid or the ground speed can reach zero.
+        """
+        if not self._covers(max_mass_kg, alt_range_ft, tas_range_kts):
+            return float('inf')
+        mass_sel = self._enclosing_nodes(0, self.axes[0][0], max_mass_kg)
+        alt_sel = self._enclosing_nodes(1, *alt_range_ft)
+        tas_sel = self._enclosing_nodes(2, *tas_range_kts)
+        values = self.values[mass_sel, alt_sel, tas_sel]
+        slopes = np.diff(values, axis=0) / np.diff(self.axes[0][mass_sel])[:, None, None, None]
+        per_tas = np.maximum(slopes[:, :, :-1], slopes[:, :, 1:]).max(axis=(0, 1, 3))
+        ground_speed = self.axes[2][tas_sel][:-1] + min(0.0, min_tailwind_kts)
+        if ground_speed.min() <= 0:
+            return float('inf')
+        return max(0.0, float((per_tas / ground_speed).max()) * 3600)
+
+    def _covers(self, max_mass_kg, alt_range_ft, tas_range_kts):
+        """Whether masses up to `max_mass_kg` and the altitude/TAS ranges lie inside the grid."""
+        return (max_mass_kg <= self._upper[0] and self._lower[1] <= min(alt_range_ft) and max(alt_range_ft) <= self._upper[1]
+                and self._lower[2] <= min(tas_range_kts) and max(tas_range_kts) <= self._upper[2])
+
+    def _enclosing_nodes(self, axis_idx, low, high):
+        axis = self.axes[axis_idx]
+        first = int(np.clip(np.searchsorted(axis, low, side='right') - 1, 0, len(axis) - 2))
+        last = int(np.clip(np.searchsorted(axis, high, side='right') - 1, 0, len(axis) - 2)) + 1
+        return slice(first, last + 1)
+
+    def _interpolate(self, points):
+        indices, fractions = [], []
+        for axis, x in zip(self.axes, points):
+            i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            indices.append(i)
+            fractions.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+        result = np.zeros(np.shape(points[0]))
+        for corner in itertools.product((0, 1), repeat=len(self.axes)):
+            weight = np.ones_like(result)
+            for bit, t in zip(corner, fractions):
+                weight = weight * (t if bit else 1 - t)
+            result += weight * self.values[tuple(i + bit for i, bit in zip(indices, corner))]
+        return result
+
+# --- Section 4: Lazy, Process-Wide Table Registry ---
+_TABLES = {}
+_TABLES_LOCK = threading.Lock()
+
+def table_path(aircraft_type):
+    return os.path.join(FUEL_TABLE_DIR, f"{aircraft_type}.npz")
+
+def get_fuel_table(aircraft_type):
+    """
+    Returns the lookup table for an aircraft type, loading it from disk or building
+    it on first use. Returns None if the table cannot meet FUEL_TABLE_TOLERANCE, in
+    which case callers should use live OpenAP.
+    """
+    if aircraft_type in _TABLES:
+        return _TABLES[aircraft_type]
+    with _TABLES_LOCK:
+        if aircraft_type in _TABLES:
+            return _TABLES[aircraft_type]
+        table, path = None, table_path(aircraft_type)
+        if os.path.exists(path):
+            try:
+                table = FuelFlowTable.load(path)
+                count('fuel_table.loaded')
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Ignoring unreadable fuel table {path}. Error: {e}")
+        if table is None:
+            table = FuelFlowTable.build(aircraft_type)
+            table.validate()
+            count('fuel_table.built')
+            try:
+                table.save(path)
+            except OSError as e:
+                print(f"Warning: Could not persist fuel table for {aircraft_type}. Error: {e}")
+        if not table.max_error <= FUEL_TABLE_TOLERANCE:
+            print(f"Warning: Fuel table for {aircraft_type} exceeds tolerance "
+                  f"({table.max_error:.4f} > {FUEL_TABLE_TOLERANCE}). Using live OpenAP.")
+            table = None
+        _TABLES[aircraft_type] = table
+        return table
+
+def fuel_flow(aircraft_type, mass_kg, altitude_ft, tas_kts, isa_dev):
+    """Fuel flow in kg/s via the lookup table, or live OpenAP if no table is usable."""
+    scalar = all(np.ndim(x) == 0 for x in (mass_kg, altitude_ft, tas_kts, isa_dev))
+    table = get_fuel_table(aircraft_type)
+    if table is None:
+        result = np.asarray(openap_fuel_flow(aircraft_type, mass_kg, altitude_ft, tas_kts, isa_dev), dtype=float)
+    else:
+        with span('fuel_model.table'):
+            result = table.fuel_flow(mass_kg, altitude_ft, tas_kts, isa_dev)
+    return float(np.ravel(result)[0]) if scalar else result
+
+def min_fuel_per_nm(aircraft_type, max_mass_kg, alt_range_ft, tas_range_kts, max_tailwind_kts=0.0):
+    """Admissible kg per ground nm lower bound for A* heuristics; 0.0 when no table is usable."""
+    table = get_fuel_table(aircraft_type)
+    return 0.0 if table is None else table.min_fuel_per_nm(max_mass_kg, alt_range_ft, tas_range_kts, max_tailwind_kts)
+
+def max_mass_sensitivity_per_nm(aircraft_type, max_mass_kg, alt_range_ft, tas_range_kts, min_tailwind_kts=0.0):
+    """Upper bound on extra kg per ground nm per extra kg of mass; inf when no table is usable (no bound)."""
+    table = get_fuel_table(aircraft_type)
+    return float('inf') if table is None else table.max_mass_sensitivity_per_nm(max_mass_kg, alt_range_ft, tas_range_kts, min_tailwind_kts)
+
+# --- Section 5: Prebuilding Tables ---
+def main(aircraft_types):
+    """
+    Builds and persists the tables for `aircraft_types` into FUEL_TABLE_DIR, e.g. when the
+    container image is built, so that a cold start only has to load them.
+    """
+    for aircraft_type in aircraft_types:
+        try:
+            table = get_fuel_table(aircraft_type)
+        except Exception as e:
+            print(f"Warning: Could not build fuel table for {aircraft_type}; it will use live OpenAP. Error: {e}")
+            continue
+        status = "live OpenAP fallback" if table is None else f"max error {table.max_error:.4f}"
+        print(f"{aircraft_type}: {status} ({table_path(aircraft_type)})")
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Spherical Geometry and Precomputed Waypoint Distances.
+
+Vectorized great-circle helpers shared by the optimizers and free routing, plus
+`WaypointGeometry`: a dense distance/bearing matrix over every known waypoint,
+keyed by integer waypoint IDs. Segment lengths become array lookups instead of
+trigonometry inside the search loops. New waypoints are added incrementally
+(only their rows and columns are computed), and the matrices grow by doubling
+so repeated additions stay cheap.
+"""
+import math
+import threading
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+# --- Section 1: Vectorized Spherical Geometry ---
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def initial_bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial true bearing in degrees from point 1 to point 2; arguments broadcast."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+def destination_point(lat, lon, bearing_deg, distance_km):
+    """Point reached from (lat, lon) after `distance_km` on `bearing_deg`; arguments broadcast."""
+    lat, lon, bearing = np.radians(lat), np.radians(lon), np.radians(bearing_deg)
+    delta = np.asarray(distance_km, dtype=float) / EARTH_RADIUS_KM
+    lat2 = np.arcsin(np.sin(lat) * np.cos(delta) + np.cos(lat) * np.sin(delta) * np.cos(bearing))
+    lon2 = lon + np.arctan2(np.sin(bearing) * np.sin(delta) * np.cos(lat), np.cos(delta) - np.sin(lat) * np.sin(lat2))
+    return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+def midpoint(lat1, lon1, lat2, lon2):
+    """Great-circle midpoint of two points; arguments broadcast and may cross the antimeridian."""
+    phi1, lam1, phi2, lam2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    bx, by = np.cos(phi2) * np.cos(lam2 - lam1), np.cos(phi2) * np.sin(lam2 - lam1)
+    lat = np.arctan2(np.sin(phi1) + np.sin(phi2), np.hypot(np.cos(phi1) + bx, by))
+    lon = lam1 + np.arctan2(by, np.cos(phi1) + bx)
+    return np.degrees(lat), (np.degrees(lon) + 540) % 360 - 180
+
+def intermediate_points(lat1, lon1, lat2, lon2, fractions):
+    """Points at the given fractions along the great circle from point 1 to point 2."""
+    phi1, lam1, phi2, lam2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    delta = haversine_km(lat1, lon1, lat2, lon2) / EARTH_RADIUS_KM
+    f = np.asarray(fractions, dtype=float)
+    if delta < 1e-12:
+        return np.full(f.shape, float(lat1)), np.full(f.shape, float(lon1))
+    a, b = np.sin((1 - f) * delta) / np.sin(delta), np.sin(f * delta) / np.sin(delta)
+    x = a * math.cos(phi1) * math.cos(lam1) + b * math.cos(phi2) * math.cos(lam2)
+    y = a * math.cos(phi1) * math.sin(lam1) + b * math.cos(phi2) * math.sin(lam2)
+    z = a * math.sin(phi1) + b * math.sin(phi2)
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+# --- Section 2: Dense Waypoint Distance/Bearing Matrix ---
+class WaypointGeometry:
+    """
+    Distance (km) and initial bearing (deg) between every pair of known waypoints.
+    `distance_km[i, j]` and `bearing_deg[i, j]` are indexed by the IDs from `id()`/`ids()`.
+    """
+
+    def __init__(self, coordinates=None, initial_capacity=64):
+        self.names, self.index = [], {}
+        self._lock = threading.Lock()
+        self._capacity = initial_capacity
+        self._lats, self._lons = np.zeros(initial_capacity), np.zeros(initial_capacity)
+        self._distance = np.zeros((initial_capacity, initial_capacity))
+        self._bearing = np.zeros((initial_capacity, initial_capacity))
+        if coordinates:
+            self.add_many(coordinates)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def distance_km(self):
+        n = len(self.names)
+        return self._distance[:n, :n]
+
+    @property
+    def bearing_deg(self):
+        n = len(self.names)
+        return self._bearing[:n, :n]
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        n = len(self.names)
+        for name in ('_lats', '_lons'):
+            grown = np.zeros(capacity)
+            grown[:n] = getattr(self, name)[:n]
+            setattr(self, name, grown)
+        for name in ('_distance', '_bearing'):
+            grown = np.zeros((capacity, capacity))
+            grown[:n, :n] = getattr(self, name)[:n, :n]
+            setattr(self, name, grown)
+        self._capacity = capacity
+
+    def add_many(self, coordinates):
+        """
+        Adds {name: (lat, lon)} and returns their IDs. Names already present with the
+        same position keep their ID; moved ones get their rows and columns recomputed.
+        """
+        with self._lock:
+            changed = []
+            for name, (lat, lon) in coordinates.items():
+                i = self.index.get(name)
+                if i is None:
+                    self._grow(len(self.names) + 1)
+                    i = self.index[name] = len(self.names)
+                    self.names.append(name)
+                elif self._lats[i] == lat and self._lons[i] == lon:
+                    continue
+                self._lats[i], self._lons[i] = lat, lon
+                changed.append(i)
+            if changed:
+                n, rows = len(self.names), np.array(changed)
+                lats, lons = self._lats[:n], self._lons[:n]
+                r_lat, r_lon = lats[rows, np.newaxis], lons[rows, np.newaxis]
+                self._distance[rows, :n] = haversine_km(r_lat, r_lon, lats, lons)
+                self._distance[:n, rows] = self._distance[rows, :n].T
+                self._bearing[rows, :n] = initial_bearing_deg(r_lat, r_lon, lats, lons)
+                self._bearing[:n, rows] = initial_bearing_deg(lats[:, np.newaxis], lons[:, np.newaxis], r_lat.T, r_lon.T)
+            return [self.index[name] for name in coordinates]
+
+    def add(self, name, lat, lon):
+        return self.add_many({name: (lat, lon)})[0]
+
+    def sync(self, coordinates):
+        """
+        Adds names in `coordinates` not yet known. Only the sizes are compared, so this is
+        O(1) when nothing was added; use add_many() to move an existing waypoint.
+        """
+        if len(coordinates) != len(self.names):
+            self.add_many({name: coordinates[name] for name in coordinates if name not in self.index})
+
+    def id(self, name):
+        return self.index[name]
+
+    def ids(self, names):
+        return np.fromiter((self.index[name] for name in names), dtype=np.intp, count=len(names))
+
+    def segment_distances_km(self, names):
+        """Lengths of the consecutive legs of a waypoint sequence, as an array."""
+        ids = self.ids(names)
+        return self._distance[ids[:-1], ids[1:]]
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Per-Flight Instrumentation: Stage Timings, Counters and EMF Logs.
+
+`flight_trace(flight_id)` opens a trace for one flight. While it is open, `span(name)`
+(or the `@traced()` decorator) adds wall time and a call to a named stage and
+`count(name, n)` bumps a counter, from anywhere the flight's workflow calls. The trace
+lives in a context variable, so flights running concurrently on handler threads are
+kept apart. When the trace closes it is printed as one JSON line in CloudWatch
+Embedded Metric Format (EMF), which CloudWatch Logs turns into metrics without any
+API calls. Disabled (the default), `span` hands back a shared no-op context manager
+and `count` returns at once, so instrumented code pays a flag check per call.
+
+Configuration (environment variables):
+    METRICS_ENABLED     Record and log a trace per flight (default: false).
+    METRICS_NAMESPACE   CloudWatch namespace of the EMF metrics (default: FuelOptimization).
+    PROFILE_FLIGHTS     cProfile traced flights: 'true' for every flight, or comma-separated flight IDs.
+    PROFILE_DIR         Directory for the .prof files (default: <tmp>/profiles).
+"""
+import os
+import json
+import time
+import tempfile
+import functools
+import contextlib
+import contextvars
+from collections import Counter
+
+# --- Section 1: Configuration ---
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'FuelOptimization')
+PROFILE_FLIGHTS = os.getenv('PROFILE_FLIGHTS', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+SERVICE_NAME = 'fuel-optimization-agent'
+
+_CURRENT_TRACE = contextvars.ContextVar('flight_trace', default=None)
+_NULL_SPAN = contextlib.nullcontext()
+
+# --- Section 2: Traces and Spans ---
+class Trace:
+    """Stage timings (ms and calls, summed per name), counters and properties of one flight."""
+
+    def __init__(self, flight_id):
+        self.flight_id = flight_id
+        self.spans_ms, self.calls, self.counters = Counter(), Counter(), Counter()
+        self.properties = {}
+
+    def hit_rates(self):
+        """Hit rate of every counter family with `<prefix>.hits` or `<prefix>.misses` counters."""
+        rates = {}
+        for prefix in {name.rsplit('.', 1)[0] for name in self.counters if name.endswith(('.hits', '.misses'))}:
+            hits = self.counters.get(f'{prefix}.hits', 0) + self.counters.get(f'{prefix}.stale_hits', 0)
+            lookups = hits + self.counters.get(f'{prefix}.misses', 0)
+            rates[f'{prefix}.hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return rates
+
+    def record(self, namespace=METRICS_NAMESPACE):
+        """The trace as an EMF log record: timings, calls, counters and hit rates as metrics."""
+        metrics = {f'{name}.ms': round(ms, 3) for name, ms in self.spans_ms.items()}
+        metrics.update({f'{name}.calls': calls for name, calls in self.calls.items()})
+        metrics.update(self.counters)
+        metrics.update(self.hit_rates())
+        units = {'.ms': 'Milliseconds', '.hit_rate': 'None'}
+        definitions = [{'Name': name, 'Unit': next((unit for suffix, unit in units.items() if name.endswith(suffix)), 'Count')}
+                       for name in metrics]
+        return {'_aws': {'Timestamp': int(time.time() * 1000),
+                         'CloudWatchMetrics': [{'Namespace': namespace, 'Dimensions': [['Service']], 'Metrics': definitions}]},
+                'Service': SERVICE_NAME, 'flight_id': self.flight_id, **self.properties, **metrics}
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace, self.name = trace, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.spans_ms[self.name] += 1000 * (time.perf_counter() - self.start)
+        self.trace.calls[self.name] += 1
+        return False
+
+def current_trace():
+    """The open trace of this flight, or None (also whenever metrics are disabled)."""
+    return _CURRENT_TRACE.get() if METRICS_ENABLED else None
+
+def span(name):
+    """Context manager timing one call of stage `name` in the open trace; a no-op without one."""
+    trace = current_trace()
+    return _NULL_SPAN if trace is None else _Span(trace, name)
+
+def traced(name=None):
+    """Decorator running every call of a function inside `span(name or function.__name__)`."""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    """Adds `n` to counter `name` of the open trace."""
+    trace = current_trace()
+    if trace is not None:
+        trace.counters[name] += n
+
+def count_stats(stats, prefix):
+    """Adds every numeric value of a stats dict (e.g. search stats) as `<prefix>.<key>` counters."""
+    trace = current_trace()
+    if trace is not None:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                trace.counters[f'{prefix}.{key}'] += value
+
+def set_property(name, value):
+    """Attaches a non-metric field (e.g. aircraft type, status) to the open trace's log record."""
+    trace = current_trace()
+    if trace is not None:
+        trace.properties[name] = value
+
+# --- Section 3: Per-Flight Traces and the cProfile Hook ---
+def _start_profiler(flight_id):
+    flights = [f.strip() for f in PROFILE_FLIGHTS.split(',') if f.strip()]
+    if not (PROFILE_FLIGHTS.lower() == 'true' or flight_id in flights):
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:  # Another profiler is active, e.g. for a concurrent flight on Python 3.12+.
+        print(f"Warning: Not profiling flight {flight_id}. Error: {e}")
+        return None
+    return profiler
+
+def _save_profile(profiler, flight_id):
+    profiler.disable()
+    path = os.path.join(PROFILE_DIR, f"{flight_id}-{int(time.time() * 1000)}.prof")
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(path)
+    except OSError as e:
+        print(f"Warning: Could not write profile for flight {flight_id}. Error: {e}")
+        return None
+    print(f"cProfile for flight {flight_id} written to {path}")
+    return path
+
+def emit(record):
+    """Writes an EMF record as a single stdout line (CloudWatch Logs on Lambda)."""
+    print(json.dumps(record, default=str))
+
+@contextlib.contextmanager
+def flight_trace(flight_id, sink=emit):
+    """
+    Traces one flight: yields its Trace (None when metrics are disabled), times the whole
+    block as stage 'flight', and passes the EMF record to `sink` on exit. Flights listed
+    in PROFILE_FLIGHTS are also run under cProfile and the .prof path is logged.
+    """
+    profiler = _start_profiler(flight_id)
+    trace = Trace(flight_id) if METRICS_ENABLED else None
+    token = _CURRENT_TRACE.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+        profile_path = _save_profile(profiler, flight_id) if profiler is not None else None
+        if trace is not None:
+            trace.spans_ms['flight'] += 1000 * (time.perf_counter() - start)
+            trace.calls['flight'] += 1
+            if profile_path:
+                trace.properties['profile_path'] = profile_path
+            sink(trace.record())
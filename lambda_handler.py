@@ -4,23 +4,40 @@ Airline Fuel Optimization Agent - End-to-End Platform-Independent Script.
 
 This script has been refactored to be callable from other modules,
 such as an AWS Lambda handler, while retaining its command-line functionality.
+
+Heavy dependencies load on first use so they stay off the cold-start path: strands
+when an agent is first built, boto3 with the first SQS publish, requests with the
+first weather request. The agents, the SQS client, the plan store and the fuel
+tables are process-wide and reused by warm invocations.
 """
 # --- Section 0: All Necessary Imports ---
 import os
 import json
-import heapq
 import math
 import argparse
 import sys
-import pandas as pd
-import boto3
-import requests
-from dotenv import load_dotenv
-from strands import Agent, tool
-from openap import FuelFlow
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from baseline_cache import BaselineCache
+from fuel_tables import fuel_flow, min_fuel_per_nm, max_mass_sensitivity_per_nm
+from flight_plan_store import FlightPlanStore, iter_flight_plans
+from free_routing import free_route_search
+from geometry import WaypointGeometry, midpoint, initial_bearing_deg
+from instrumentation import traced, count_stats, set_property, flight_trace
+from level_transitions import get_transition_table, unlock_indices, MIN_LEVEL_SEGMENT_NM, MAX_STEP_CHANGES
+from optimizer import a_star_profile_search, pareto_profile_search
+from sqs_publisher import create_publisher
+from weather_cache import WeatherCache
+from weather_client import ConcurrentWeatherClient
+from weather_providers import default_weather_provider
+from wind_grid import get_wind_grid
 
 # --- Section 1: Environment and Configuration ---
-load_dotenv()
+# Lambda configures the function environment directly; .env files are for local runs.
+if not os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # --- Section 2: Data Sources and Constants ---
 WAYPOINT_COORDINATES = {
@@ -36,6 +53,32 @@ WAYPOINT_COORDINATES = {
     'WSSS': (1.3644, 103.9915), 'NZAA': (-37.0082, 174.7917)
 }
 FLIGHT_LEVELS = [290, 310, 330, 350, 370, 390]
+FLIGHT_LEVEL_ALTITUDES_FT = np.array(FLIGHT_LEVELS, dtype=float) * 100
+MASS_BUCKET_KG = float(os.getenv('MASS_BUCKET_KG', '250'))  # Search states closer in mass than this are merged.
+# Profiles may not burn below the zero-fuel mass: the plan's `zero_fuel_mass_kg`, else this share of the
+# takeoff mass. The default is a loose floor that only rejects physically impossible burns.
+ZERO_FUEL_MASS_FRACTION = float(os.getenv('ZERO_FUEL_MASS_FRACTION', '0.25'))
+CRUISE_TAS_KTS = 450
+# Fuel/time trade-off: with a cost index (kg of fuel one minute is worth) the search also picks
+# a cruise speed per leg from CRUISE_SPEED_OPTIONS_KTS and minimizes fuel + cost_index x minutes.
+COST_INDEX_KG_PER_MIN = float(os.environ['COST_INDEX_KG_PER_MIN']) if os.getenv('COST_INDEX_KG_PER_MIN') else None
+CRUISE_SPEED_OPTIONS_KTS = [int(v) for v in os.getenv('CRUISE_SPEED_OPTIONS_KTS', '430,450,470,490').split(',')]
+PARETO_FRONT_ENABLED = os.getenv('PARETO_FRONT', 'false').lower() == 'true'
+PARETO_EPSILON = (float(os.getenv('PARETO_FUEL_EPS_KG', '25')), float(os.getenv('PARETO_TIME_EPS_MIN', '0.5')))
+PARETO_MAX_POINTS = int(os.getenv('PARETO_MAX_POINTS', '20'))  # Keeps the published front well inside SQS message limits.
+# What-if sweeps: takeoff masses (offsets from the planned mass) x weather members, optimized together.
+WHAT_IF_MASS_OFFSETS_KG = [float(v) for v in os.getenv('WHAT_IF_MASS_OFFSETS_KG', '').split(',') if v.strip()]
+WHAT_IF_WEATHER_MEMBERS = int(os.getenv('WHAT_IF_WEATHER_MEMBERS', '1'))
+WHAT_IF_WIND_SD_KTS = float(os.getenv('WHAT_IF_WIND_SD_KTS', '10'))
+WHAT_IF_TEMP_SD_C = float(os.getenv('WHAT_IF_TEMP_SD_C', '2'))
+
+FLIGHT_PLAN_STORE = FlightPlanStore()
+GEOMETRY = WaypointGeometry(WAYPOINT_COORDINATES)  # Dense distance/bearing matrix keyed by waypoint ID.
+WEATHER_CACHE = WeatherCache()
+BASELINE_CACHE = BaselineCache()  # Constant-FL350 baselines keyed by (aircraft type, mass, waypoints).
+WEATHER_CLIENT = ConcurrentWeatherClient()
+WEATHER_PROVIDER = default_weather_provider(WEATHER_CLIENT, WEATHER_CACHE)
+RECOMMENDATION_PUBLISHER = create_publisher(os.getenv('SQS_OUTPUT_QUEUE_URL'))
 
 # --- Section 3: Core Logic and Helper Functions ---
 def haversine(lat1, lon1, lat2, lon2):
@@ -48,119 +91,570 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
 
-def calculate_fuel_burn(aircraft_type, mass_kg, altitude_ft, distance_km, tas_kts, temperature_c):
-    ff = FuelFlow(ac=aircraft_type, pax=0)
-    params = {'mass': mass_kg, 'alt': altitude_ft, 'tas': tas_kts, 'isa_dev': temperature_c - (15 - (altitude_ft / 1000 * 2))}
-    fuel_flow_kg_s = ff.enroute(**params)
-    time_hours = (distance_km / 1.852) / tas_kts
+def zero_fuel_mass_kg(flight_plan):
+    """The plan's zero-fuel mass (kg): `zero_fuel_mass_kg` if given, else ZERO_FUEL_MASS_FRACTION of the takeoff mass."""
+    zero_fuel_mass = flight_plan.get('zero_fuel_mass_kg')
+    return zero_fuel_mass if zero_fuel_mass is not None else ZERO_FUEL_MASS_FRACTION * flight_plan['initial_mass_kg']
+
+def segment_distances_km(waypoints):
+    """Leg lengths of a waypoint sequence, read from the precomputed distance matrix."""
+    GEOMETRY.sync(WAYPOINT_COORDINATES)
+    return GEOMETRY.segment_distances_km(waypoints)
+
+def calculate_fuel_burn(aircraft_type, mass_kg, altitude_ft, distance_km, tas_kts, temperature_c, ground_speed_kts=None):
+    """
+    Fuel burned (kg) over a segment: fuel flow at the true airspeed, for the time the segment
+    takes at `ground_speed_kts` (TAS plus tailwind; still air if omitted). Array arguments
+    broadcast and return an array.
+    """
+    isa_dev = temperature_c - (15 - (altitude_ft / 1000 * 2))
+    fuel_flow_kg_s = fuel_flow(aircraft_type, mass_kg, altitude_ft, tas_kts, isa_dev)
+    time_hours = (distance_km / 1.852) / (tas_kts if ground_speed_kts is None else ground_speed_kts)
     return fuel_flow_kg_s * time_hours * 3600
 
-def a_star_search(flight_plan, weather_data):
-    start_node = (flight_plan['waypoints'][0], FLIGHT_LEVELS[3], flight_plan['initial_mass_kg'])
-    open_set = [(0, start_node)]
-    came_from = {}
-    g_score = { (wp, fl): float('inf') for wp in flight_plan['waypoints'] for fl in FLIGHT_LEVELS }
-    g_score[(start_node[0], start_node[1])] = 0
-    mass_at_node = { (start_node[0], start_node[1]): flight_plan['initial_mass_kg'] }
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        current_wp, current_fl, current_mass = current[0], current[1], mass_at_node[(current[0], current[1])]
-        if current_wp == flight_plan['destination_airport']:
-            path, total_fuel = [], 0
-            while (current_wp, current_fl) in came_from:
-                prev_wp, prev_fl = came_from[(current_wp, current_fl)]
-                path.append({'waypoint': current_wp, 'flight_level': current_fl})
-                total_fuel += g_score[(current_wp, current_fl)] - g_score[(prev_wp, prev_fl)]
-                current_wp, current_fl = prev_wp, prev_fl
-            path.append({'waypoint': start_node[0], 'flight_level': start_node[1]})
-            return list(reversed(path)), total_fuel
-        current_wp_idx = flight_plan['waypoints'].index(current_wp)
-        if current_wp_idx + 1 >= len(flight_plan['waypoints']): continue
-        next_wp = flight_plan['waypoints'][current_wp_idx + 1]
-        for next_fl in FLIGHT_LEVELS:
-            lat1, lon1 = WAYPOINT_COORDINATES[current_wp]
-            lat2, lon2 = WAYPOINT_COORDINATES[next_wp]
-            distance_km = haversine(lat1, lon1, lat2, lon2)
-            weather = weather_data.get(next_wp, {})
-            temp_c, wind_speed_kts, tas_kts = weather.get('temperature_c', 15), weather.get('wind_speed_kts', 0), 450
-            ground_speed_kts = tas_kts + wind_speed_kts
-            fuel_burned = calculate_fuel_burn(flight_plan['aircraft_type'], current_mass, next_fl * 100, distance_km, ground_speed_kts, temp_c)
-            tentative_g_score = g_score[(current_wp, current_fl)] + fuel_burned
-            if tentative_g_score < g_score.get((next_wp, next_fl), float('inf')):
-                came_from[(next_wp, next_fl)], g_score[(next_wp, next_fl)] = (current_wp, current_fl), tentative_g_score
-                mass_at_node[(next_wp, next_fl)] = current_mass - fuel_burned
-                heapq.heappush(open_set, (tentative_g_score, (next_wp, next_fl)))
-    return None, float('inf')
+def segment_weather(from_wp, to_wp, weather_data):
+    """
+    Tailwind (kts) and temperature (°C) for a segment: per flight level from the wind grid
+    at the segment midpoint when one is loaded, else the scalars of `to_wp`'s weather record.
+    """
+    wind_grid = get_wind_grid()
+    if wind_grid is not None:
+        (lat1, lon1), (lat2, lon2) = WAYPOINT_COORDINATES[from_wp], WAYPOINT_COORDINATES[to_wp]
+        mid_lat, mid_lon = midpoint(lat1, lon1, lat2, lon2)
+        return wind_grid.along_track(mid_lat, mid_lon, initial_bearing_deg(mid_lat, mid_lon, lat2, lon2), FLIGHT_LEVELS)
+    weather = weather_data.get(to_wp, {})
+    return weather.get('wind_speed_kts', 0), weather.get('temperature_c', 15)
+
+def route_weather(waypoints, weather_data):
+    """
+    segment_weather for every leg of a route at once: (tailwind_kts, temp_c), each shaped
+    (legs, len(FLIGHT_LEVELS)). The midpoints, bearings and grid interpolation of all legs
+    are one vectorized pass, so searches compute this once and index a row per expansion.
+    """
+    wind_grid = get_wind_grid()
+    shape = (len(waypoints) - 1, len(FLIGHT_LEVELS))
+    if wind_grid is not None:
+        coords = np.array([WAYPOINT_COORDINATES[wp] for wp in waypoints], dtype=float).reshape(-1, 2)
+        (lat1, lon1), (lat2, lon2) = coords[:-1].T, coords[1:].T
+        mid_lat, mid_lon = midpoint(lat1, lon1, lat2, lon2)
+        bearing = initial_bearing_deg(mid_lat, mid_lon, lat2, lon2)
+        tailwind_kts, temp_c = wind_grid.along_track(mid_lat[:, np.newaxis], mid_lon[:, np.newaxis], bearing[:, np.newaxis], FLIGHT_LEVELS)
+        return np.broadcast_to(tailwind_kts, shape), np.broadcast_to(temp_c, shape)
+    records = [weather_data.get(wp, {}) for wp in waypoints[1:]]
+    tailwind_kts = np.array([record.get('wind_speed_kts', 0) for record in records], dtype=float).reshape(-1, 1)
+    temp_c = np.array([record.get('temperature_c', 15) for record in records], dtype=float).reshape(-1, 1)
+    return np.broadcast_to(tailwind_kts, shape), np.broadcast_to(temp_c, shape)
+
+def segment_options(aircraft_type, mass_kg, from_wp, to_wp, weather_data, distance_km=None, tas_kts=(CRUISE_TAS_KTS,), weather=None):
+    """
+    Fuel burned (kg) and flight time (minutes) from `from_wp` to `to_wp` at every candidate
+    flight level and cruise speed, in one array operation. `mass_kg` may be a scalar (one
+    search state) or a 1-D array (all frontier states at the same waypoint); fuel has shape
+    (..., len(FLIGHT_LEVELS), len(tas_kts)) and minutes (len(FLIGHT_LEVELS), len(tas_kts)).
+    With a wind grid loaded, each level uses the tailwind component along the segment
+    bearing and the temperature at that level, sampled at the segment midpoint.
+    Searches pass `distance_km` from segment_distances_km and the leg's (tailwind, temperature)
+    rows of route_weather as `weather`; otherwise both are looked up.
+    """
+    if distance_km is None:
+        GEOMETRY.sync(WAYPOINT_COORDINATES)
+        distance_km = GEOMETRY.distance_km[GEOMETRY.id(from_wp), GEOMETRY.id(to_wp)]
+    tailwind_kts, temp_c = weather if weather is not None else segment_weather(from_wp, to_wp, weather_data)
+    # Levels along the second-to-last axis, speeds along the last.
+    tas_kts = np.asarray(tas_kts, dtype=float)
+    ground_speed_kts = tas_kts + np.reshape(tailwind_kts, (-1, 1))
+    temp_c = np.reshape(temp_c, (-1, 1))
+    masses = np.asarray(mass_kg, dtype=float)[..., np.newaxis, np.newaxis]
+    fuel = calculate_fuel_burn(aircraft_type, masses, FLIGHT_LEVEL_ALTITUDES_FT[:, np.newaxis], distance_km, tas_kts, temp_c, ground_speed_kts)
+    minutes = np.broadcast_to((distance_km / 1.852) / ground_speed_kts * 60, fuel.shape[-2:])
+    return fuel, minutes
+
+def segment_fuel_burns(aircraft_type, mass_kg, from_wp, to_wp, weather_data, distance_km=None, weather=None):
+    """
+    Fuel burned (kg) from `from_wp` to `to_wp` at every candidate flight level at the
+    standard cruise speed; the result has shape (..., len(FLIGHT_LEVELS)). See segment_options.
+    """
+    return segment_options(aircraft_type, mass_kg, from_wp, to_wp, weather_data, distance_km, weather=weather)[0][..., 0]
+
+def tailwind_range_kts(weather_data):
+    """(strongest headwind as a negative tailwind or 0, strongest tailwind or 0) any segment can see, given the weather source in play."""
+    wind_grid = get_wind_grid()
+    winds = [-wind_grid.max_wind_kts, wind_grid.max_wind_kts] if wind_grid is not None else [w.get('wind_speed_kts', 0) for w in weather_data.values()] or [0]
+    return min(0, *winds), max(0, *winds)
+
+def build_heuristic(flight_plan, weather_data, tas_kts=(CRUISE_TAS_KTS,)):
+    """
+    Admissible A* heuristic per waypoint index: the remaining great-circle distance
+    (suffix sum of segment lengths) times the aircraft's minimum burn per ground km over
+    all flight levels, masses up to the take-off mass, the cruise speeds in play and the
+    strongest tailwind. It ignores time, so it also bounds fuel + cost index x time.
+    """
+    segment_km = segment_distances_km(flight_plan['waypoints'])
+    remaining_km = np.append(np.cumsum(segment_km[::-1])[::-1], 0.0)
+    min_kg_per_nm = min_fuel_per_nm(flight_plan['aircraft_type'], flight_plan['initial_mass_kg'], (FLIGHT_LEVEL_ALTITUDES_FT[0], FLIGHT_LEVEL_ALTITUDES_FT[-1]),
+                                    (min(tas_kts), max(tas_kts)), max_tailwind_kts=tailwind_range_kts(weather_data)[1])
+    return (remaining_km * min_kg_per_nm / 1.852).tolist()
+
+def build_mass_penalty(flight_plan, weather_data, tas_kts=(CRUISE_TAS_KTS,)):
+    """
+    Per waypoint index, an upper bound on the extra fuel burned to the destination per
+    extra kg carried (remaining distance x the fuel table's steepest kg/nm-per-kg slope).
+    A state that is lighter by `dm` kg can therefore save at most `penalty * dm` kg later.
+    """
+    segment_km = segment_distances_km(flight_plan['waypoints'])
+    remaining_nm = np.append(np.cumsum(segment_km[::-1])[::-1], 0.0) / 1.852
+    slope = max_mass_sensitivity_per_nm(flight_plan['aircraft_type'], flight_plan['initial_mass_kg'], (FLIGHT_LEVEL_ALTITUDES_FT[0], FLIGHT_LEVEL_ALTITUDES_FT[-1]),
+                                        (min(tas_kts), max(tas_kts)), min_tailwind_kts=tailwind_range_kts(weather_data)[0])
+    return (remaining_nm * slope).tolist() if math.isfinite(slope) else [float('inf')] * len(remaining_nm)
+
+@traced()
+def a_star_search(flight_plan, weather_data, stats=None, mass_bucket_kg=None, dominance=True, step_climbs=True, cost_index=None):
+    """
+    A* over (waypoint index, flight level, mass bucket), using the shared search core in
+    optimizer.py. Paths reaching the same waypoint and level with different remaining mass
+    stay separate states unless they fall in the same `mass_bucket_kg` bucket, so later
+    burns use each path's own mass. A state is pruned when another state at the same
+    waypoint/level dominates it: lower fuel so far by more than being heavier can cost
+    later (see build_mass_penalty). With `step_climbs`, level changes after the initial
+    cruise level pay their climb fuel from the transition table, must be at least
+    MIN_LEVEL_SEGMENT_NM apart and number at most MAX_STEP_CHANGES. With a `cost_index`
+    (kg per minute), each leg also picks a speed from CRUISE_SPEED_OPTIONS_KTS and the
+    search minimizes fuel + cost_index x minutes; route entries then carry `tas_kts`.
+    Profiles that would burn below the zero-fuel mass are infeasible (no path is returned).
+    If a `stats` dict is given it receives expansion, push and pruning counts.
+    Returns (path, total_fuel).
+    """
+    waypoints, aircraft_type = flight_plan['waypoints'], flight_plan['aircraft_type']
+    speeds = CRUISE_SPEED_OPTIONS_KTS if cost_index is not None else (CRUISE_TAS_KTS,)
+    heuristic = build_heuristic(flight_plan, weather_data, speeds)
+    penalty = build_mass_penalty(flight_plan, weather_data, speeds) if dominance else None
+    if penalty is not None and not math.isfinite(penalty[0]): penalty = None  # No fuel table: no bound, keep every bucket.
+    segment_km = segment_distances_km(waypoints).tolist()
+    tailwind_kts, temp_c = route_weather(waypoints, weather_data)
+    step_rules = {}
+    if step_climbs:
+        transition = get_transition_table(aircraft_type, FLIGHT_LEVEL_ALTITUDES_FT)
+        step_rules = {'transition_cost': transition.row, 'max_steps': MAX_STEP_CHANGES,
+                      'unlock': unlock_indices(np.asarray(segment_km) / 1.852, MIN_LEVEL_SEGMENT_NM)}
+        if penalty is not None:  # Each level change still to come can also cost more for a heavier state.
+            penalty = [p + transition.max_mass_slope() * min(MAX_STEP_CHANGES, len(waypoints) - 1 - i) for i, p in enumerate(penalty)]
+
+    def leg_choice(i, mass):
+        """Per level (and per mass, for an array): (cost, fuel, speed index) of the cheapest speed for the leg i -> i+1."""
+        fuel, minutes = segment_options(aircraft_type, mass, waypoints[i], waypoints[i + 1], weather_data, segment_km[i], speeds, (tailwind_kts[i], temp_c[i]))
+        cost = fuel + (cost_index or 0.0) * minutes
+        best = np.argmin(cost, axis=-1)[..., np.newaxis]
+        return np.take_along_axis(cost, best, -1)[..., 0], np.take_along_axis(fuel, best, -1)[..., 0], best[..., 0]
+
+    def leg_costs(i, mass, levels):
+        cost, fuel, _ = leg_choice(i, mass)
+        levels = list(levels)
+        index = (np.arange(len(levels)), levels) if np.ndim(mass) else levels  # A list of masses has one per level.
+        return zip(cost[index].tolist(), fuel[index].tolist())
+
+    pool, goal, _ = a_star_profile_search(len(waypoints), len(FLIGHT_LEVELS), FLIGHT_LEVELS.index(350), flight_plan['initial_mass_kg'], leg_costs, heuristic,
+                                          mass_penalty=penalty, mass_bucket_kg=mass_bucket_kg or MASS_BUCKET_KG, min_mass_kg=zero_fuel_mass_kg(flight_plan),
+                                          stats=stats, **step_rules)
+    if goal is None: return None, float('inf')
+    nodes = pool.path(goal)
+    path = [{'waypoint': waypoints[pool.waypoint[n]], 'flight_level': FLIGHT_LEVELS[pool.level[n]]} for n in nodes]
+    if cost_index is not None:
+        for i, (parent, node) in enumerate(zip(nodes, nodes[1:])):
+            path[i + 1]['tas_kts'] = speeds[int(leg_choice(i, pool.mass[parent])[2][pool.level[node]])]
+    return path, flight_plan['initial_mass_kg'] - pool.mass[goal]
+
+def dp_search(flight_plan, weather_data, stats=None):
+    """
+    Stage-wise dynamic programming over the layered (waypoint index x flight level) graph.
+    Every plan is a fixed waypoint sequence, so each layer can be relaxed from the previous
+    one with dense arrays instead of a heap; mass is carried per cell. Level changes after
+    the first leg pay the same transition fuel as in a_star_search, but the step-climb limits
+    need each path's history and are not enforced here. Cells whose fuel exceeds the fuel on
+    board (takeoff minus zero-fuel mass) are infeasible. Returns the same (path, total_fuel)
+    structure as a_star_search.
+    """
+    waypoints, aircraft_type = flight_plan['waypoints'], flight_plan['aircraft_type']
+    n_wp, n_fl = len(waypoints), len(FLIGHT_LEVELS)
+    cost = np.full((n_wp, n_fl), np.inf)
+    mass = np.zeros((n_wp, n_fl))
+    parent = np.full((n_wp, n_fl), -1, dtype=np.intp)
+    start_fl_idx = FLIGHT_LEVELS.index(350)
+    cost[0, start_fl_idx], mass[0, start_fl_idx] = 0, flight_plan['initial_mass_kg']
+    columns = np.arange(n_fl)
+    segment_km = segment_distances_km(waypoints)
+    tailwind_kts, temp_c = route_weather(waypoints, weather_data)
+    transition = get_transition_table(aircraft_type, FLIGHT_LEVEL_ALTITUDES_FT)
+    fuel_on_board = flight_plan['initial_mass_kg'] - zero_fuel_mass_kg(flight_plan)
+    for i in range(n_wp - 1):
+        reachable = np.isfinite(cost[i])
+        burns = np.full((n_fl, n_fl), np.inf)
+        burns[reachable] = segment_fuel_burns(aircraft_type, mass[i, reachable], waypoints[i], waypoints[i + 1], weather_data, segment_km[i],
+                                              weather=(tailwind_kts[i], temp_c[i]))
+        total = cost[i][:, np.newaxis] + burns
+        if i > 0: total += transition.row(columns, mass[i])
+        best = np.argmin(total, axis=0)
+        parent[i + 1], cost[i + 1] = best, total[best, columns]
+        mass[i + 1] = mass[i, best] - burns[best, columns]
+        cost[i + 1, cost[i + 1] > fuel_on_board] = np.inf
+    if stats is not None: stats.update(nodes_expanded=int(n_wp * n_fl), nodes_pushed=0)
+    fl_idx = int(np.argmin(cost[-1]))
+    if not np.isfinite(cost[-1, fl_idx]):
+        return None, float('inf')
+    total_fuel, path = float(cost[-1, fl_idx]), []
+    for i in range(n_wp - 1, -1, -1):
+        path.append({'waypoint': waypoints[i], 'flight_level': FLIGHT_LEVELS[fl_idx]})
+        fl_idx = parent[i, fl_idx]
+    return list(reversed(path)), total_fuel
+
+def free_routing_search(flight_plan, weather_data, stats=None, corridor=None):
+    """
+    A* over a lateral corridor around the origin-destination great circle, ignoring the fixed
+    waypoint list. Level changes pay their climb fuel from the transition table. `corridor`
+    overrides the free_routing CORRIDOR_* settings: {'half_width_km', 'lateral_spacing_km',
+    'station_spacing_km', 'max_lateral_step'}.
+    """
+    return free_route_search(flight_plan, weather_data, WAYPOINT_COORDINATES, FLIGHT_LEVELS, calculate_fuel_burn, start_level=350, wind_grid=get_wind_grid(),
+                             min_mass_kg=zero_fuel_mass_kg(flight_plan), transition_cost=get_transition_table(flight_plan['aircraft_type'], FLIGHT_LEVEL_ALTITUDES_FT).row,
+                             stats=stats, **(corridor or {}))
+
+@traced()
+def pareto_front_search(flight_plan, weather_data, epsilon=PARETO_EPSILON, max_points=PARETO_MAX_POINTS):
+    """
+    The fuel/time Pareto front over altitude and speed profiles, from one sweep of
+    optimizer.pareto_profile_search. Returned column-wise for compact publishing:
+    {'fuel_kg': [...], 'time_min': [...], 'profiles': [...]}, ordered by fuel and capped at
+    `max_points`, where each profile lists [leg index, flight level, TAS] only where the
+    level or speed changes.
+    Transition fuel is charged as in a_star_search; step-climb limits are not applied.
+    """
+    waypoints, aircraft_type = flight_plan['waypoints'], flight_plan['aircraft_type']
+    segment_km = segment_distances_km(waypoints).tolist()
+    tailwind_kts, temp_c = route_weather(waypoints, weather_data)
+    leg_options = lambda i, masses: segment_options(aircraft_type, masses, waypoints[i], waypoints[i + 1], weather_data, segment_km[i], CRUISE_SPEED_OPTIONS_KTS,
+                                                    (tailwind_kts[i], temp_c[i]))
+    points = pareto_profile_search(len(waypoints), len(FLIGHT_LEVELS), FLIGHT_LEVELS.index(350), flight_plan['initial_mass_kg'], leg_options,
+                                   transition_cost=get_transition_table(aircraft_type, FLIGHT_LEVEL_ALTITUDES_FT).row, epsilon=epsilon, max_points=max_points,
+                                   max_fuel_kg=flight_plan['initial_mass_kg'] - zero_fuel_mass_kg(flight_plan))
+    front = {'fuel_kg': [], 'time_min': [], 'profiles': []}
+    for fuel, minutes, levels, options in points:
+        legs = [[FLIGHT_LEVELS[level], CRUISE_SPEED_OPTIONS_KTS[option]] for level, option in zip(levels[1:], options)]
+        front['fuel_kg'].append(round(fuel))
+        front['time_min'].append(round(minutes, 1))
+        front['profiles'].append([[i] + leg for i, leg in enumerate(legs) if i == 0 or leg != legs[i - 1]])
+    return front
+
+def route_minutes(flight_plan, weather_data, route):
+    """Flight time (minutes) of an optimized route over the plan's waypoints, at each leg's level and speed."""
+    total = 0.0
+    for prev, step in zip(route, route[1:]):
+        _, minutes = segment_options(flight_plan['aircraft_type'], flight_plan['initial_mass_kg'], prev['waypoint'], step['waypoint'],
+                                     weather_data, tas_kts=(step.get('tas_kts', CRUISE_TAS_KTS),))
+        total += float(minutes[FLIGHT_LEVELS.index(step['flight_level']), 0])
+    return total
+
+def compute_baseline_profile(aircraft_type, initial_mass_kg, waypoints, tolerance_kg=1e-3, max_iterations=50):
+    """
+    Fuel (kg) and time (minutes) of the constant-FL350 baseline at CRUISE_TAS_KTS and 15 °C,
+    in still air. Each segment's burn depends on the mass left after the previous ones, so
+    instead of walking the segments one fuel-flow call at a time this evaluates all of them
+    at once and re-derives the masses from the cumulative burn until they move by less than
+    `tolerance_kg` (mass barely changes fuel flow, so a handful of passes converge).
+    With a 1-D array of takeoff masses, all of them are evaluated together and fuel is an array.
+    """
+    distances_km = segment_distances_km(waypoints)
+    initial = np.asarray(initial_mass_kg, dtype=float)[..., np.newaxis]
+    masses = np.broadcast_to(initial, initial.shape[:-1] + distances_km.shape)
+    for _ in range(max_iterations):
+        burns = calculate_fuel_burn(aircraft_type, masses, 35000, distances_km, CRUISE_TAS_KTS, 15)
+        updated = initial - (np.cumsum(burns, axis=-1) - burns)  # Mass at the start of each segment.
+        converged = np.max(np.abs(updated - masses), initial=0.0) < tolerance_kg
+        masses = updated
+        if converged:
+            break
+    fuel = np.sum(burns, axis=-1)
+    return (float(fuel) if fuel.ndim == 0 else fuel), float(np.sum(distances_km) / 1.852 / CRUISE_TAS_KTS * 60)
+
+@traced('baseline')
+def baseline_profile(flight_plan):
+    """The constant-FL350 baseline (fuel kg, minutes) of a plan, computed once per (aircraft type, mass, waypoints)."""
+    aircraft_type, initial_mass_kg, waypoints = flight_plan['aircraft_type'], flight_plan['initial_mass_kg'], flight_plan['waypoints']
+    return BASELINE_CACHE.get_or_compute(aircraft_type, initial_mass_kg, waypoints,
+                                         lambda: compute_baseline_profile(aircraft_type, initial_mass_kg, waypoints))
+
+def batched_dp_search(flight_plan, initial_masses_kg, weather_members, member_of_scenario):
+    """
+    dp_search for many scenarios of one plan at once: scenario s starts at
+    `initial_masses_kg[s]` under `weather_members[member_of_scenario[s]]`. Cost and mass
+    carry a leading scenario axis, so each layer is relaxed with one fuel-flow call for all
+    scenarios, and distances, segment weather (once per member) and the transition table
+    are shared. As in dp_search, step-climb limits are not enforced and cells burning more
+    than the fuel on board are infeasible; a scenario with no feasible profile gets inf fuel.
+    Returns (level indices (scenarios, waypoints), total fuel (scenarios,)).
+    """
+    waypoints, aircraft_type = flight_plan['waypoints'], flight_plan['aircraft_type']
+    n_wp, n_fl = len(waypoints), len(FLIGHT_LEVELS)
+    initial = np.asarray(initial_masses_kg, dtype=float)
+    member_of_scenario, scenarios = np.asarray(member_of_scenario, dtype=np.intp), np.arange(len(initial))
+    cost = np.full((len(initial), n_fl), np.inf)
+    mass = np.zeros((len(initial), n_fl))
+    parent = np.zeros((n_wp, len(initial), n_fl), dtype=np.intp)
+    start_fl_idx = FLIGHT_LEVELS.index(350)
+    cost[:, start_fl_idx], mass[:, start_fl_idx] = 0, initial
+    columns = np.broadcast_to(np.arange(n_fl), cost.shape)
+    segment_km = segment_distances_km(waypoints)
+    transition = get_transition_table(aircraft_type, FLIGHT_LEVEL_ALTITUDES_FT)
+    fuel_on_board = np.array([m - zero_fuel_mass_kg({**flight_plan, 'initial_mass_kg': m}) for m in initial])[:, np.newaxis]
+    weather = [route_weather(waypoints, member) for member in weather_members]
+    member_tailwind_kts = np.array([wind for wind, _ in weather])  # (member, leg, level)
+    member_temp_c = np.array([temp for _, temp in weather])
+    for i in range(n_wp - 1):
+        tailwind_kts = member_tailwind_kts[member_of_scenario, i]
+        temp_c = member_temp_c[member_of_scenario, i]
+        # Unreachable cells get a valid placeholder mass; their infinite cost keeps them out of the argmin.
+        cell_mass = np.where(np.isfinite(cost), mass, initial[:, np.newaxis])
+        burns = calculate_fuel_burn(aircraft_type, cell_mass[:, :, np.newaxis], FLIGHT_LEVEL_ALTITUDES_FT, segment_km[i],
+                                    CRUISE_TAS_KTS, temp_c[:, np.newaxis, :], CRUISE_TAS_KTS + tailwind_kts[:, np.newaxis, :])
+        total = cost[:, :, np.newaxis] + burns  # (scenario, from level, to level)
+        if i > 0: total += transition.row(columns, cell_mass)
+        best = np.argmin(total, axis=1)
+        parent[i + 1] = best
+        cost = np.take_along_axis(total, best[:, np.newaxis, :], axis=1)[:, 0, :]
+        mass = np.take_along_axis(cell_mass, best, axis=1) - np.take_along_axis(burns, best[:, np.newaxis, :], axis=1)[:, 0, :]
+        cost = np.where(cost > fuel_on_board, np.inf, cost)
+    fl_idx = np.argmin(cost, axis=1)
+    total_fuel, levels = cost[scenarios, fl_idx], np.empty((len(initial), n_wp), dtype=np.intp)
+    for i in range(n_wp - 1, -1, -1):
+        levels[:, i] = fl_idx
+        fl_idx = parent[i, scenarios, fl_idx]
+    return levels, total_fuel
+
+def perturbed_weather_members(weather_data, n_members, seed=0):
+    """
+    `n_members` weather scenarios: the forecast itself, then copies with independent
+    Gaussian wind (WHAT_IF_WIND_SD_KTS) and temperature (WHAT_IF_TEMP_SD_C) errors per
+    waypoint. A stand-in when no ensemble forecast is available; what_if_sweep takes real
+    members just the same.
+    """
+    rng = np.random.default_rng(seed)
+    members = [weather_data]
+    for _ in range(n_members - 1):
+        members.append({wp: {**w, 'wind_speed_kts': w.get('wind_speed_kts', 0) + rng.normal(0, WHAT_IF_WIND_SD_KTS),
+                             'temperature_c': w.get('temperature_c', 15) + rng.normal(0, WHAT_IF_TEMP_SD_C)}
+                        for wp, w in sorted(weather_data.items())})
+    return members
+
+@traced()
+def what_if_sweep(flight_plan, initial_masses_kg, weather_members, optimizer="dp"):
+    """
+    Optimizes one plan for every (takeoff mass, weather member) pair. The baselines of all
+    masses come from one cached, vectorized computation (weather does not enter them), and
+    'dp' evaluates every scenario in one batched_dp_search; 'astar' runs a_star_search per
+    scenario (honours step-climb limits, but costs a full search each). Returned column-wise
+    like pareto_front_search, one entry per scenario, mass-major: {'initial_mass_kg',
+    'weather_member', 'baseline_fuel_kg', 'optimized_fuel_kg', 'fuel_saved_kg', 'profiles'},
+    where each profile lists [leg index, flight level] only where the level changes.
+    Scenarios with no profile within the fuel on board get None fuel/savings and no profile.
+    """
+    aircraft_type, waypoints = flight_plan['aircraft_type'], flight_plan['waypoints']
+    masses = [float(m) for m in initial_masses_kg for _ in weather_members]
+    members = [member for _ in initial_masses_kg for member in range(len(weather_members))]
+    baselines = BASELINE_CACHE.get_or_compute_many(aircraft_type, list(initial_masses_kg), waypoints,
+                                                   lambda missing: compute_baseline_profile(aircraft_type, missing, waypoints))
+    if optimizer == 'dp':
+        levels, fuel = batched_dp_search(flight_plan, masses, weather_members, members)
+    elif optimizer == 'astar':
+        routes = [a_star_search({**flight_plan, 'initial_mass_kg': m}, weather_members[k]) for m, k in zip(masses, members)]
+        levels = [[FLIGHT_LEVELS.index(step['flight_level']) for step in path or ()] for path, _ in routes]
+        fuel = [total for _, total in routes]
+    else:
+        raise ValueError(f"Unknown what-if optimizer '{optimizer}'. Expected 'dp' or 'astar'.")
+    table = {'initial_mass_kg': [round(m) for m in masses], 'weather_member': members, 'baseline_fuel_kg': [], 'optimized_fuel_kg': [], 'fuel_saved_kg': [], 'profiles': []}
+    for s in range(len(members)):
+        baseline_fuel, feasible = baselines[s // len(weather_members)][0], math.isfinite(fuel[s])
+        legs = [FLIGHT_LEVELS[level] for level in levels[s][1:]] if feasible else []
+        table['baseline_fuel_kg'].append(round(baseline_fuel))
+        table['optimized_fuel_kg'].append(round(float(fuel[s])) if feasible else None)
+        table['fuel_saved_kg'].append(round(baseline_fuel - float(fuel[s])) if feasible else None)
+        table['profiles'].append([[i, fl] for i, fl in enumerate(legs) if i == 0 or fl != legs[i - 1]])
+    return table
+
+OPTIMIZERS = {'astar': a_star_search, 'dp': dp_search, 'free': free_routing_search}
+CORRIDOR_OPTIONS = ('half_width_km', 'lateral_spacing_km', 'station_spacing_km', 'max_lateral_step')
 
 # --- Section 4: Agent Tool Definitions ---
-@tool
+@traced()
 def get_flight_plan(flight_id: str) -> str:
     print(f"Tool 'get_flight_plan' called for flight_id: {flight_id}")
     try:
-        df = pd.read_csv("flight_plans.csv")
-        flight_plan = df[df['flight_id'] == flight_id].to_dict('records')
-        if not flight_plan: return json.dumps({"error": f"Flight plan for '{flight_id}' not found."})
-        fp = flight_plan[0]
-        if isinstance(fp['waypoints'], str):
-            fp['waypoints'] = [wp.strip() for wp in fp['waypoints'].strip('[]').replace("'", "").replace('"', '').split(',')]
+        fp = FLIGHT_PLAN_STORE.get(flight_id)
+        if fp is None: return json.dumps({"error": f"Flight plan for '{flight_id}' not found."})
         return json.dumps(fp)
     except FileNotFoundError: return json.dumps({"error": "The 'flight_plans.csv' file was not found."})
     except Exception as e: return json.dumps({"error": f"An unexpected error occurred: {str(e)}"})
 
-@tool
+def prefetch_weather(flight_plans):
+    """Weather for every distinct known waypoint across a set of flight plans, in as few requests as possible."""
+    waypoints = {wp for fp in flight_plans for wp in fp['waypoints']}
+    locations = {wp: WAYPOINT_COORDINATES[wp] for wp in waypoints if WAYPOINT_COORDINATES.get(wp, (0,0))[0] != 0}
+    return WEATHER_PROVIDER.get_weather(locations)
+
+@traced()
 def get_weather_for_route(waypoints: list[str]) -> str:
     print(f"Tool 'get_weather_for_route' called for waypoints: {waypoints}")
-    weather_data = {}
-    for wp in waypoints:
-        lat, lon = WAYPOINT_COORDINATES.get(wp, (0,0))
-        if lat == 0: continue
-        try:
-            url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json().get('current_weather', {})
-            weather_data[wp] = {'temperature_c': data.get('temperature'), 'wind_speed_kts': data.get('windspeed') * 0.54}
-        except requests.RequestException as e:
-            print(f"Warning: Could not fetch weather for {wp}. Using defaults. Error: {e}")
-            weather_data[wp] = {'temperature_c': 15, 'wind_speed_kts': 0}
+    locations = {wp: WAYPOINT_COORDINATES[wp] for wp in waypoints if WAYPOINT_COORDINATES.get(wp, (0,0))[0] != 0}
+    weather_data = WEATHER_PROVIDER.get_weather(locations)
+    print(f"Weather cache stats: {WEATHER_CACHE.stats()}")
     return json.dumps(weather_data)
 
-@tool
-def run_fuel_optimization(flight_plan: dict, weather_data: dict) -> str:
+@traced()
+def run_fuel_optimization(flight_plan: dict, weather_data: dict, optimizer: str = "astar", cost_index: float | None = None, include_pareto_front: bool | None = None,
+                          what_if_masses_kg: list[float] | None = None, weather_members: int | None = None, corridor: dict | None = None) -> str:
     print(f"Tool 'run_fuel_optimization' called for flight: {flight_plan.get('flight_id')}")
-    baseline_mass, baseline_fuel = flight_plan['initial_mass_kg'], 0
-    for i in range(len(flight_plan['waypoints']) - 1):
-        wp1, wp2 = flight_plan['waypoints'][i], flight_plan['waypoints'][i+1]
-        lat1, lon1 = WAYPOINT_COORDINATES[wp1]; lat2, lon2 = WAYPOINT_COORDINATES[wp2]
-        distance_km = haversine(lat1, lon1, lat2, lon2)
-        fuel_burned = calculate_fuel_burn(flight_plan['aircraft_type'], baseline_mass, 35000, distance_km, 450, 15)
-        baseline_fuel += fuel_burned; baseline_mass -= fuel_burned
-    optimized_path, optimized_fuel = a_star_search(flight_plan, weather_data)
+    if optimizer not in OPTIMIZERS: return json.dumps({"status": "error", "message": f"Unknown optimizer '{optimizer}'. Expected one of {sorted(OPTIMIZERS)}."})
+    if cost_index is None and optimizer == 'astar': cost_index = COST_INDEX_KG_PER_MIN
+    if cost_index is not None and optimizer != 'astar': return json.dumps({"status": "error", "message": "cost_index is only supported by the 'astar' optimizer."})
+    if corridor and optimizer != 'free': return json.dumps({"status": "error", "message": "corridor is only supported by the 'free' optimizer."})
+    if corridor and set(corridor) - set(CORRIDOR_OPTIONS): return json.dumps({"status": "error", "message": f"Unknown corridor option(s) {sorted(set(corridor) - set(CORRIDOR_OPTIONS))}. Expected some of {list(CORRIDOR_OPTIONS)}."})
+    include_pareto_front = PARETO_FRONT_ENABLED if include_pareto_front is None else include_pareto_front
+    if what_if_masses_kg is None: what_if_masses_kg = [flight_plan['initial_mass_kg'] + offset for offset in WHAT_IF_MASS_OFFSETS_KG]
+    weather_members = WHAT_IF_WEATHER_MEMBERS if weather_members is None else weather_members
+    set_property('aircraft_type', flight_plan['aircraft_type']); set_property('optimizer', optimizer)
+    baseline_fuel, baseline_minutes = baseline_profile(flight_plan)
+    search_stats = {}
+    search_kwargs = {'cost_index': cost_index} if cost_index is not None else {}
+    if corridor: search_kwargs['corridor'] = corridor
+    optimized_path, optimized_fuel = OPTIMIZERS[optimizer](flight_plan, weather_data, stats=search_stats, **search_kwargs)
+    print(f"Search stats for {flight_plan.get('flight_id')}: {search_stats}")
+    count_stats(search_stats, 'search')
     if optimized_path:
-        return json.dumps({"status": "success", "baseline_fuel_kg": round(baseline_fuel), "optimized_fuel_kg": round(optimized_fuel), "fuel_saved_kg": round(baseline_fuel - optimized_fuel), "optimized_route": optimized_path})
-    else: return json.dumps({"status": "error", "message": "Optimization failed to find a path."})
+        result = {"status": "success", "baseline_fuel_kg": round(baseline_fuel), "optimized_fuel_kg": round(optimized_fuel), "fuel_saved_kg": round(baseline_fuel - optimized_fuel), "optimized_route": optimized_path, "search_stats": search_stats}
+        if optimizer != 'free':  # Free routes leave the plan's waypoints.
+            result.update(baseline_time_min=round(baseline_minutes, 1), optimized_time_min=round(route_minutes(flight_plan, weather_data, optimized_path), 1))
+        if cost_index is not None: result["cost_index"] = cost_index
+        if include_pareto_front: result["pareto_front"] = pareto_front_search(flight_plan, weather_data)
+        if optimizer != 'free' and (what_if_masses_kg or weather_members > 1):
+            result["what_if"] = what_if_sweep(flight_plan, what_if_masses_kg or [flight_plan['initial_mass_kg']], perturbed_weather_members(weather_data, max(weather_members, 1)))
+        return json.dumps(result)
+    else:
+        fuel_on_board = flight_plan['initial_mass_kg'] - zero_fuel_mass_kg(flight_plan)
+        return json.dumps({"status": "error", "message": f"Optimization found no feasible profile: every profile burns more than the {fuel_on_board:,.0f} kg "
+                                                         f"of fuel on board (takeoff mass minus zero-fuel mass), or the route is unreachable."})
+
+def optimize_plan(flight_plan, weather_data, optimizer: str = "astar"):
+    """run_fuel_optimization as a plain dict, without the tool layer (used by batch_runner)."""
+    return json.loads(run_fuel_optimization(flight_plan, weather_data, optimizer=optimizer))
 
-@tool
-def publish_recommendation(flight_id: str, baseline_fuel_kg: int, optimized_fuel_kg: int, fuel_saved_kg: int, rationale: str, optimized_route: list) -> str:
+@traced()
+def publish_recommendation(flight_id: str, baseline_fuel_kg: int, optimized_fuel_kg: int, fuel_saved_kg: int, rationale: str, optimized_route: list,
+                           optimized_time_min: float | None = None, cost_index: float | None = None, pareto_front: dict | None = None,
+                           what_if: dict | None = None) -> str:
     print(f"Tool 'publish_recommendation' called for flight: {flight_id}")
     try:
-        sqs = boto3.client('sqs', region_name=os.getenv('AWS_DEFAULT_REGION'))
-        queue_url = os.getenv('SQS_OUTPUT_QUEUE_URL')
-        message_body = json.dumps({"flight_id": flight_id, "baseline_fuel_kg": baseline_fuel_kg, "optimized_fuel_kg": optimized_fuel_kg, "fuel_saved_kg": fuel_saved_kg, "rationale": rationale, "optimized_route": optimized_route})
-        sqs.send_message(QueueUrl=queue_url, MessageBody=message_body)
-        return json.dumps({"status": "success", "message": f"Recommendation for {flight_id} published to SQS."})
+        # Buffered: sent with send_message_batch when the batch fills, ages out, or the handler flushes.
+        message = {"flight_id": flight_id, "baseline_fuel_kg": baseline_fuel_kg, "optimized_fuel_kg": optimized_fuel_kg, "fuel_saved_kg": fuel_saved_kg, "rationale": rationale, "optimized_route": optimized_route}
+        optional = {"optimized_time_min": optimized_time_min, "cost_index": cost_index, "pareto_front": pareto_front, "what_if": what_if}
+        message.update({key: value for key, value in optional.items() if value is not None})
+        RECOMMENDATION_PUBLISHER.publish(message, key=flight_id)
+        return json.dumps({"status": "success", "message": f"Recommendation for {flight_id} queued for SQS."})
     except Exception as e:
         error_message = f"Failed to publish to SQS: {str(e)}"; print(f"ERROR: {error_message}")
         return json.dumps({"status": "error", "message": error_message})
 
 # --- Section 5: System Prompt ---
 SYSTEM_PROMPT = """You are an expert AI agent specializing in airline fuel optimization... Your final action is to call `publish_recommendation`.""" # Truncated for brevity
+RATIONALE_PROMPT = """You are an airline dispatch assistant. In two or three sentences, explain to a dispatcher why the optimized altitude profile saves fuel compared to the constant FL350 baseline. Use only the figures provided."""
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+SQS_WORKFLOW_MODE = os.getenv('SQS_WORKFLOW_MODE', 'direct')
+HANDLER_MAX_WORKERS = int(os.getenv('HANDLER_MAX_WORKERS', '4'))
+DIRECT_MODE_LLM_RATIONALE = os.getenv('DIRECT_MODE_LLM_RATIONALE', 'false').lower() == 'true'
 
 # --- Section 6: Refactored Agent Workflow ---
-def run_agent_workflow(flight_id: str):
+AGENT_TOOLS = (get_flight_plan, get_weather_for_route, run_fuel_optimization, publish_recommendation)
+_AGENTS = threading.local()  # An Agent holds its conversation, so flights on different handler threads get their own.
+
+def get_agent(kind="workflow"):
+    """
+    The strands Agent of this thread for `kind` ("workflow": orchestrates AGENT_TOOLS;
+    "rationale": writes a rationale, no tools), built on first use and reused by warm
+    invocations with its conversation cleared; the handler's threads outlive an invocation
+    (see get_handler_pool), so their agents do too. strands is only imported here.
+    """
+    agent = getattr(_AGENTS, kind, None)
+    if agent is not None:
+        agent.messages.clear()
+        return agent
+    from strands import Agent, tool
+    if kind == "rationale":
+        agent = Agent(model=MODEL_ID, system_prompt=RATIONALE_PROMPT, callback_handler=None)
+    else:
+        agent = Agent(model=MODEL_ID, system_prompt=SYSTEM_PROMPT, tools=[tool(function) for function in AGENT_TOOLS])
+    setattr(_AGENTS, kind, agent)
+    return agent
+
+def template_rationale(flight_plan, result):
+    """Deterministic rationale text built from the optimization result."""
+    levels = [step['flight_level'] for step in result['optimized_route']]
+    profile = " -> ".join(f"FL{fl}" for fl in levels)
+    return (f"Flight {flight_plan['flight_id']} ({flight_plan['aircraft_type']}, {flight_plan['initial_mass_kg']:,} kg) "
+            f"saves {result['fuel_saved_kg']:,} kg against the constant FL350 baseline by flying {profile}, "
+            f"matching each segment's altitude to the aircraft's decreasing mass and the forecast weather."
+            + (f" Speeds were chosen for a cost index of {result['cost_index']} kg/min." if 'cost_index' in result else "")
+            + (f" {len(result['pareto_front']['fuel_kg'])} fuel/time options are attached for dispatch." if 'pareto_front' in result else "")
+            + (what_if_summary(result['what_if']) if 'what_if' in result else ""))
+
+def what_if_summary(what_if):
+    """One sentence on the spread of savings across the what-if scenarios."""
+    savings = [saved for saved in what_if['fuel_saved_kg'] if saved is not None]
+    infeasible = len(what_if['fuel_saved_kg']) - len(savings)
+    text = (f" Savings range from {min(savings):,} to {max(savings):,} kg across {len(savings)} mass/weather scenarios." if savings else "")
+    return text + (f" {infeasible} scenario(s) exceed the fuel on board." if infeasible else "")
+
+def write_rationale(flight_plan, result, rationale_model=None):
+    """
+    Rationale for a recommendation. Uses `rationale_model` (any callable taking a prompt,
+    e.g. a strands Agent or a stub) for a single call if given, else the template.
+    """
+    if rationale_model is None:
+        return template_rationale(flight_plan, result)
+    facts = {key: result[key] for key in ('baseline_fuel_kg', 'optimized_fuel_kg', 'fuel_saved_kg', 'optimized_route')}
+    try:
+        return str(rationale_model(f"Flight plan: {json.dumps(flight_plan)}\nOptimization result: {json.dumps(facts)}")).strip()
+    except Exception as e:
+        print(f"Warning: Rationale model failed, using template. Error: {e}")
+        return template_rationale(flight_plan, result)
+
+def run_direct_workflow(flight_id: str, rationale_model=None, optimizer: str = "astar"):
+    """
+    Runs the fixed get_flight_plan -> get_weather_for_route -> run_fuel_optimization ->
+    publish_recommendation pipeline in-process, without an agent round-trip. The model is
+    used at most once, and only if `rationale_model` is given.
+    """
+    print(f"--- Starting Direct Workflow for Flight: {flight_id} ---")
+    flight_plan = json.loads(get_flight_plan(flight_id))
+    if 'error' in flight_plan: return {"status": "error", "message": flight_plan['error']}
+    weather_data = json.loads(get_weather_for_route(flight_plan['waypoints']))
+    result = json.loads(run_fuel_optimization(flight_plan, weather_data, optimizer=optimizer))
+    if result.get('status') != 'success': return {"status": "error", "message": result.get('message')}
+    rationale = write_rationale(flight_plan, result, rationale_model)
+    published = json.loads(publish_recommendation(flight_id, result['baseline_fuel_kg'], result['optimized_fuel_kg'], result['fuel_saved_kg'], rationale, result['optimized_route'],
+                                                  result.get('optimized_time_min'), result.get('cost_index'), result.get('pareto_front'), result.get('what_if')))
+    if published.get('status') != 'success': return published
+    return {"status": "success", "response": {**result, "flight_id": flight_id, "rationale": rationale}}
+
+def run_agent_workflow(flight_id: str, mode: str = "agent", rationale_model=None):
     """
     Encapsulates the agent execution logic to be called from different entry points.
+    mode="agent" lets the LLM agent orchestrate the tools; mode="direct" runs the same
+    tools as a deterministic pipeline (see run_direct_workflow). Each call is one
+    flight trace (see instrumentation.py), logged as EMF when METRICS_ENABLED is set.
     """
+    with flight_trace(flight_id):
+        set_property('mode', mode)
+        result = _run_agent_workflow(flight_id, mode, rationale_model)
+        set_property('status', result.get('status'))
+        return result
+
+def _run_agent_workflow(flight_id, mode, rationale_model):
     # Verify that essential environment variables are set
     REQUIRED_VARS = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_DEFAULT_REGION', 'SQS_OUTPUT_QUEUE_URL']
     for var in REQUIRED_VARS:
@@ -169,13 +663,19 @@ def run_agent_workflow(flight_id: str):
             print(error_msg)
             return {"status": "error", "message": error_msg}
 
+    if mode == "direct":
+        if rationale_model is None and DIRECT_MODE_LLM_RATIONALE:
+            rationale_model = get_agent("rationale")
+        try:
+            return run_direct_workflow(flight_id, rationale_model)
+        except Exception as e:
+            error_msg = f"An unhandled error occurred in direct workflow: {e}"
+            print(f"\n--- ❌ {error_msg} ---")
+            return {"status": "error", "message": error_msg}
+
     print(f"--- Starting Agent Workflow for Flight: {flight_id} ---")
     try:
-        agent = Agent(
-            model="anthropic.claude-3-sonnet-20240229-v1:0",
-            system_prompt=SYSTEM_PROMPT,
-            tools=[get_flight_plan, get_weather_for_route, run_fuel_optimization, publish_recommendation]
-        )
+        agent = get_agent("workflow")
         prompt = f"Please begin the optimization process for flight {flight_id}."
         print(f"--- Sending Prompt to Agent: '{prompt}' ---\n")
         final_response = agent(prompt)
@@ -187,13 +687,88 @@ def run_agent_workflow(flight_id: str):
         print(f"\n--- ❌ {error_msg} ---")
         return {"status": "error", "message": error_msg}
 
-# --- Section 7: Main Execution Block for Command-Line ---
+# --- Section 7: Entry Points (Lambda SQS Handler and Command Line) ---
+def parse_flight_id(record):
+    """flight_id from an SQS record body: either JSON {"flight_id": ...} or the bare ID."""
+    body = record['body'].strip()
+    try:
+        message = json.loads(body)
+    except json.JSONDecodeError:
+        return body
+    flight_id = message.get('flight_id') if isinstance(message, dict) else message
+    if not isinstance(flight_id, str) or not flight_id:
+        raise ValueError(f"No flight_id in message body: {body[:200]}")
+    return flight_id
+
+_HANDLER_POOL = None  # (size, ThreadPoolExecutor), kept across warm invocations.
+_HANDLER_POOL_LOCK = threading.Lock()
+
+def get_handler_pool():
+    """
+    The handler's worker pool, created on first use and kept for the life of the container,
+    so its threads (and the agents get_agent caches on each of them) survive warm invocations.
+    Rebuilt only if HANDLER_MAX_WORKERS changes.
+    """
+    global _HANDLER_POOL
+    with _HANDLER_POOL_LOCK:
+        if _HANDLER_POOL is None or _HANDLER_POOL[0] != HANDLER_MAX_WORKERS:
+            if _HANDLER_POOL is not None:
+                _HANDLER_POOL[1].shutdown(wait=False)
+            _HANDLER_POOL = (HANDLER_MAX_WORKERS, ThreadPoolExecutor(max_workers=max(1, HANDLER_MAX_WORKERS), thread_name_prefix='handler'))
+        return _HANDLER_POOL[1]
+
+def handler(event, context=None, workflow=None):
+    """
+    AWS Lambda entry point for SQS event batches (up to 10 records).
+    Repeated flight_ids in a batch run once; distinct flights run concurrently on the
+    module-level pool (see get_handler_pool). Returns `batchItemFailures` so only failed messages are redelivered
+    (requires ReportBatchItemFailures on the event source mapping).
+    """
+    workflow = workflow or (lambda flight_id: run_agent_workflow(flight_id, mode=SQS_WORKFLOW_MODE))
+    failures, messages_by_flight = [], {}
+    for record in event.get('Records', []):
+        try:
+            messages_by_flight.setdefault(parse_flight_id(record), []).append(record['messageId'])
+        except (KeyError, ValueError) as e:
+            print(f"ERROR: Unreadable SQS record {record.get('messageId')}: {e}")
+            failures.append(record.get('messageId'))
+
+    def run(flight_id):
+        try:
+            return workflow(flight_id).get('status') == 'success'
+        except Exception as e:
+            print(f"ERROR: Workflow for {flight_id} raised: {e}")
+            return False
+
+    flight_ids = list(messages_by_flight)
+    for flight_id, succeeded in zip(flight_ids, get_handler_pool().map(run, flight_ids)):
+        if not succeeded:
+            failures.extend(messages_by_flight[flight_id])
+    for flight_id in set(RECOMMENDATION_PUBLISHER.flush()) & set(flight_ids):
+        failures.extend(messages_by_flight[flight_id])
+    print(f"Processed {len(flight_ids)} flight(s) from {len(event.get('Records', []))} record(s); {len(failures)} failed message(s).")
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures if message_id]}
+
 def main():
     """Main function to run the agent from the command line."""
-    parser = argparse.ArgumentParser(description="Run the Airline Fuel Optimization Agent.", epilog="Example: `python fuel_optimization_agent.py UA123`")
-    parser.add_argument("flight_id", type=str, help="The ID of the flight to optimize (e.g., UA123, LH505).")
-    args = parser.parse_args()
-    run_agent_workflow(args.flight_id)
+    import batch_runner  # Only the command line needs it (it pulls in multiprocessing).
+    parser = argparse.ArgumentParser(description="Run the Airline Fuel Optimization Agent.", epilog="Examples: `python lambda_handler.py UA123`, `python lambda_handler.py batch --output results.jsonl`")
+    subcommands = parser.add_subparsers(dest="command")
+    run_parser = subcommands.add_parser("run", help="Optimize a single flight (the default).")
+    run_parser.add_argument("flight_id", type=str, help="The ID of the flight to optimize (e.g., UA123, LH505).")
+    run_parser.add_argument("--mode", choices=["agent", "direct"], default="agent", help="'direct' runs the tool pipeline without the LLM agent.")
+    batch_parser = subcommands.add_parser("batch", help="Optimize every plan in the plan file across all cores.")
+    batch_runner.add_batch_arguments(batch_parser)
+    args = parser.parse_args(batch_runner.with_default_subcommand(sys.argv[1:], ("run", "batch"), "run"))
+    if args.command == "batch":
+        plans = iter_flight_plans(args.plans) if args.plans else iter(FLIGHT_PLAN_STORE)
+        batch_runner.run_batch_from_args("lambda_handler", plans, args)
+        return
+    if args.command is None:
+        parser.print_help()
+        return
+    run_agent_workflow(args.flight_id, mode=args.mode)
+    RECOMMENDATION_PUBLISHER.flush()
     print("\n--- Command-Line Workflow Complete ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Flight-Level Transition Costs and Step-Climb Rules.
+
+Changing level between two waypoints is not free: for the minutes spent climbing
+the engines burn well above cruise fuel flow. This module samples OpenAP's fuel
+flow with a vertical speed once per aircraft type and level set, and stores the
+extra fuel of every level change over cruising at the new level in a dense
+(from level x to level x mass bucket) table, so a search pays one array lookup
+per transition. It also holds the step-climb rules the searches enforce: a
+minimum distance flown at a level before the next change, and a maximum number
+of changes per flight.
+
+Configuration (environment variables):
+    STEP_CLIMB_FPM            Vertical speed of a climb between cruise levels (default: 1000).
+    STEP_DESCENT_FPM          Vertical speed of a descent between cruise levels (default: 1500).
+    MIN_LEVEL_SEGMENT_NM      Minimum distance flown at a level before changing again (default: 200).
+    MAX_STEP_CHANGES          Maximum level changes after the initial cruise level (default: 4).
+    TRANSITION_MASS_STEP_KG   Mass bucket width of the transition table (default: 10000).
+"""
+import os
+import functools
+import numpy as np
+from fuel_tables import MASS_GRID_KG, openap_fuel_flow
+
+# --- Section 1: Configuration ---
+STEP_CLIMB_FPM = float(os.getenv('STEP_CLIMB_FPM', '1000'))
+STEP_DESCENT_FPM = float(os.getenv('STEP_DESCENT_FPM', '1500'))
+MIN_LEVEL_SEGMENT_NM = float(os.getenv('MIN_LEVEL_SEGMENT_NM', '200'))
+MAX_STEP_CHANGES = int(os.getenv('MAX_STEP_CHANGES', '4'))
+TRANSITION_MASS_STEP_KG = float(os.getenv('TRANSITION_MASS_STEP_KG', '10000'))
+
+# --- Section 2: The Transition Cost Table ---
+class TransitionCostTable:
+    """Extra fuel (kg) of a level change, indexed [from level, to level, mass bucket]."""
+
+    def __init__(self, altitudes_ft, masses_kg, costs):
+        self.altitudes_ft = np.asarray(altitudes_ft, dtype=float)
+        self.masses_kg = np.asarray(masses_kg, dtype=float)
+        self.costs = np.asarray(costs, dtype=float)
+
+    @classmethod
+    def build(cls, aircraft_type, altitudes_ft, tas_kts=450, mass_step_kg=TRANSITION_MASS_STEP_KG,
+              climb_fpm=STEP_CLIMB_FPM, descent_fpm=STEP_DESCENT_FPM):
+        """
+        Samples OpenAP at the mid-altitude of every level pair and mass bucket in two
+        vectorized calls (in transition and cruising at the new level). The extra fuel is
+        the difference over the time the change takes; descents, which burn less than
+        cruise, are floored at zero so that no level change is ever cheaper than holding.
+        """
+        altitudes = np.asarray(altitudes_ft, dtype=float)
+        masses = np.arange(MASS_GRID_KG[0], MASS_GRID_KG[-1] + mass_step_kg, mass_step_kg)
+        from_alt, to_alt, mass = np.meshgrid(altitudes, altitudes, masses, indexing='ij')
+        delta_ft = to_alt - from_alt
+        vs_fpm = np.where(delta_ft > 0, climb_fpm, -descent_fpm)
+        seconds = np.abs(delta_ft) / np.abs(vs_fpm) * 60
+        in_transition = openap_fuel_flow(aircraft_type, mass.ravel(), ((from_alt + to_alt) / 2).ravel(), tas_kts, 0, vs_fpm.ravel())
+        cruising = openap_fuel_flow(aircraft_type, mass.ravel(), to_alt.ravel(), tas_kts, 0)
+        extra = (np.asarray(in_transition, dtype=float) - np.asarray(cruising, dtype=float)).reshape(mass.shape) * seconds
+        # Where OpenAP has no answer (outside its envelope) the change is treated as free.
+        extra = np.where(np.isfinite(extra), np.maximum(extra, 0.0), 0.0)
+        return cls(altitudes, masses, np.where(delta_ft == 0, 0.0, extra))
+
+    def row(self, level, mass_kg):
+        """
+        Extra fuel (kg) of leaving level index `level` for every level, at `mass_kg`,
+        interpolated linearly between the sampled masses (clamped at the ends), so the
+        cost never moves by more than max_mass_slope() per kg. With arrays of levels and
+        masses, returns one row per (level, mass) pair.
+        """
+        position = np.interp(mass_kg, self.masses_kg, np.arange(len(self.masses_kg)))
+        lower = np.minimum(position.astype(int), max(len(self.masses_kg) - 2, 0))
+        upper = np.minimum(lower + 1, len(self.masses_kg) - 1)
+        weight = np.asarray(position - lower)[..., np.newaxis]
+        return self.costs[level, :, lower] * (1 - weight) + self.costs[level, :, upper] * weight
+
+    def max_mass_slope(self):
+        """Steepest change of any level change's extra fuel per kg of mass (kg/kg)."""
+        if len(self.masses_kg) < 2:
+            return 0.0
+        return float(np.max(np.abs(np.diff(self.costs, axis=2)) / np.diff(self.masses_kg)))
+
+# --- Section 3: Per-Aircraft Registry and Step-Climb Rules ---
+@functools.lru_cache(maxsize=None)
+def _cached_table(aircraft_type, altitudes_ft, tas_kts):
+    return TransitionCostTable.build(aircraft_type, altitudes_ft, tas_kts)
+
+def get_transition_table(aircraft_type, altitudes_ft, tas_kts=450):
+    """The transition table for an aircraft type and level set, built once per process."""
+    return _cached_table(aircraft_type, tuple(float(alt) for alt in altitudes_ft), float(tas_kts))
+
+def unlock_indices(segment_nm, min_level_nm=MIN_LEVEL_SEGMENT_NM):
+    """
+    For a level entered at waypoint i, the first waypoint index at which it may be left
+    again: the first waypoint at least `min_level_nm` further along the route. Waypoints
+    that never get that far map to len(waypoints), so the level is held to the end.
+    """
+    cumulative_nm = np.concatenate(([0.0], np.cumsum(segment_nm)))
+    return np.searchsorted(cumulative_nm, cumulative_nm + min_level_nm - 1e-9, side='left').tolist()
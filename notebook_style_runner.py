@@ -1,8 +1,9 @@
 # === Fuel Optimization Agent: Standalone Optimizer ===
-# This single file contains the entire application, refactored from its original
+# This file contains the entire application, refactored from its original
 # Colab notebook format to be runnable in any local Integrated Development Environment (IDE)
 # such as Visual Studio Code, PyCharm, etc. It is designed for easy, self-contained
-# testing and experimentation.
+# testing and experimentation. Fuel-flow lookups are shared with the Lambda
+# version through the `fuel_tables.py` module, which must sit next to this file.
 
 # --- How to Run This Script ---
 # 1. Ensure you have a .env file in the same directory. You can create one by
@@ -15,39 +16,61 @@
 # Section 1: All Necessary Imports
 import os
 import json
-import heapq
 import math
-import boto3
-import requests
+import itertools
+import sys
 import argparse  # Standard library for parsing command-line arguments
 from dotenv import load_dotenv  # Used to load credentials from the .env file
 from strands import Agent, tool
-from openap import FuelFlow # Core library for fuel burn calculations
+from fuel_tables import fuel_flow, min_fuel_per_nm, max_mass_sensitivity_per_nm # Precomputed OpenAP fuel-flow tables (see fuel_tables.py)
+from weather_cache import WeatherCache # Shared in-memory + SQLite weather cache (see weather_cache.py)
+from weather_client import ConcurrentWeatherClient # Pooled, concurrent HTTP client (see weather_client.py)
+from weather_providers import default_weather_provider # Batched open-meteo or local fixture weather
+from flight_plan_store import FlightPlanStore, iter_flight_plans # Indexed flight plan lookups (see flight_plan_store.py)
+import batch_runner # Multi-process batch optimization with checkpoint/resume (see batch_runner.py)
+from geometry import WaypointGeometry # Precomputed waypoint distance/bearing matrix (see geometry.py)
+from optimizer import a_star_profile_search # A* core shared with lambda_handler.py (see optimizer.py)
+from level_transitions import get_transition_table, unlock_indices, MIN_LEVEL_SEGMENT_NM, MAX_STEP_CHANGES # Climb costs and step-climb rules
+from sqs_publisher import get_sqs_client # Process-wide pooled SQS client (see sqs_publisher.py)
 
 # Load environment variables from a .env file at the very start of the script.
 # This makes environment variables available to the rest of the application.
 load_dotenv()
 
-# Section 2: Hardcoded Data Sources (Flight Plans, Coordinates, and City Names)
-# NOTE: For this self-contained script, flight data is kept internally for simplicity.
-# In the modular, production-ready version of the project (`fuel_optimization_agent.py`),
-# this data is loaded dynamically from the `flight_plans.csv` file.
-ALL_FLIGHT_PLANS = [
-    {'flight_id': 'UA123', 'origin_airport': 'KJFK', 'destination_airport': 'KSFO', 'waypoints': ['KJFK', 'KORD', 'KSFO'], 'initial_mass_kg': 150000, 'aircraft_type': 'B772'},
-    {'flight_id': 'AA456', 'origin_airport': 'KLAX', 'destination_airport': 'EGLL', 'waypoints': ['KLAX', 'CYUL', 'EIDW', 'EGLL'], 'initial_mass_kg': 180000, 'aircraft_type': 'B789'},
-    {'flight_id': 'DL789', 'origin_airport': 'KATL', 'destination_airport': 'RJTT', 'waypoints': ['KATL', 'KSEA', 'PANC', 'RJTT'], 'initial_mass_kg': 200000, 'aircraft_type': 'A35K'},
-    {'flight_id': 'SW101', 'origin_airport': 'EDDF', 'destination_airport': 'ZSPD', 'waypoints': ['EDDF', 'UUEE', 'UNNT', 'ZSPD'], 'initial_mass_kg': 195000, 'aircraft_type': 'B744'},
-    {'flight_id': 'QF202', 'origin_airport': 'YSSY', 'destination_airport': 'KDFW', 'waypoints': ['YSSY', 'NFFN', 'KLAX', 'KDFW'], 'initial_mass_kg': 175000, 'aircraft_type': 'A388'},
-    {'flight_id': 'EK303', 'origin_airport': 'OMDB', 'destination_airport': 'SBGR', 'waypoints': ['OMDB', 'HBEG', 'GVAC', 'SBGR'], 'initial_mass_kg': 185000, 'aircraft_type': 'B77W'},
-    {'flight_id': 'BA404', 'origin_airport': 'EGLL', 'destination_airport': 'HKJK', 'waypoints': ['EGLL', 'LIRF', 'HECA', 'HKJK'], 'initial_mass_kg': 160000, 'aircraft_type': 'A359'},
-    {'flight_id': 'LH505', 'origin_airport': 'EDDF', 'destination_airport': 'RKSI', 'waypoints': ['EDDF', 'EPWA', 'UWWW', 'RKSI'], 'initial_mass_kg': 190000, 'aircraft_type': 'B748'},
-    {'flight_id': 'AF606', 'origin_airport': 'LFPG', 'destination_airport': 'MMMX', 'waypoints': ['LFPG', 'CYYZ', 'KIAH', 'MMMX'], 'initial_mass_kg': 170000, 'aircraft_type': 'B78X'},
-    {'flight_id': 'SQ707', 'origin_airport': 'WSSS', 'destination_airport': 'NZAA', 'waypoints': ['WSSS', 'YPDN', 'YSSY', 'NZAA'], 'initial_mass_kg': 165000, 'aircraft_type': 'A359'}
-]
+# Section 2: Data Sources (Flight Plans, Coordinates, and City Names)
+# Flight plans are read from `flight_plans.csv` (or FLIGHT_PLANS_PATH) through the same file-backed
+# store as lambda_handler.py, indexed once by flight_id (and origin/destination/aircraft type) so
+# lookups are O(1) and edits to the file are picked up. Coordinates and city names stay inline.
+FLIGHT_PLAN_STORE = FlightPlanStore()
 AIRPORT_COORDS = {'KJFK': (40.64, -73.78), 'KSFO': (37.62, -122.37), 'KORD': (41.98, -87.90), 'KLAX': (33.94, -118.41), 'EGLL': (51.47, -0.45), 'CYUL': (45.47, -73.74), 'EIDW': (53.42, -6.27), 'KATL': (33.64, -84.43), 'RJTT': (35.55, 139.78), 'KSEA': (47.45, -122.31), 'PANC': (61.17, -149.99), 'EDDF': (50.03, 8.57), 'ZSPD': (31.14, 121.80), 'UUEE': (55.97, 37.41), 'UNNT': (55.01, 82.94), 'YSSY': (-33.95, 151.18), 'KDFW': (32.89, -97.04), 'NFFN': (-17.75, 177.44), 'OMDB': (25.25, 55.36), 'SBGR': (-23.43, -46.47), 'HBEG': (29.98, 32.71), 'GVAC': (-16.05, 22.82), 'HKJK': (-1.32, 36.93), 'LIRF': (41.80, 12.24), 'HECA': (30.12, 31.41), 'RKSI': (37.46, 126.44), 'EPWA': (52.17, 20.97), 'UWWW': (54.28, 48.23), 'LFPG': (49.01, 2.55), 'MMMX': (19.44, -99.07), 'CYYZ': (43.68, -79.63), 'KIAH': (29.98, -95.34), 'WSSS': (1.36, 103.99), 'NZAA': (-37.01, 174.79), 'YPDN': (-12.41, 130.87)}
 AIRPORT_CITY_NAMES = {'KJFK': 'New York', 'KSFO': 'San Francisco', 'KORD': 'Chicago', 'KLAX': 'Los Angeles', 'EGLL': 'London', 'CYUL': 'Montreal', 'EIDW': 'Dublin', 'KATL': 'Atlanta', 'RJTT': 'Tokyo', 'KSEA': 'Seattle', 'PANC': 'Anchorage', 'EDDF': 'Frankfurt', 'ZSPD': 'Shanghai', 'UUEE': 'Moscow', 'UNNT': 'Novosibirsk', 'YSSY': 'Sydney', 'KDFW': 'Dallas', 'NFFN': 'Nadi', 'OMDB': 'Dubai', 'SBGR': 'Sao Paulo', 'HBEG': 'Alexandria', 'GVAC': 'Amilcar Cabral', 'HKJK': 'Nairobi', 'LIRF': 'Rome', 'HECA': 'Cairo', 'RKSI': 'Seoul', 'EPWA': 'Warsaw', 'UWWW': 'Ulyanovsk', 'LFPG': 'Paris', 'MMMX': 'Mexico City', 'CYYZ': 'Toronto', 'KIAH': 'Houston', 'WSSS': 'Singapore', 'NZAA': 'Auckland', 'YPDN': 'Darwin'}
 
+# Weather readings are cached per lat/lon bucket and forecast hour, so airports that appear
+# in many flight plans are only fetched once. The weather provider groups the remaining
+# locations into multi-location open-meteo requests, sent concurrently over pooled
+# connections. Set WEATHER_FIXTURE_PATH to use a local JSON fixture instead (offline runs).
+WEATHER_CACHE = WeatherCache()
+WEATHER_CLIENT = ConcurrentWeatherClient()
+WEATHER_PROVIDER = default_weather_provider(WEATHER_CLIENT, WEATHER_CACHE)
+
 # Section 3: Core Logic and Scientific Calculation Functions
+CRUISE_TAS_KTS = 450  # Assumed true airspeed for all cruise segments.
+CRUISE_ALTITUDES_FT = list(range(29000, 41001, 2000))  # Candidate cruise altitudes for the search.
+KM_PER_NM = 1.852
+# Profiles may not burn below the zero-fuel mass: the plan's `zero_fuel_mass_kg`, else this share of the
+# takeoff mass (the same floor lambda_handler.py applies).
+ZERO_FUEL_MASS_FRACTION = float(os.getenv('ZERO_FUEL_MASS_FRACTION', '0.25'))
+
+# Distances between every pair of airports are computed once, as a NumPy matrix indexed by
+# integer airport IDs. The search reads segment lengths from it instead of recomputing the
+# haversine formula for every candidate altitude.
+AIRPORT_GEOMETRY = WaypointGeometry(AIRPORT_COORDS)
+
+def segment_distances_nm(waypoints):
+    """Lengths (nautical miles) of the consecutive legs of a waypoint list, from the distance matrix."""
+    AIRPORT_GEOMETRY.sync(AIRPORT_COORDS)
+    return (AIRPORT_GEOMETRY.segment_distances_km(waypoints) / KM_PER_NM).tolist()
+
 def haversine(lat1, lon1, lat2, lon2):
     """Calculates the great-circle distance between two points on Earth in nautical miles."""
     R = 3440.1  # Earth radius in nautical miles
@@ -62,115 +85,139 @@ def haversine(lat1, lon1, lat2, lon2):
 def calculate_fuel_burn(aircraft_type, mass_kg, altitude_ft, distance_nm, temperature_isa_dev=0):
     """
     Calculates the fuel burn for a given flight segment using the OpenAP library.
-    OpenAP provides scientifically validated aircraft performance models.
+    OpenAP provides scientifically validated aircraft performance models; the fuel
+    flow is read from a precomputed per-aircraft lookup table instead of building
+    a new OpenAP model for every segment.
     """
     try:
-        ff = FuelFlow(ac=aircraft_type, mass=mass_kg)
-        # The enroute method calculates the fuel consumed over a specific distance and altitude.
-        fuel_burn_kg = ff.enroute(alt=altitude_ft, dist=distance_nm, temp_dev=temperature_isa_dev)
-        return fuel_burn_kg[0]
+        # Fuel flow (kg/s) at cruise speed, multiplied by the time needed to fly the segment.
+        fuel_flow_kg_s = fuel_flow(aircraft_type, mass_kg, altitude_ft, CRUISE_TAS_KTS, temperature_isa_dev)
+        return fuel_flow_kg_s * (distance_nm / CRUISE_TAS_KTS) * 3600
     except Exception:
         # If the library fails for a specific set of parameters, return infinity
         # to ensure this path is not chosen by the optimization algorithm.
         return float('inf')
 
-def a_star_search(waypoints, aircraft_type, initial_mass_kg, weather_data):
+def zero_fuel_mass_kg(flight_plan):
+    """The plan's zero-fuel mass (kg): `zero_fuel_mass_kg` if given, else ZERO_FUEL_MASS_FRACTION of the takeoff mass."""
+    zero_fuel_mass = flight_plan.get('zero_fuel_mass_kg')
+    return zero_fuel_mass if zero_fuel_mass is not None else ZERO_FUEL_MASS_FRACTION * flight_plan['initial_mass_kg']
+
+def build_heuristic(waypoints, aircraft_type, initial_mass_kg):
+    """
+    Precomputes the A* heuristic for every waypoint index: the remaining great-circle
+    distance multiplied by the lowest fuel burn per nautical mile the aircraft can achieve
+    at any cruise altitude and any mass up to its take-off mass. Because it never
+    overestimates the fuel still to be burned, A* remains optimal.
+    """
+    segment_nm = segment_distances_nm(waypoints)
+    # Suffix sums: remaining_nm[i] is the distance from waypoint i to the destination.
+    remaining_nm = list(itertools.accumulate(reversed(segment_nm), initial=0))[::-1]
+    min_kg_per_nm = min_fuel_per_nm(aircraft_type, initial_mass_kg, (29000, 41000), (CRUISE_TAS_KTS, CRUISE_TAS_KTS))
+    return [distance * min_kg_per_nm for distance in remaining_nm]
+
+def build_mass_penalty(waypoints, aircraft_type, initial_mass_kg):
+    """
+    For every waypoint index, an upper bound on how much extra fuel each extra kilogram
+    carried from there costs by the destination: the remaining distance times the steepest
+    fuel-per-mile vs. mass slope in the aircraft's fuel table. The search uses it to discard
+    a lighter path once a path that burned less fuel is ahead by more than the lighter one
+    could still save. None when no table is available (nothing is discarded).
+    """
+    slope = max_mass_sensitivity_per_nm(aircraft_type, initial_mass_kg, (29000, 41000), (CRUISE_TAS_KTS, CRUISE_TAS_KTS))
+    if not math.isfinite(slope):
+        return None
+    remaining_nm = list(itertools.accumulate(reversed(segment_distances_nm(waypoints)), initial=0))[::-1]
+    return [distance * slope for distance in remaining_nm]
+
+def a_star_search(waypoints, aircraft_type, initial_mass_kg, weather_data, stats=None, step_climbs=True, min_mass_kg=None):
     """
     Finds the optimal path (altitude profile) through the flight plan using the A* search algorithm.
     This function explores different altitude changes at each waypoint to find the route
-    that consumes the least amount of fuel.
+    that consumes the least amount of fuel. If a `stats` dictionary is passed, it is filled
+    with the number of nodes expanded and pushed so the heuristic's pruning can be measured.
+    With `step_climbs` (the default), altitude changes cost climb fuel and follow the
+    step-climb rules in level_transitions.py; without it they are free, as they used to be.
+    Paths that would burn the aircraft below `min_mass_kg` (default: ZERO_FUEL_MASS_FRACTION
+    of the takeoff mass) are dropped, so an impossible plan finds no path.
+
+    The search itself lives in optimizer.py and is shared with lambda_handler.py: nodes are
+    kept in compact parallel arrays with a parent index instead of each heap entry carrying a
+    copy of the whole path, and the path is rebuilt once when the destination is reached.
     """
-    # The start node includes the first waypoint, a starting altitude, waypoint index, mass, and the initial path.
-    start_node = (waypoints[0], 35000, 0, initial_mass_kg, [('start', 35000, 0, initial_mass_kg)])
-    
-    # The open_set is a priority queue that stores nodes to visit, prioritized by their cost.
-    open_set = [(0, start_node)]
-    
-    # g_scores store the cost (total fuel burned) to get from the start node to the current node.
-    g_scores = { (waypoints[0], 35000): 0 }
-    
-    while open_set:
-        _, current_node = heapq.heappop(open_set)
-        current_waypoint, current_alt, wp_idx, current_mass, path = current_node
-
-        # If we have reached the last waypoint, we have found a complete path.
-        if wp_idx == len(waypoints) - 1:
-            return path, g_scores.get((current_waypoint, current_alt), float('inf'))
-
-        # Explore possible next altitudes: climb, cruise, or descend.
-        for alt_change in [-2000, 0, 2000]:
-            next_alt = current_alt + alt_change
-            # Ensure the next altitude is within a valid flight level range.
-            if not (29000 <= next_alt <= 41000):
-                continue
-            
-            # Move to the next waypoint in the flight plan.
-            next_wp_idx = wp_idx + 1
-            next_waypoint = waypoints[next_wp_idx]
-            lat1, lon1 = AIRPORT_COORDS[current_waypoint]
-            lat2, lon2 = AIRPORT_COORDS[next_waypoint]
-            distance_nm = haversine(lat1, lon1, lat2, lon2)
-
-            # Get weather data for the next segment.
-            temp_dev = weather_data.get(next_waypoint, {}).get(next_alt, 0)
-            
-            # Calculate the cost (fuel burn) for this segment.
-            fuel_burn = calculate_fuel_burn(aircraft_type, current_mass, next_alt, distance_nm, temp_dev)
-            if fuel_burn == float('inf'): continue
+    heuristic = build_heuristic(waypoints, aircraft_type, initial_mass_kg)
+    # Segment lengths don't depend on altitude, so they are looked up once per search.
+    segment_nm = segment_distances_nm(waypoints)
 
-            # The new g_score is the cost to the previous node plus the cost of the current segment.
-            new_g_score = g_scores.get((current_waypoint, current_alt), float('inf')) + fuel_burn
-            
-            # If we've found a cheaper path to this next node, record it.
-            if new_g_score < g_scores.get((next_waypoint, next_alt), float('inf')):
-                g_scores[(next_waypoint, next_alt)] = new_g_score
-                next_mass = current_mass - fuel_burn
-                new_path = path + [(next_waypoint, next_alt, round(fuel_burn, 2), round(next_mass, 2))]
-                
-                # Heuristic (h_score): An estimate of the cost to get from the current node to the end.
-                # Here, we use a simple heuristic based on remaining distance.
-                h_score = (len(waypoints) - 1 - next_wp_idx) * 2000 # Simplified estimate
-                
-                # The f_score is the total estimated cost of the path through this node (g_score + h_score).
-                # The priority queue uses this f_score to decide which node to explore next.
-                f_score = new_g_score + h_score
-                heapq.heappush(open_set, (f_score, (next_waypoint, next_alt, next_wp_idx, next_mass, new_path)))
-                
-    # If the loop finishes and no path was found, return None.
-    return None, float('inf')
+    # From each altitude the aircraft may descend 2,000 ft, hold, or climb 2,000 ft,
+    # staying within the 29,000-41,000 ft band.
+    transitions = [[j for j in (i - 1, i, i + 1) if 0 <= j < len(CRUISE_ALTITUDES_FT)] for i in range(len(CRUISE_ALTITUDES_FT))]
+
+    def leg_costs(wp_idx, mass, levels):
+        # Fuel for the leg wp_idx -> wp_idx+1 at each reachable cruise altitude, using the ISA
+        # deviation reported at the next waypoint. Failed calculations come back as infinity.
+        # The search minimizes the first value of each pair; here time is not priced in, so
+        # the cost of a leg is simply its fuel. When the search walks several held altitudes
+        # at once, `mass` is a list with each altitude's own mass.
+        weather = weather_data.get(waypoints[wp_idx + 1], {})
+        masses = mass if isinstance(mass, list) else [mass] * len(levels)
+        burns = [calculate_fuel_burn(aircraft_type, level_mass, CRUISE_ALTITUDES_FT[level], segment_nm[wp_idx], weather.get(CRUISE_ALTITUDES_FT[level], 0))
+                 for level, level_mass in zip(levels, masses)]
+        return [(burn, burn) for burn in burns]
+
+    # A step climb is not free: for the minutes spent climbing the engines burn more than in
+    # cruise. That extra fuel is read from a per-aircraft table precomputed from OpenAP, and
+    # like a real step-climb plan the aircraft must fly a minimum distance at each altitude
+    # and may change altitude only a limited number of times after the first leg.
+    step_rules = {}
+    mass_penalty = build_mass_penalty(waypoints, aircraft_type, initial_mass_kg)
+    if step_climbs:
+        transition = get_transition_table(aircraft_type, CRUISE_ALTITUDES_FT, CRUISE_TAS_KTS)
+        step_rules = {'transition_cost': transition.row,
+                      'unlock': unlock_indices(segment_nm, MIN_LEVEL_SEGMENT_NM), 'max_steps': MAX_STEP_CHANGES}
+        if mass_penalty is not None:  # Climb fuel also grows with mass, once per level change still allowed.
+            mass_penalty = [p + transition.max_mass_slope() * min(MAX_STEP_CHANGES, len(waypoints) - 1 - i) for i, p in enumerate(mass_penalty)]
+
+    # Search states also carry the aircraft's mass (in 250 kg buckets), so each path's later
+    # burns use its own weight; the mass penalty keeps only paths that could still win.
+    pool, goal, total_fuel = a_star_profile_search(len(waypoints), len(CRUISE_ALTITUDES_FT), CRUISE_ALTITUDES_FT.index(35000), initial_mass_kg,
+                                                   leg_costs, heuristic, transitions=transitions,
+                                                   mass_penalty=mass_penalty, stats=stats,
+                                                   min_mass_kg=min_mass_kg if min_mass_kg is not None else ZERO_FUEL_MASS_FRACTION * initial_mass_kg,
+                                                   **step_rules)
+    if goal is None:
+        # If the search finishes and no path was found, return None.
+        return None, float('inf')
+
+    # Rebuild the path once, from the parent indices: a 'start' entry followed by one
+    # (waypoint, altitude, fuel burned on the leg including any climb, mass after the leg) entry per leg.
+    nodes = pool.path(goal)
+    path = [('start', CRUISE_ALTITUDES_FT[pool.level[nodes[0]]], 0, initial_mass_kg)]
+    for prev, node in zip(nodes, nodes[1:]):
+        path.append((waypoints[pool.waypoint[node]], CRUISE_ALTITUDES_FT[pool.level[node]],
+                     round(pool.g[node] - pool.g[prev], 2), round(pool.mass[node], 2)))
+    return path, total_fuel
 
 # Section 4: Agent Tools
 # These functions are decorated with `@tool` to make them available to the Strands Agent.
 @tool
 def get_flight_plan(flight_id: str) -> dict:
     """Retrieves a specific flight plan from the internal database based on its flight_id."""
-    for plan in ALL_FLIGHT_PLANS:
-        if plan['flight_id'] == flight_id:
-            return plan
+    plan = FLIGHT_PLAN_STORE.get(flight_id)
+    if plan is not None:
+        return plan
     return {"error": f"Flight plan for {flight_id} not found."}
 
 @tool
 def get_weather_for_route(waypoints: list) -> dict:
     """Fetches weather data (temperature deviation from ISA) for a list of waypoints."""
+    locations = {wp: AIRPORT_COORDS[wp] for wp in waypoints if wp in AIRPORT_COORDS}
     weather_data = {}
-    for wp in waypoints:
-        lat, lon = AIRPORT_COORDS.get(wp, (None, None))
-        if not lat: continue
-        
-        # Using open-meteo.com for free weather forecast data.
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m&forecast_days=1"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                # Simplified model: Using a single temperature reading as a proxy for deviation.
-                # A more complex model would fetch temperature at different altitudes (pressure levels).
-                temp_c = data.get('hourly', {}).get('temperature_2m', [15])[0]
-                isa_deviation = temp_c - 15 
-                weather_data[wp] = {alt: isa_deviation for alt in range(29000, 41001, 2000)}
-        except requests.exceptions.RequestException as e:
-            print(f"Warning: Could not fetch weather for {wp}. Error: {e}")
-            
+    for wp, reading in WEATHER_PROVIDER.get_weather(locations).items():
+        # Simplified model: Using a single temperature reading as a proxy for deviation.
+        # A more complex model would fetch temperature at different altitudes (pressure levels).
+        isa_deviation = reading['temperature_c'] - 15
+        weather_data[wp] = {alt: isa_deviation for alt in range(29000, 41001, 2000)}
     return weather_data
 
 @tool
@@ -186,17 +233,15 @@ def run_fuel_optimization(flight_plan: dict, weather_data: dict) -> dict:
     # First, calculate a baseline fuel consumption by flying at a constant 35,000 ft.
     baseline_fuel = 0
     current_mass = initial_mass_kg
-    for i in range(len(waypoints) - 1):
-        wp1, wp2 = waypoints[i], waypoints[i+1]
-        lat1, lon1 = AIRPORT_COORDS[wp1]
-        lat2, lon2 = AIRPORT_COORDS[wp2]
-        dist = haversine(lat1, lon1, lat2, lon2)
+    for dist in segment_distances_nm(waypoints):
         fuel_segment = calculate_fuel_burn(aircraft_type, current_mass, 35000, dist, 0)
         baseline_fuel += fuel_segment
         current_mass -= fuel_segment
 
     # Second, run the A* search to find the truly optimal path.
-    optimized_path, optimized_fuel = a_star_search(waypoints, aircraft_type, initial_mass_kg, weather_data)
+    search_stats = {}
+    optimized_path, optimized_fuel = a_star_search(waypoints, aircraft_type, initial_mass_kg, weather_data, stats=search_stats,
+                                                   min_mass_kg=zero_fuel_mass_kg(flight_plan))
     
     if optimized_path:
         return {
@@ -205,10 +250,26 @@ def run_fuel_optimization(flight_plan: dict, weather_data: dict) -> dict:
             "optimized_fuel_kg": round(optimized_fuel, 2),
             "fuel_saved_kg": round(baseline_fuel - optimized_fuel, 2),
             "optimized_route": optimized_path,
+            "search_stats": search_stats,
             "rationale": "The optimized route adjusts altitudes based on weather and aircraft weight to minimize fuel consumption at each segment."
         }
     else:
-        return {"error": "Optimization failed to find a valid path."}
+        fuel_on_board = initial_mass_kg - zero_fuel_mass_kg(flight_plan)
+        return {"error": f"Optimization found no feasible profile: every profile burns more than the {fuel_on_board:,.0f} kg "
+                         f"of fuel on board (takeoff mass minus zero-fuel mass), or the route is unreachable."}
+
+# Batch helpers: `python notebook_style_runner.py batch` optimizes every plan without the agent
+# (see batch_runner.py). Weather is fetched once per chunk of plans and shared with the workers.
+def prefetch_weather(flight_plans):
+    """Weather for every distinct waypoint across a set of flight plans, in one provider call."""
+    return get_weather_for_route(sorted({wp for plan in flight_plans for wp in plan['waypoints']}))
+
+def optimize_plan(flight_plan, weather_data):
+    """run_fuel_optimization with an explicit status, as batch_runner expects."""
+    result = run_fuel_optimization(flight_plan, weather_data)
+    if 'error' in result:
+        return {"status": "error", "message": result['error']}
+    return {"status": "success", **result}
 
 @tool
 def publish_recommendation(optimization_result: dict) -> str:
@@ -218,7 +279,8 @@ def publish_recommendation(optimization_result: dict) -> str:
         if not sqs_queue_url:
             return "Error: SQS_OUTPUT_QUEUE_URL is not configured in the .env file."
             
-        sqs = boto3.client('sqs', region_name=os.getenv("AWS_REGION", "us-east-1"))
+        # The shared client is created once per process and reused across calls.
+        sqs = get_sqs_client(os.getenv("AWS_REGION", "us-east-1"))
         sqs.send_message(
             QueueUrl=sqs_queue_url,
             MessageBody=json.dumps(optimization_result)
@@ -252,12 +314,27 @@ def main():
         description="Run the Fuel Optimization Agent for a specific flight.",
         formatter_class=argparse.RawTextHelpFormatter # For better help text formatting
     )
-    parser.add_argument(
+    # Two subcommands: `run <flight_id>` (the default, so `python notebook_style_runner.py UA123`
+    # still works) drives the agent for one flight; `batch` optimizes every plan in parallel.
+    subcommands = parser.add_subparsers(dest="command")
+    run_parser = subcommands.add_parser("run", help="Run the agent for a single flight (the default).")
+    run_parser.add_argument(
         "flight_id",
         type=str,
         help="The ID of the flight to optimize (e.g., LH505, UA123)."
     )
-    args = parser.parse_args()
+    batch_parser = subcommands.add_parser("batch", help="Optimize every flight plan without the agent, across all cores.")
+    batch_runner.add_batch_arguments(batch_parser)
+    args = parser.parse_args(batch_runner.with_default_subcommand(sys.argv[1:], ("run", "batch"), "run"))
+
+    if args.command == "batch":
+        # No credentials needed: batch mode only reads plans and weather and writes a local file.
+        plans = iter_flight_plans(args.plans) if args.plans else iter(FLIGHT_PLAN_STORE)
+        batch_runner.run_batch_from_args("notebook_style_runner", plans, args)
+        return
+    if args.command is None:
+        parser.print_help()
+        return
     flight_id_to_optimize = args.flight_id
 
     # Crucial check: Verify that AWS credentials were successfully loaded from the .env file.
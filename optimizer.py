@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Altitude-Profile Search Core.
+
+Both `lambda_handler` and `notebook_style_runner` optimize the same problem: pick
+a flight level for each leg of a fixed waypoint sequence, with fuel burn that
+depends on the aircraft's current mass. This module holds the one A* search they
+share; each script supplies the leg cost function, heuristic and level set.
+
+Search states are (waypoint index, level index, mass bucket), plus the number of
+level changes made when step-climb rules are given. A level that must be held for
+a minimum distance is flown to that point as one edge, so no state carries a hold,
+and a state with fewer changes used and no more cost prunes the others. They live in a `NodePool` of parallel typed
+arrays (4-byte ids, 1-byte levels and step counts) with parent indices; the live
+states of each (waypoint, level) slot are chained through a per-node sibling
+array from a flat slot-head array, the heap holds only (f, node id) pairs, and
+the path is reconstructed once at the goal, so memory grows linearly with the
+number of states rather than with path length squared.
+
+`pareto_profile_search` answers the two-objective version (fuel and time, with a
+speed option per leg) in one layered sweep, returning the whole trade-off front
+instead of one profile per cost index.
+"""
+import heapq
+from array import array
+import numpy as np
+
+class NodePool:
+    """Append-only store of search nodes as parallel arrays; a node is its integer index."""
+
+    __slots__ = ('waypoint', 'level', 'mass', 'g', 'parent', 'steps')
+
+    def __init__(self):
+        self.waypoint, self.parent = array('i'), array('i')
+        self.level, self.steps = array('b'), array('b')
+        self.mass, self.g = array('d'), array('d')
+
+    def add(self, waypoint, level, mass, g, parent, steps=0):
+        self.waypoint.append(waypoint)
+        self.level.append(level)
+        self.mass.append(mass)
+        self.g.append(g)
+        self.parent.append(parent)
+        self.steps.append(steps)
+        return len(self.g) - 1
+
+    def __len__(self):
+        return len(self.g)
+
+    def path(self, node):
+        """Node ids from the start to `node`, following parent indices."""
+        nodes = []
+        while node >= 0:
+            nodes.append(node)
+            node = self.parent[node]
+        return nodes[::-1]
+
+def a_star_profile_search(n_waypoints, n_levels, start_level, initial_mass_kg, leg_costs, heuristic, transitions=None,
+                          mass_penalty=None, mass_bucket_kg=250.0, transition_cost=None, unlock=None, max_steps=None,
+                          min_mass_kg=None, stats=None):
+    """
+    A* over (waypoint index, level index, mass bucket) from waypoint 0 at `start_level`
+    to any level at the last waypoint.
+
+    leg_costs(i, mass, levels)  (cost, fuel kg) of the leg i -> i+1 at each of `levels` (level
+                                indices), as a sequence of pairs aligned with it (inf cost =
+                                unusable). `mass` is one value, or a list with one mass per level
+                                when held levels are walked together. Cost is what is minimized;
+                                it equals the fuel unless the caller prices time in with a cost
+                                index. Fuel sets the mass.
+    heuristic[i]                Admissible lower bound on cost from waypoint i to the end.
+    transitions[l]              Level indices reachable from level l (default: all).
+    mass_penalty[i]             Upper bound on extra cost to the end per extra kg carried at
+                                waypoint i, including any transition_cost still to be paid.
+                                When given, a state is pruned if another state at the same
+                                waypoint and level burned less by more than its extra mass
+                                can cost later; without it every mass bucket is kept.
+    transition_cost(l, mass)    Extra fuel (kg, >= 0) of leaving level l for each level index.
+    unlock[i]                   First waypoint index at which a level entered at waypoint i may
+                                be left again (minimum distance flown at a level). The legs up
+                                to it are flown as one edge, so every state may change level.
+    max_steps                   Most level changes allowed after waypoint 0. A state with fewer
+                                changes used and no more cost dominates one with more.
+    min_mass_kg                 Zero-fuel mass: states lighter than this have burned more than
+                                the fuel on board and are dropped as infeasible.
+
+    The level chosen at waypoint 0 is the initial cruise level: it is free and is not a step.
+    Returns (pool, goal_node, total_cost), or (pool, None, inf) if the goal is unreachable.
+    The pool holds one node per waypoint along every kept edge, so `pool.path` still yields
+    one node per waypoint. If a `stats` dict is given it receives expansion, push and
+    pruning counts.
+    """
+    pool = NodePool()
+    last, all_levels = n_waypoints - 1, range(n_levels)
+    bucket = lambda mass: int(mass // mass_bucket_kg)
+    # Per node: 0 = open, 1 = expanded, 2 = superseded, pruned or inside a held edge (never
+    # on the heap, or its heap entry is stale). The live nodes of slot `waypoint * n_levels
+    # + level` are chained head[slot] -> sibling[node] -> ... -> -1.
+    status, sibling = array('b'), array('i')
+    head = array('i', [-1]) * (n_waypoints * n_levels)
+    start = pool.add(0, start_level, float(initial_mass_kg), 0.0, -1)
+    status.append(0)
+    sibling.append(-1)
+    head[start_level] = start
+    open_set = [(heuristic[0], start)]
+    expanded = pushed = pruned = infeasible = 0
+
+    def live(slot):
+        node, nodes = head[slot], []
+        while node >= 0:
+            nodes.append(node)
+            node = sibling[node]
+        return nodes
+
+    def gap(o, other_mass, rate, extra_kg):
+        """Most that carrying `extra_kg` more than node `o` can cost later (0 within one mass bucket)."""
+        if bucket(pool.mass[o]) == bucket(other_mass):
+            return 0.0
+        return rate * max(0.0, extra_kg) if rate is not None else float('inf')
+
+    def dominated(slot, steps, g, mass, rate):
+        """Whether a live state of `slot` with no more steps used costs no more, allowing for mass."""
+        return any(pool.steps[o] <= steps and pool.g[o] + gap(o, mass, rate, pool.mass[o] - mass) <= g for o in live(slot))
+
+    def finish(goal):
+        if stats is not None:
+            stats.update(nodes_expanded=expanded, nodes_pushed=pushed, nodes_pruned=pruned, nodes_infeasible=infeasible,
+                         max_states_per_node=max(len(live(slot)) for slot in range(len(head))))
+        return pool, goal, (pool.g[goal] if goal is not None else float('inf'))
+
+    while open_set:
+        _, node = heapq.heappop(open_set)
+        if status[node]:
+            continue  # Expanded, superseded or pruned after it was pushed.
+        status[node] = 1
+        i, level, mass, g = pool.waypoint[node], pool.level[node], pool.mass[node], pool.g[node]
+        if i == last:
+            return finish(node)
+        expanded += 1
+        steps = pool.steps[node]
+        next_levels = transitions[level] if transitions is not None else all_levels
+        if i > 0 and max_steps is not None and steps >= max_steps:
+            next_levels = (level,) if level in next_levels else ()
+        extra = transition_cost(level, mass) if transition_cost is not None and i > 0 else None
+        edges = {}  # Next level -> (waypoint the edge ends at, steps, (g, mass) after each of its legs).
+        for next_level, (cost, fuel) in zip(next_levels, leg_costs(i, mass, next_levels)):
+            if cost == float('inf'):
+                continue
+            if extra is not None:
+                cost, fuel = cost + extra[next_level], fuel + extra[next_level]
+            changed = next_level != level
+            held = unlock is not None and (changed or i == 0)
+            edges[next_level] = (max(min(unlock[i], last), i + 1) if held else i + 1,
+                                 steps + (changed and i > 0) if max_steps is not None else 0, [(g + cost, mass - fuel)])
+        # A level entered here (and the initial level) is held up to unlock[i]: those legs are
+        # walked now, as one edge, instead of as states that cannot branch. Every held level
+        # goes into one leg_costs call per leg, with its own mass; a walk stops early once a
+        # state already at that waypoint and level (which is free to change) dominates it.
+        for j in range(i + 1, max((end for end, _, _ in edges.values()), default=i)):
+            rate = mass_penalty[j] if mass_penalty is not None else None
+            for l in [l for l, (end, _, _) in edges.items() if end > j]:
+                (leg_g, leg_mass) = edges[l][2][-1]
+                if dominated(j * n_levels + l, edges[l][1], leg_g, leg_mass, rate):
+                    pruned += 1
+                    del edges[l]
+            walking = [l for l, (end, _, _) in edges.items() if end > j]
+            if not walking:
+                break
+            for l, (cost, fuel) in zip(walking, leg_costs(j, [edges[l][2][-1][1] for l in walking], walking)):
+                legs = edges[l][2]
+                if cost == float('inf'):
+                    del edges[l]
+                else:
+                    legs.append((legs[-1][0] + cost, legs[-1][1] - fuel))
+        for next_level, (end, next_steps, legs) in edges.items():
+            next_g, next_mass = legs[-1]
+            if min_mass_kg is not None and next_mass < min_mass_kg:
+                infeasible += 1
+                continue
+            slot = end * n_levels + next_level
+            siblings = live(slot)
+            rate = mass_penalty[end] if mass_penalty is not None else None
+            if dominated(slot, next_steps, next_g, next_mass, rate):
+                pruned += 1
+                continue
+            kept = [o for o in siblings if pool.steps[o] < next_steps
+                    or next_g + gap(o, next_mass, rate, next_mass - pool.mass[o]) > pool.g[o]]
+            pruned += len(siblings) - len(kept)
+            for o in siblings:
+                if o not in kept:
+                    status[o] = 2
+            parent = node
+            for k, (leg_g, leg_mass) in enumerate(legs[:-1], i + 1):
+                parent = pool.add(k, next_level, leg_mass, leg_g, parent, next_steps)
+                status.append(2)
+                sibling.append(-1)
+            child = pool.add(end, next_level, next_mass, next_g, parent, next_steps)
+            status.append(0)
+            sibling.append(-1)
+            pushed += 1
+            chain = -1  # Relink the slot: the child first, then the kept states.
+            for o in reversed(kept):
+                sibling[o], chain = chain, o
+            sibling[child], head[slot] = chain, child
+            heapq.heappush(open_set, (next_g + heuristic[end], child))
+    return finish(None)
+
+def pareto_front_mask(fuel, minutes):
+    """Boolean mask of the points no other point beats on both fuel and time (ties kept once)."""
+    order = np.lexsort((minutes, fuel))
+    best_before = np.minimum.accumulate(np.concatenate(([np.inf], minutes[order][:-1])))
+    mask = np.zeros(len(fuel), dtype=bool)
+    mask[order[minutes[order] < best_before]] = True
+    return mask
+
+def thin_front(fuel, minutes, indices, epsilon):
+    """
+    Walks front points by increasing fuel and keeps one per `epsilon` = (kg, min) step along
+    the front. Both ends (least fuel, least time) are always kept.
+    """
+    ordered = indices[np.argsort(fuel[indices], kind='stable')]
+    kept, last_fuel, last_minutes = [], -np.inf, np.inf
+    for k in ordered:
+        if fuel[k] >= last_fuel + epsilon[0] or minutes[k] <= last_minutes - epsilon[1]:
+            kept.append(k)
+            last_fuel, last_minutes = fuel[k], minutes[k]
+    if len(ordered) and kept[-1] != ordered[-1]:
+        kept.append(ordered[-1])
+    return np.asarray(kept, dtype=np.intp)
+
+def pareto_profile_search(n_waypoints, n_levels, start_level, initial_mass_kg, leg_options, transitions=None,
+                          transition_cost=None, epsilon=(25.0, 0.5), max_points=None, max_fuel_kg=np.inf):
+    """
+    Single-pass fuel/time Pareto search over (level, speed option) per leg of a fixed
+    waypoint sequence, from waypoint 0 at `start_level`.
+
+    leg_options(i, masses)  (fuel_kg, minutes) for the leg i -> i+1 from states of the given
+                            masses; fuel has shape (len(masses), n_levels, n_options) and
+                            minutes broadcasts against it.
+    transitions[l]          Level indices reachable from level l (default: all).
+    transition_cost(l, m)   Extra fuel (kg) of leaving levels `l` at masses `m`, one row per
+                            state; level changes at waypoint 0 are free, as in the A* core.
+    epsilon                 (kg, minutes) resolution of the front: labels closer than this
+                            to a kept neighbour on both axes are dropped.
+    max_points              If given, at most this many points of the final front are returned,
+                            evenly spaced along it and always including both ends.
+    max_fuel_kg             Fuel on board: labels that burned more are dropped as infeasible.
+
+    Labels are (level, fuel, time) per waypoint. Mass is the take-off mass minus fuel, so a
+    label that burned less is also lighter and dominance on (fuel, time) is exact before
+    thinning. Step-climb limits need per-label history and are not applied.
+    Returns a list of (fuel_kg, minutes, levels per waypoint, option per leg), by fuel.
+    """
+    allowed = np.ones((n_levels, n_levels), dtype=bool)
+    if transitions is not None:
+        allowed[:] = False
+        for level, reachable in enumerate(transitions):
+            allowed[level, list(reachable)] = True
+    level = np.array([start_level])
+    fuel, minutes = np.zeros(1), np.zeros(1)
+    layers = []  # Per leg: (level, option, parent label) of the labels kept at its end.
+    for i in range(n_waypoints - 1):
+        leg_fuel, leg_minutes = leg_options(i, initial_mass_kg - fuel)
+        leg_fuel = np.asarray(leg_fuel, dtype=float)
+        if transition_cost is not None and i > 0:
+            leg_fuel = leg_fuel + np.asarray(transition_cost(level, initial_mass_kg - fuel))[:, :, np.newaxis]
+        cand_fuel = np.where(allowed[level][:, :, np.newaxis], fuel[:, np.newaxis, np.newaxis] + leg_fuel, np.inf).ravel()
+        cand_minutes = np.broadcast_to(minutes[:, np.newaxis, np.newaxis] + leg_minutes, leg_fuel.shape).ravel()
+        parent, next_level, option = np.unravel_index(np.arange(cand_fuel.size), leg_fuel.shape)
+        keep = np.isfinite(cand_fuel) & np.isfinite(cand_minutes) & (cand_fuel <= max_fuel_kg)
+        kept = []
+        for l in range(n_levels):
+            at_level = np.flatnonzero(keep & (next_level == l))
+            if at_level.size:
+                front = at_level[pareto_front_mask(cand_fuel[at_level], cand_minutes[at_level])]
+                kept.append(thin_front(cand_fuel, cand_minutes, front, epsilon))
+        if not kept:
+            return []
+        kept = np.concatenate(kept)
+        level, fuel, minutes = next_level[kept], cand_fuel[kept], cand_minutes[kept]
+        layers.append((level, option[kept], parent[kept]))
+    front = thin_front(fuel, minutes, np.flatnonzero(pareto_front_mask(fuel, minutes)), epsilon)
+    if max_points is not None and len(front) > max_points:
+        front = front[np.unique(np.linspace(0, len(front) - 1, max_points).round().astype(int))]
+    results = []
+    for label in front:
+        levels, options, k = [], [], label
+        for layer_level, layer_option, layer_parent in reversed(layers):
+            levels.append(int(layer_level[k]))
+            options.append(int(layer_option[k]))
+            k = layer_parent[k]
+        results.append((float(fuel[label]), float(minutes[label]), [start_level] + levels[::-1], options[::-1]))
+    return results
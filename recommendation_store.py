@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Recommendation Store and SQS Consumer for the Dashboard.
+
+`RecommendationStore` keeps published recommendations in a local SQLite file
+with indexes on flight_id, savings and receive time, so the dashboard can page,
+filter and sort without holding every result in memory, and results survive
+reloads and are shared by every operator using the same dashboard server.
+
+`SqsRecommendationConsumer` is a daemon thread that long-polls the output queue,
+writes each batch into the store and removes it with `delete_message_batch`.
+Messages are deleted only after they are committed to the store; duplicates from
+redelivery are ignored by SQS message id.
+
+Configuration (environment variables):
+    RECOMMENDATIONS_DB_PATH  SQLite file for stored recommendations (default: recommendations.sqlite).
+    SQS_WAIT_TIME_S          Long-poll wait per receive call, max 20 (default: 20).
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+RECOMMENDATIONS_DB_PATH = os.getenv('RECOMMENDATIONS_DB_PATH', 'recommendations.sqlite')
+SQS_WAIT_TIME_S = int(os.getenv('SQS_WAIT_TIME_S', '20'))
+SORT_COLUMNS = ('received_at', 'flight_id', 'fuel_saved_kg', 'baseline_fuel_kg', 'optimized_fuel_kg')
+
+class RecommendationStore:
+    """Indexed SQLite table of recommendations, safe to share between threads."""
+
+    def __init__(self, path=RECOMMENDATIONS_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS recommendations (
+                message_id TEXT PRIMARY KEY, flight_id TEXT, received_at REAL,
+                baseline_fuel_kg REAL, optimized_fuel_kg REAL, fuel_saved_kg REAL, payload TEXT);
+            CREATE INDEX IF NOT EXISTS idx_recommendations_flight ON recommendations (flight_id);
+            CREATE INDEX IF NOT EXISTS idx_recommendations_saved ON recommendations (fuel_saved_kg);
+            CREATE INDEX IF NOT EXISTS idx_recommendations_received ON recommendations (received_at);
+        """)
+        self._db.commit()
+
+    def add_many(self, items, received_at=None):
+        """Stores (message_id, recommendation dict) pairs; returns how many were new."""
+        received_at = time.time() if received_at is None else received_at
+        rows = [(message_id, rec.get('flight_id'), received_at, rec.get('baseline_fuel_kg'), rec.get('optimized_fuel_kg'),
+                 rec.get('fuel_saved_kg'), json.dumps(rec)) for message_id, rec in items]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO recommendations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            return self._db.total_changes - before
+
+    @staticmethod
+    def _where(flight_filter=None, min_saved_kg=None):
+        clauses, params = [], []
+        if flight_filter:
+            clauses.append("flight_id LIKE ?")
+            params.append(f"%{flight_filter}%")
+        if min_saved_kg is not None:
+            clauses.append("fuel_saved_kg >= ?")
+            params.append(min_saved_kg)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, flight_filter=None, min_saved_kg=None):
+        where, params = self._where(flight_filter, min_saved_kg)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM recommendations{where}", params).fetchone()[0]
+
+    def query(self, flight_filter=None, min_saved_kg=None, sort_by='received_at', descending=True, limit=20, offset=0):
+        """One page of recommendations (dicts, with `received_at` added) matching the filters."""
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"sort_by must be one of {SORT_COLUMNS}")
+        where, params = self._where(flight_filter, min_saved_kg)
+        sql = (f"SELECT payload, received_at FROM recommendations{where} "
+               f"ORDER BY {sort_by} {'DESC' if descending else 'ASC'}, message_id LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(json.loads(payload), received_at=received_at) for payload, received_at in rows]
+
+class SqsRecommendationConsumer(threading.Thread):
+    """Daemon thread that moves messages from the output queue into a RecommendationStore."""
+
+    def __init__(self, sqs_client, queue_url, store, wait_time_s=SQS_WAIT_TIME_S, error_backoff_s=5.0):
+        super().__init__(name='recommendation-consumer', daemon=True)
+        self.sqs, self.queue_url, self.store = sqs_client, queue_url, store
+        self.wait_time_s, self.error_backoff_s = wait_time_s, error_backoff_s
+        self.stats = {'received': 0, 'stored': 0, 'last_poll_at': None, 'last_error': None}
+        self._stop_event = threading.Event()
+
+    def poll_once(self):
+        """One long-poll receive, store and batch delete. Returns the number of messages received."""
+        response = self.sqs.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=self.wait_time_s)
+        self.stats['last_poll_at'] = time.time()
+        messages = response.get('Messages', [])
+        if not messages:
+            return 0
+        items = []
+        for message in messages:
+            try:
+                items.append((message['MessageId'], json.loads(message['Body'])))
+            except (KeyError, json.JSONDecodeError) as e:
+                print(f"Warning: Skipping unreadable recommendation message {message.get('MessageId')}: {e}")
+        self.stats['stored'] += self.store.add_many(items)
+        self.stats['received'] += len(messages)
+        entries = [{'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']} for i, message in enumerate(messages)]
+        result = self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+        for failure in result.get('Failed', []):
+            print(f"Warning: Could not delete message {failure.get('Id')} from the output queue: {failure.get('Message')}")
+        return len(messages)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                print(f"Warning: Recommendation consumer poll failed. Error: {e}")
+                self._stop_event.wait(self.error_backoff_s)
+
+    def stop(self):
+        self._stop_event.set()
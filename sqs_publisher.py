@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled SQS Client and Buffered Recommendation Publisher.
+
+`get_sqs_client()` builds one boto3 SQS client per process and region, so warm
+Lambda invocations reuse it (and its connection pool) instead of paying client
+construction on every publish. boto3 is imported with the first client, so importing
+this module costs nothing on a cold start that never publishes. `BatchPublisher` buffers messages and sends them
+with `send_message_batch`, up to 10 entries or 256 KB per call. The buffer is
+flushed when it is full, when its oldest entry reaches `max_age_s` (on a timer),
+and explicitly via `flush()` at the end of a handler invocation. Only entries
+reported as failed are retried; entries that still fail are returned by `flush()`.
+
+Configuration (environment variables):
+    SQS_PUBLISH_MAX_AGE_S  Seconds a message may wait in the buffer (default: 2).
+    SQS_PUBLISH_RETRIES    Retries for failed entries after the first attempt (default: 3).
+    SQS_MAX_CONNECTIONS    Connection pool size of the shared client (default: 20).
+"""
+import os
+import time
+import json
+import random
+import atexit
+import functools
+import threading
+
+SQS_PUBLISH_MAX_AGE_S = float(os.getenv('SQS_PUBLISH_MAX_AGE_S', '2'))
+SQS_PUBLISH_RETRIES = int(os.getenv('SQS_PUBLISH_RETRIES', '3'))
+SQS_MAX_CONNECTIONS = int(os.getenv('SQS_MAX_CONNECTIONS', '20'))
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+@functools.lru_cache(maxsize=None)
+def get_sqs_client(region_name=None):
+    """The process-wide SQS client for a region, created on first use."""
+    import boto3
+    from botocore.config import Config
+    config = Config(max_pool_connections=SQS_MAX_CONNECTIONS, retries={'max_attempts': 3, 'mode': 'standard'})
+    return boto3.client('sqs', region_name=region_name, config=config)
+
+class BatchPublisher:
+    """Thread-safe buffer that publishes JSON messages to one queue in batches."""
+
+    def __init__(self, queue_url, client=None, max_entries=MAX_BATCH_ENTRIES, max_bytes=MAX_BATCH_BYTES,
+                 max_age_s=SQS_PUBLISH_MAX_AGE_S, retries=SQS_PUBLISH_RETRIES, backoff_s=0.1):
+        self.queue_url, self._client = queue_url, client
+        self.max_entries, self.max_bytes, self.max_age_s = max_entries, max_bytes, max_age_s
+        self.retries, self.backoff_s = retries, backoff_s
+        self._lock = threading.RLock()
+        self._buffer, self._buffer_bytes, self._oldest = [], 0, None
+        self._failed, self._next_id, self._timer = [], 0, None
+        self.stats = {'messages': 0, 'batches': 0, 'retried_entries': 0, 'failed_entries': 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_sqs_client(os.getenv('AWS_DEFAULT_REGION'))
+        return self._client
+
+    def publish(self, message, key=None):
+        """
+        Buffers `message` (a dict, serialized as JSON) and sends a batch if the buffer is
+        full. `key` (e.g. the flight_id) identifies the message in `flush()` failures.
+        """
+        body = json.dumps(message)
+        size = len(body.encode('utf-8'))
+        with self._lock:
+            entry = {'Id': str(self._next_id), 'MessageBody': body, 'key': key}
+            self._next_id += 1
+            self.stats['messages'] += 1
+            if size > self.max_bytes:
+                print(f"ERROR: Message for {key} is {size} bytes, over the SQS limit of {self.max_bytes}.")
+                self._failed.append(entry)
+                return
+            if self._buffer and (len(self._buffer) >= self.max_entries or self._buffer_bytes + size > self.max_bytes):
+                self._send_buffer()
+            self._buffer.append(entry)
+            self._buffer_bytes += size
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._start_timer()
+            if len(self._buffer) >= self.max_entries:
+                self._send_buffer()
+
+    def flush(self):
+        """Sends everything buffered. Returns the keys of messages that could not be published."""
+        with self._lock:
+            self._send_buffer()
+            failed, self._failed = [entry['key'] for entry in self._failed], []
+        return failed
+
+    def _start_timer(self):
+        if self.max_age_s is None or self.max_age_s <= 0:
+            return
+        self._timer = threading.Timer(self.max_age_s, self._flush_if_old)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_if_old(self):
+        with self._lock:
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.max_age_s:
+                self._send_buffer()
+
+    def _send_buffer(self):
+        entries = self._buffer
+        self._buffer, self._buffer_bytes, self._oldest = [], 0, None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if entries:
+            self._failed.extend(self._send_with_retries(entries))
+
+    def _send_with_retries(self, entries):
+        """Sends one batch, retrying only the failed (non sender-fault) entries. Returns what still failed."""
+        pending, permanent = entries, []
+        for attempt in range(self.retries + 1):
+            by_id = {entry['Id']: entry for entry in pending}
+            try:
+                response = self.client.send_message_batch(
+                    QueueUrl=self.queue_url, Entries=[{'Id': e['Id'], 'MessageBody': e['MessageBody']} for e in pending])
+                self.stats['batches'] += 1
+                failures = response.get('Failed', [])
+            except Exception as e:
+                print(f"Warning: send_message_batch failed for {len(pending)} message(s). Error: {e}")
+                failures = [{'Id': entry_id, 'SenderFault': False} for entry_id in by_id]
+            permanent += [by_id[f['Id']] for f in failures if f.get('SenderFault')]
+            pending = [by_id[f['Id']] for f in failures if not f.get('SenderFault')]
+            if not pending:
+                break
+            if attempt < self.retries:
+                self.stats['retried_entries'] += len(pending)
+                time.sleep(self.backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5))
+        failed = permanent + pending
+        self.stats['failed_entries'] += len(failed)
+        for entry in failed:
+            print(f"ERROR: Could not publish message for {entry['key']} to SQS.")
+        return failed
+
+    def close(self):
+        """Flushes on interpreter exit so buffered CLI results are not lost."""
+        self.flush()
+
+def create_publisher(queue_url, client=None):
+    publisher = BatchPublisher(queue_url, client)
+    atexit.register(publisher.close)
+    return publisher
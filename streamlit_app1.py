@@ -5,8 +5,13 @@
 #
 # Features:
 # 1. Triggers new optimization jobs by sending messages to an AWS SQS input queue.
-# 2. Polls an AWS SQS output queue to fetch and display completed optimization reports.
-# 3. Loads all configuration (AWS region, queue URLs) from a .env file for security
+# 2. Consumes the AWS SQS output queue on a background thread (long polling, batch
+#    deletes) into a local SQLite store, and pages/filters/sorts reports from it.
+# 3. Shows each report's fuel/time Pareto front (when published) as a chart and table
+#    of dispatch options.
+# 4. Shows each report's what-if table (when published): fuel, savings and chosen levels
+#    for every takeoff mass / weather scenario.
+# 5. Loads all configuration (AWS region, queue URLs) from a .env file for security
 #    and portability, making it fully platform-independent.
 #
 # How to Run:
@@ -17,9 +22,10 @@
 import streamlit as st
 import boto3
 import json
-import pandas as pd
 import os
 from dotenv import load_dotenv
+from flight_plan_store import FlightPlanStore
+from recommendation_store import RecommendationStore, SqsRecommendationConsumer, SORT_COLUMNS
 from botocore.exceptions import NoCredentialsError, ClientError
 
 # --- 1. CONFIGURATION & INITIALIZATION ---
@@ -47,8 +53,8 @@ def get_boto3_client(service_name):
     """
     try:
         client = boto3.client(service_name, region_name=AWS_REGION)
-        # A simple check to see if credentials are valid
-        client.get_caller_identity()
+        # A simple check to see if credentials are valid (the SQS client has no get_caller_identity)
+        boto3.client('sts', region_name=AWS_REGION).get_caller_identity()
         return client
     except NoCredentialsError:
         st.error("❌ AWS credentials not found. Please configure your credentials (e.g., in the .env file).")
@@ -67,8 +73,7 @@ def load_flight_plans():
     Uses Streamlit's caching to avoid rereading the file on every interaction.
     """
     try:
-        df = pd.read_csv("flight_plans.csv")
-        return df['flight_id'].tolist()
+        return FlightPlanStore().flight_ids()
     except FileNotFoundError:
         st.error("`flight_plans.csv` not found. Make sure it's in the same directory.")
         return []
@@ -91,31 +96,26 @@ def send_optimization_request(sqs_client, flight_id):
         st.error(f"Failed to send message to SQS input queue: {e}")
         return False
 
-def get_recommendations_from_sqs(sqs_client):
+@st.cache_resource
+def get_recommendation_store():
     """
-    Polls the SQS output queue once and fetches all available result messages.
+    Opens the shared SQLite recommendation store once per dashboard server, so results
+    survive page reloads and every operator sees the same reports.
     """
-    if not sqs_client or not SQS_OUTPUT_QUEUE_URL:
-        # Don't show an error if output queue isn't configured, just return empty
-        return []
-    
-    messages = []
-    try:
-        while True:
-            response = sqs_client.receive_message(
-                QueueUrl=SQS_OUTPUT_QUEUE_URL, MaxNumberOfMessages=10, WaitTimeSeconds=1
-            )
-            if 'Messages' in response:
-                for msg in response['Messages']:
-                    messages.append(json.loads(msg['Body']))
-                    # Clean up the message from the queue after processing
-                    sqs_client.delete_message(QueueUrl=SQS_OUTPUT_QUEUE_URL, ReceiptHandle=msg['ReceiptHandle'])
-            else:
-                # No more messages in the queue
-                break
-    except ClientError as e:
-        st.warning(f"Could not poll SQS output queue: {e}. Check URL and permissions.")
-    return messages
+    return RecommendationStore()
+
+@st.cache_resource
+def start_recommendation_consumer(_sqs_client, _store):
+    """
+    Starts one background consumer per server process. It long-polls the output queue,
+    writes results into the store and deletes them with `delete_message_batch`.
+    """
+    if not _sqs_client or not SQS_OUTPUT_QUEUE_URL:
+        # Don't show an error if output queue isn't configured, just run without a consumer
+        return None
+    consumer = SqsRecommendationConsumer(_sqs_client, SQS_OUTPUT_QUEUE_URL, _store)
+    consumer.start()
+    return consumer
 
 # --- 3. STREAMLIT USER INTERFACE ---
 
@@ -147,24 +147,38 @@ if sqs_client:
     # --- Section for displaying results ---
     st.header("Completed Optimization Reports")
 
-    if 'recommendations' not in st.session_state:
-        st.session_state.recommendations = []
+    store = get_recommendation_store()
+    consumer = start_recommendation_consumer(sqs_client, store)
+    if consumer is None:
+        st.info("SQS_OUTPUT_QUEUE_URL is not configured; showing previously stored reports only.")
+    elif consumer.stats['last_error']:
+        st.warning(f"Could not poll SQS output queue: {consumer.stats['last_error']}. Check URL and permissions.")
+
+    # Filters, sorting and paging are answered by the indexed store, so each rerun only
+    # renders one page of reports.
+    filter_col, saved_col, sort_col, order_col, size_col = st.columns([2, 1, 1, 1, 1])
+    flight_filter = filter_col.text_input("Filter by Flight ID:", "")
+    min_saved_kg = saved_col.number_input("Min. Savings (kg):", min_value=0, value=0, step=100)
+    sort_by = sort_col.selectbox("Sort by:", SORT_COLUMNS, format_func=lambda c: c.replace('_', ' ').title())
+    descending = order_col.selectbox("Order:", ["Descending", "Ascending"]) == "Descending"
+    page_size = size_col.selectbox("Per page:", [10, 20, 50], index=1)
+
+    total = store.count(flight_filter or None, min_saved_kg or None)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, value=1, step=1)
 
     if st.button("🔄 Check for New Recommendations"):
-        with st.spinner('Polling SQS for new optimization results...'):
-            new_recs = get_recommendations_from_sqs(sqs_client)
-            if new_recs:
-                # Add new recommendations to the top of the list
-                st.session_state.recommendations = new_recs + st.session_state.recommendations
-                st.success(f"Found {len(new_recs)} new recommendation(s)!")
-            else:
-                st.info("No new recommendations found in the queue.")
-
-    if not st.session_state.recommendations:
-        st.info("No optimization recommendations loaded. Click the button above to check the queue.")
+        # The consumer runs continuously; refreshing simply re-reads the store.
+        st.rerun()
+
+    if total == 0:
+        st.info("No optimization recommendations stored yet. New results appear here as the agent publishes them.")
     else:
+        st.caption(f"Showing {min(page_size, total - (page - 1) * page_size)} of {total} report(s).")
+        recommendations = store.query(flight_filter or None, min_saved_kg or None, sort_by, descending,
+                                      limit=page_size, offset=(page - 1) * page_size)
         # Display each recommendation in a formatted block
-        for rec in st.session_state.recommendations:
+        for rec in recommendations:
             st.markdown("---")
             st.subheader(f"Report for Flight: `{rec.get('flight_id', 'N/A')}`")
 
@@ -176,6 +190,34 @@ if sqs_client:
                         value=f"{savings:,} kg",
                         delta=f"-{savings:,} kg" if savings > 0 else None)
 
+            if rec.get('optimized_time_min') is not None:
+                st.caption(f"Optimized flight time: {rec['optimized_time_min']:,} min"
+                           + (f" at a cost index of {rec['cost_index']} kg/min" if rec.get('cost_index') is not None else ""))
+
+            # The Pareto front is published column-wise: parallel fuel/time lists plus, for each
+            # option, the [leg, flight level, TAS] points where the profile changes.
+            front = rec.get('pareto_front')
+            if front and front.get('fuel_kg'):
+                with st.expander(f"Fuel/Time Options ({len(front['fuel_kg'])} on the Pareto front)"):
+                    options = [{"Fuel (kg)": fuel, "Time (min)": minutes,
+                                "Profile": " | ".join(f"leg {leg}: FL{fl} @ {tas} kt" for leg, fl, tas in profile)}
+                               for fuel, minutes, profile in zip(front['fuel_kg'], front['time_min'], front['profiles'])]
+                    st.scatter_chart(options, x="Time (min)", y="Fuel (kg)")
+                    st.dataframe(options, use_container_width=True, hide_index=True)
+
+            # The what-if sweep is also column-wise: one entry per (takeoff mass, weather member)
+            # scenario, with the [leg, flight level] points where its profile changes.
+            what_if = rec.get('what_if')
+            if what_if and what_if.get('fuel_saved_kg'):
+                with st.expander(f"What-If Scenarios ({len(what_if['fuel_saved_kg'])} mass/weather combinations)"):
+                    scenarios = [{"Takeoff Mass (kg)": mass, "Weather Member": member, "Baseline (kg)": baseline,
+                                  "Optimized (kg)": optimized, "Savings (kg)": saved,
+                                  "Profile": " | ".join(f"leg {leg}: FL{fl}" for leg, fl in profile)}
+                                 for mass, member, baseline, optimized, saved, profile in zip(
+                                     what_if['initial_mass_kg'], what_if['weather_member'], what_if['baseline_fuel_kg'],
+                                     what_if['optimized_fuel_kg'], what_if['fuel_saved_kg'], what_if['profiles'])]
+                    st.dataframe(scenarios, use_container_width=True, hide_index=True)
+
             with st.expander("View Agent's Rationale and Detailed Route"):
                 st.text("Agent's Rationale:")
                 st.info(rec.get('rationale', 'No rationale provided.'))
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures: the Lambda module wired to an in-memory SQS queue and fixture weather."""
+import pytest
+import lambda_handler as lh
+from sqs_publisher import BatchPublisher
+from weather_providers import FixtureWeatherProvider
+from benchmarks.local_sqs import InMemorySQS
+
+QUEUE_URL = 'local://recommendations'
+
+@pytest.fixture
+def local_sqs(monkeypatch):
+    """An InMemorySQS that receives everything lambda_handler publishes; weather comes from FixtureWeatherProvider."""
+    sqs = InMemorySQS()
+    monkeypatch.setattr(lh, 'RECOMMENDATION_PUBLISHER', BatchPublisher(QUEUE_URL, client=sqs, max_age_s=None))
+    monkeypatch.setattr(lh, 'WEATHER_PROVIDER', FixtureWeatherProvider({}))
+    return sqs
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Resuming a batch from its output: only successful flights count as done."""
+import json
+from batch_runner import JsonlResultWriter
+
+def test_resume_retries_failed_flights(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    writer = JsonlResultWriter(path)
+    writer.write([{'flight_id': 'UA123', 'status': 'success'}, {'flight_id': 'AA456', 'status': 'error', 'message': 'boom'}])
+    assert writer.done == {'UA123'}
+    writer.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"flight_id": "DL7')  # Torn write from a crash.
+
+    writer = JsonlResultWriter(path)
+    assert writer.done == {'UA123'}
+    writer.write([{'flight_id': 'AA456', 'status': 'success'}])
+    writer.close()
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [(r['flight_id'], r['status']) for r in records] == [('UA123', 'success'), ('AA456', 'error'), ('AA456', 'success')]
+    writer = JsonlResultWriter(path)
+    assert writer.done == {'UA123', 'AA456'}
+    writer.close()
+
+def test_no_resume_starts_over(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    writer = JsonlResultWriter(path)
+    writer.write([{'flight_id': 'UA123', 'status': 'success'}])
+    writer.close()
+    writer = JsonlResultWriter(path, resume=False)
+    assert writer.done == set()
+    writer.close()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""run_direct_workflow end to end: flight plan, fixture weather, optimization, rationale and the published message."""
+import lambda_handler as lh
+
+class StubRationaleModel:
+    """Stands in for the rationale Agent: records each prompt and answers with fixed text."""
+
+    def __init__(self, text="Climbing as the aircraft burns off fuel saves fuel."):
+        self.text, self.prompts = text, []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return f"  {self.text}\n"
+
+def test_direct_workflow_returns_and_publishes_the_recommendation(local_sqs):
+    flight_id = lh.FLIGHT_PLAN_STORE.flight_ids()[0]
+    model = StubRationaleModel()
+    result = lh.run_direct_workflow(flight_id, rationale_model=model)
+    assert result['status'] == 'success'
+    response = result['response']
+    assert response['flight_id'] == flight_id
+    assert response['rationale'] == model.text
+    assert len(model.prompts) == 1 and flight_id in model.prompts[0]
+    assert response['fuel_saved_kg'] == response['baseline_fuel_kg'] - response['optimized_fuel_kg']
+    assert [step['waypoint'] for step in response['optimized_route']] == lh.FLIGHT_PLAN_STORE.get(flight_id)['waypoints']
+
+    assert lh.RECOMMENDATION_PUBLISHER.flush() == []
+    [message] = local_sqs.bodies(lh.RECOMMENDATION_PUBLISHER.queue_url)
+    expected = {key: response[key] for key in ('flight_id', 'baseline_fuel_kg', 'optimized_fuel_kg', 'fuel_saved_kg', 'rationale', 'optimized_route')}
+    expected.update({key: response[key] for key in ('optimized_time_min', 'cost_index', 'pareto_front', 'what_if') if response.get(key) is not None})
+    assert message == expected
+
+def test_direct_workflow_falls_back_to_the_template_rationale(local_sqs):
+    def failing_model(prompt):
+        raise RuntimeError("model unavailable")
+    flight_id = lh.FLIGHT_PLAN_STORE.flight_ids()[0]
+    result = lh.run_direct_workflow(flight_id, rationale_model=failing_model)
+    assert result['status'] == 'success'
+    assert result['response']['rationale'].startswith(f"Flight {flight_id} ")
+    lh.RECOMMENDATION_PUBLISHER.flush()
+    assert [body['rationale'] for body in local_sqs.bodies(lh.RECOMMENDATION_PUBLISHER.queue_url)] == [result['response']['rationale']]
+
+def test_direct_workflow_publishes_nothing_for_an_unknown_flight(local_sqs):
+    result = lh.run_direct_workflow('UNKNOWN')
+    assert result['status'] == 'error'
+    assert lh.RECOMMENDATION_PUBLISHER.flush() == []
+    assert local_sqs.bodies(lh.RECOMMENDATION_PUBLISHER.queue_url) == []
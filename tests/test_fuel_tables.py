@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Fuel-flow tables against live OpenAP: interpolation error inside the grid, the live fallback outside it."""
+import numpy as np
+import pytest
+import fuel_tables as ft
+
+@pytest.fixture(scope='module')
+def b772_table():
+    table = ft.FuelFlowTable.build('B772')
+    table.validate()
+    return table
+
+def test_live_openap_takes_the_isa_deviation():
+    cold, hot = (ft.openap_fuel_flow('B772', 200000, 35000, 450, isa_dev) for isa_dev in (-10, 20))
+    assert np.isfinite(cold) and np.isfinite(hot) and cold != hot
+
+def test_table_is_within_tolerance_of_live_openap(b772_table):
+    assert b772_table.max_error <= ft.FUEL_TABLE_TOLERANCE
+    rng = np.random.default_rng(1)
+    points = [rng.uniform(axis[0], axis[-1], 64) for axis in b772_table.axes]
+    np.testing.assert_allclose(b772_table.fuel_flow(*points), ft.openap_fuel_flow('B772', *points), rtol=ft.FUEL_TABLE_TOLERANCE)
+
+def test_points_outside_the_grid_use_live_openap(b772_table):
+    mass = np.array([200000.0, 700000.0])  # The second mass is above MASS_GRID_KG.
+    altitude, tas, isa_dev = np.array([35000.0, 37000.0]), np.array([450.0, 480.0]), np.array([5.0, 110.0])
+    assert b772_table.contains(mass, altitude, tas, isa_dev).tolist() == [True, False]
+    flow = b772_table.fuel_flow(mass, altitude, tas, isa_dev)
+    assert flow[1] == pytest.approx(float(ft.openap_fuel_flow('B772', mass[1], altitude[1], tas[1], isa_dev[1])), rel=1e-12)
+    assert flow[0] == pytest.approx(float(ft.openap_fuel_flow('B772', mass[0], altitude[0], tas[0], isa_dev[0])), rel=ft.FUEL_TABLE_TOLERANCE)
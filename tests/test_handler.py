@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""The SQS batch handler: partial batch failures and de-duplication of repeated flight_ids."""
+import sys
+import types
+import threading
+from collections import Counter
+import lambda_handler as lh
+from benchmarks.local_sqs import synthetic_sqs_event
+
+def batch_with_malformed_and_duplicate(flight_ids):
+    """Records for `flight_ids`, a malformed record (no flight_id) and a repeat of the first flight."""
+    event = synthetic_sqs_event(flight_ids + ['MALFORMED', flight_ids[0]])
+    event['Records'][len(flight_ids)]['body'] = '{"flight_id": ""}'
+    return event
+
+class CountingWorkflow:
+    """Records every flight it runs; flights in `failing` report an error."""
+
+    def __init__(self, failing=()):
+        self.calls, self.failing = Counter(), set(failing)
+
+    def __call__(self, flight_id):
+        self.calls[flight_id] += 1
+        return {'status': 'error' if flight_id in self.failing else 'success'}
+
+def failed_ids(response):
+    return sorted(item['itemIdentifier'] for item in response['batchItemFailures'])
+
+def test_malformed_record_fails_alone_and_duplicate_runs_once(local_sqs):
+    event = batch_with_malformed_and_duplicate(['QF202', 'EK303'])
+    workflow = CountingWorkflow()
+    response = lh.handler(event, workflow=workflow)
+    assert failed_ids(response) == ['msg-2']
+    assert workflow.calls == Counter({'QF202': 1, 'EK303': 1})
+
+def test_failed_flight_reports_every_message_that_asked_for_it(local_sqs):
+    event = batch_with_malformed_and_duplicate(['QF202', 'EK303'])
+    workflow = CountingWorkflow(failing={'QF202'})
+    response = lh.handler(event, workflow=workflow)
+    assert failed_ids(response) == ['msg-0', 'msg-2', 'msg-3']
+    assert workflow.calls['QF202'] == 1
+
+def test_direct_workflow_batch_publishes_each_flight_once(local_sqs):
+    flight_ids = lh.FLIGHT_PLAN_STORE.flight_ids()[:2]
+    event = batch_with_malformed_and_duplicate(flight_ids)
+    response = lh.handler(event, workflow=lh.run_direct_workflow)
+    assert failed_ids(response) == ['msg-2']
+    published = [body['flight_id'] for body in local_sqs.bodies(lh.RECOMMENDATION_PUBLISHER.queue_url)]
+    assert sorted(published) == sorted(flight_ids)
+
+class FakeAgent:
+    """Stands in for strands.Agent: counts constructions and keeps a message list."""
+    built = 0
+
+    def __init__(self, **kwargs):
+        FakeAgent.built += 1
+        self.messages = []
+
+def test_warm_invocations_reuse_worker_threads_and_their_agents(local_sqs, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'strands', types.SimpleNamespace(Agent=FakeAgent, tool=lambda function: function))
+    monkeypatch.setattr(lh, '_AGENTS', threading.local())
+    # A fresh one-thread pool: threads left by earlier tests could otherwise pick up the work.
+    monkeypatch.setattr(lh, 'HANDLER_MAX_WORKERS', 1)
+    monkeypatch.setattr(lh, '_HANDLER_POOL', None)
+    FakeAgent.built, threads, agents = 0, set(), set()
+
+    def workflow(flight_id):
+        threads.add(threading.get_ident())
+        agents.add(id(lh.get_agent("rationale")))
+        return {'status': 'success'}
+
+    for _ in range(3):
+        assert lh.handler(synthetic_sqs_event(['QF202']), workflow=workflow) == {'batchItemFailures': []}
+    assert len(threads) == 1 and len(agents) == 1 and FakeAgent.built == 1
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Transition costs must change with mass no faster than the slope the dominance penalty allows for."""
+import numpy as np
+import pytest
+import lambda_handler as lh
+from geometry import WaypointGeometry
+from level_transitions import get_transition_table
+from benchmarks.synthetic import great_circle_route, fixture_weather
+
+def test_rows_stay_within_the_max_mass_slope():
+    table = get_transition_table('B772', lh.FLIGHT_LEVEL_ALTITUDES_FT)
+    slope = table.max_mass_slope()
+    masses = np.linspace(table.masses_kg[0] - 5000, table.masses_kg[-1] + 5000, 997)
+    levels = np.zeros(len(masses), dtype=int)
+    rows = table.row(levels, masses)
+    assert slope > 0
+    assert np.all(np.abs(np.diff(rows, axis=0)) <= slope * np.diff(masses)[:, np.newaxis] + 1e-9)
+    np.testing.assert_allclose(table.row(0, table.masses_kg[3]), table.costs[0, :, 3])
+
+def test_dominance_keeps_the_optimum_with_step_climbs(monkeypatch):
+    fixes = dict(lh.WAYPOINT_COORDINATES)
+    waypoints = great_circle_route(10, 'KJFK', 'EGLL', fixes, seed=3, prefix="TRANS")
+    for waypoint in waypoints:
+        monkeypatch.setitem(lh.WAYPOINT_COORDINATES, waypoint, fixes[waypoint])
+    monkeypatch.setattr(lh, 'GEOMETRY', WaypointGeometry(lh.WAYPOINT_COORDINATES))
+    plan = {'flight_id': 'TRANS1', 'waypoints': waypoints, 'aircraft_type': 'B772', 'initial_mass_kg': 240000}
+    weather = fixture_weather(waypoints)
+    _, pruned_fuel = lh.a_star_search(plan, weather, dominance=True)
+    _, exhaustive_fuel = lh.a_star_search(plan, weather, dominance=False)
+    assert pruned_fuel == pytest.approx(exhaustive_fuel, abs=1e-6)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""The shared A* node pool: index allocation, parent-index path rebuilding, and the paths searches return."""
+import pytest
+import notebook_style_runner as nb
+from geometry import WaypointGeometry
+from optimizer import NodePool
+from benchmarks.synthetic import great_circle_route
+
+@pytest.fixture
+def route(monkeypatch):
+    """A 12-fix great-circle route, registered in the notebook's coordinates for this test only."""
+    fixes = dict(nb.AIRPORT_COORDS)
+    waypoints = great_circle_route(12, 'KJFK', 'EGLL', fixes, seed=0, prefix="POOL")
+    for waypoint in waypoints:
+        monkeypatch.setitem(nb.AIRPORT_COORDS, waypoint, fixes[waypoint])
+    monkeypatch.setattr(nb, 'AIRPORT_GEOMETRY', WaypointGeometry(nb.AIRPORT_COORDS))
+    return waypoints
+
+def test_nodes_are_consecutive_indices_into_parallel_arrays():
+    pool = NodePool()
+    assert len(pool) == 0
+    root = pool.add(0, 3, 150000.0, 0.0, -1)
+    child = pool.add(1, 4, 149000.0, 1000.0, root, steps=1)
+    assert (root, child, len(pool)) == (0, 1, 2)
+    assert (pool.waypoint[child], pool.level[child], pool.mass[child], pool.g[child], pool.parent[child], pool.steps[child]) == (1, 4, 149000.0, 1000.0, root, 1)
+
+def test_path_follows_parent_indices_from_the_root():
+    pool = NodePool()
+    root = pool.add(0, 3, 150000.0, 0.0, -1)
+    left = pool.add(1, 3, 149000.0, 1000.0, root)
+    pool.add(1, 4, 148900.0, 1100.0, root)
+    leaf = pool.add(2, 3, 148000.0, 2000.0, left)
+    assert pool.path(leaf) == [root, left, leaf]
+    assert pool.path(root) == [root]
+
+@pytest.mark.parametrize("step_climbs", [False, True])
+def test_search_path_is_rebuilt_from_the_pool(route, step_climbs):
+    stats = {}
+    path, total_fuel = nb.a_star_search(route, 'B772', 150000, {}, stats=stats, step_climbs=step_climbs)
+    assert stats['nodes_pushed'] >= len(route) - 1
+    assert path[0] == ('start', 35000, 0, 150000)
+    assert [entry[0] for entry in path[1:]] == route[1:]
+    assert all(altitude in nb.CRUISE_ALTITUDES_FT for _, altitude, _, _ in path)
+    assert sum(leg_fuel for _, _, leg_fuel, _ in path) == pytest.approx(total_fuel, abs=0.01 * len(route))
+    assert path[-1][3] == pytest.approx(150000 - total_fuel, abs=0.01)
+    masses = [mass for _, _, _, mass in path]
+    assert masses == sorted(masses, reverse=True)
+
+def test_batch_plan_that_burns_below_zero_fuel_mass_is_an_error(route):
+    _, total_fuel = nb.a_star_search(route, 'B772', 150000, {}, step_climbs=False)
+    plan = {'flight_id': 'ZFM1', 'waypoints': route, 'aircraft_type': 'B772', 'initial_mass_kg': 150000,
+            'zero_fuel_mass_kg': 150000 - total_fuel / 2}
+    result = nb.optimize_plan(plan, {})
+    assert result['status'] == 'error' and "no feasible profile" in result['message']
+    assert nb.optimize_plan({**plan, 'zero_fuel_mass_kg': 150000 - 2 * total_fuel}, {})['status'] == 'success'
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""The batched segment costs the searches use must match the scalar `calculate_fuel_burn` path."""
+import numpy as np
+import pytest
+import lambda_handler as lh
+from geometry import WaypointGeometry
+from wind_grid import WindGrid
+from benchmarks.synthetic import synthetic_route, great_circle_route, fixture_weather
+
+# Each route builder registers its fixes in the coordinates dict it is given.
+ROUTES = [
+    ('B772', 150000, lambda coordinates: ['KJFK', 'KORD', 'KSFO']),
+    ('A359', 200000, lambda coordinates: synthetic_route(12, 'KATL', 'RJTT', coordinates, seed=1, prefix="SEGSYN")),
+    ('A388', 175000, lambda coordinates: great_circle_route(12, 'YSSY', 'KLAX', coordinates, seed=2, prefix="SEGGC")),
+]
+
+def scalar_burns(aircraft_type, mass_kg, from_wp, to_wp, weather_data):
+    """One calculate_fuel_burn call per flight level, with the destination fix's weather."""
+    (lat1, lon1), (lat2, lon2) = lh.WAYPOINT_COORDINATES[from_wp], lh.WAYPOINT_COORDINATES[to_wp]
+    distance_km = lh.haversine(lat1, lon1, lat2, lon2)
+    weather = weather_data.get(to_wp, {})
+    temp_c, wind_speed_kts = weather.get('temperature_c', 15), weather.get('wind_speed_kts', 0)
+    return np.array([lh.calculate_fuel_burn(aircraft_type, mass_kg, fl * 100, distance_km, lh.CRUISE_TAS_KTS, temp_c, lh.CRUISE_TAS_KTS + wind_speed_kts)
+                     for fl in lh.FLIGHT_LEVELS])
+
+@pytest.fixture(autouse=True)
+def no_wind_grid(monkeypatch):
+    monkeypatch.setattr(lh, 'get_wind_grid', lambda: None)  # Per-waypoint weather records, as in the scalar path.
+
+@pytest.mark.parametrize("aircraft_type, mass_kg, make_route", ROUTES)
+def test_batched_segment_costs_match_scalar(aircraft_type, mass_kg, make_route, monkeypatch):
+    fixes = dict(lh.WAYPOINT_COORDINATES)
+    waypoints = make_route(fixes)
+    for waypoint in waypoints:
+        monkeypatch.setitem(lh.WAYPOINT_COORDINATES, waypoint, fixes[waypoint])  # Removed again after the test.
+    monkeypatch.setattr(lh, 'GEOMETRY', WaypointGeometry(lh.WAYPOINT_COORDINATES))
+    weather = fixture_weather(waypoints)
+    for from_wp, to_wp in zip(waypoints, waypoints[1:]):
+        scalar = scalar_burns(aircraft_type, mass_kg, from_wp, to_wp, weather)
+        np.testing.assert_allclose(lh.segment_fuel_burns(aircraft_type, mass_kg, from_wp, to_wp, weather), scalar, rtol=1e-9)
+        frontier = lh.segment_fuel_burns(aircraft_type, [mass_kg, mass_kg - 5000], from_wp, to_wp, weather)
+        np.testing.assert_allclose(frontier[0], scalar, rtol=1e-9)
+        np.testing.assert_allclose(frontier[1], scalar_burns(aircraft_type, mass_kg - 5000, from_wp, to_wp, weather), rtol=1e-9)
+
+def random_wind_grid(seed=0):
+    rng = np.random.default_rng(seed)
+    lat, lon, level, time_h = np.linspace(-90, 90, 19), np.linspace(-180, 180, 37), np.array([250.0, 300, 350, 400]), np.array([0.0])
+    shape = (len(lat), len(lon), len(level), len(time_h))
+    return WindGrid(lat, lon, level, time_h, rng.normal(10, 20, shape), rng.normal(0, 20, shape), rng.normal(220, 5, shape))
+
+@pytest.mark.parametrize("with_grid", [False, True])
+def test_route_weather_matches_segment_weather(with_grid, monkeypatch):
+    grid = random_wind_grid() if with_grid else None
+    monkeypatch.setattr(lh, 'get_wind_grid', lambda: grid)
+    waypoints = ['KLAX', 'CYUL', 'EIDW', 'EGLL', 'LIRF', 'HECA']
+    weather = fixture_weather(waypoints)
+    tailwind_kts, temp_c = lh.route_weather(waypoints, weather)
+    assert tailwind_kts.shape == temp_c.shape == (len(waypoints) - 1, len(lh.FLIGHT_LEVELS))
+    for i, (from_wp, to_wp) in enumerate(zip(waypoints, waypoints[1:])):
+        wind, temp = lh.segment_weather(from_wp, to_wp, weather)
+        np.testing.assert_allclose(tailwind_kts[i], np.broadcast_to(wind, len(lh.FLIGHT_LEVELS)), rtol=1e-12)
+        np.testing.assert_allclose(temp_c[i], np.broadcast_to(temp, len(lh.FLIGHT_LEVELS)), rtol=1e-12)
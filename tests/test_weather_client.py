@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""The weather client against a local stub open-meteo server: retries, backoff, fallback, keep-alive."""
+import json
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import weather_client
+from weather_client import ConcurrentWeatherClient
+from weather_providers import OpenMeteoBatchProvider, DEFAULT_WEATHER
+
+RECORD = {'current_weather': {'temperature': -40.0, 'windspeed': 100.0}}
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each GET with the next scripted reply: a status code, or 'hang' to outlast the client timeout."""
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is observable.
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            reply = server.script.pop(0) if server.script else 200
+            server.requests.append(self.client_address)
+        if reply == 'hang':
+            threading.Event().wait(server.hang_s)
+            reply = 200
+        body = json.dumps(RECORD if reply == 200 else {'error': True}).encode()
+        self.send_response(reply)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.lock, server.script, server.requests, server.hang_s = threading.Lock(), [], [], 0.5
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff delays instead of sleeping; jitter is pinned to its upper bound."""
+    delays = []
+    monkeypatch.setattr(weather_client, 'time', types.SimpleNamespace(sleep=delays.append))
+    monkeypatch.setattr(weather_client, 'random', types.SimpleNamespace(uniform=lambda low, high: high))
+    return delays
+
+def make_client(server, **kwargs):
+    return ConcurrentWeatherClient(base_url=f"http://127.0.0.1:{server.server_port}/v1/forecast", max_workers=2, **kwargs)
+
+def test_retries_5xx_with_exponential_backoff_and_jitter(stub_server, sleeps):
+    stub_server.script = [503, 500, 200]
+    client = make_client(stub_server, retries=2, backoff_s=0.25)
+    assert client.get_json({'latitude': 1, 'longitude': 2}) == RECORD
+    assert len(stub_server.requests) == 3
+    assert sleeps == [0.25 * 1.5, 0.5 * 1.5]
+
+def test_jitter_spreads_backoff_between_half_and_one_and_a_half(stub_server, monkeypatch):
+    delays, bounds = [], []
+    monkeypatch.setattr(weather_client, 'time', types.SimpleNamespace(sleep=delays.append))
+    monkeypatch.setattr(weather_client, 'random', types.SimpleNamespace(uniform=lambda low, high: bounds.append((low, high)) or low))
+    stub_server.script = [502, 200]
+    make_client(stub_server, retries=1, backoff_s=0.2).get_json({})
+    assert bounds == [(0.5, 1.5)] and delays == [0.1]
+
+def test_retries_a_timed_out_request(stub_server, sleeps):
+    stub_server.script = ['hang', 200]
+    client = make_client(stub_server, retries=1, timeout_s=0.1, backoff_s=0.01)
+    assert client.get_json({}) == RECORD
+    assert len(stub_server.requests) == 2 and len(sleeps) == 1
+
+def test_raises_once_retries_are_exhausted(stub_server, sleeps):
+    stub_server.script = [503, 503, 503, 200]
+    client = make_client(stub_server, retries=2)
+    with pytest.raises(requests.HTTPError):
+        client.get_json({})
+    assert len(stub_server.requests) == 3 and len(sleeps) == 2
+
+def test_client_errors_are_not_retried(stub_server, sleeps):
+    stub_server.script = [404]
+    with pytest.raises(requests.HTTPError):
+        make_client(stub_server, retries=2).get_json({})
+    assert len(stub_server.requests) == 1 and sleeps == []
+
+def test_provider_falls_back_to_defaults_when_retries_are_exhausted(stub_server, sleeps, capsys):
+    stub_server.script = [500] * 3
+    provider = OpenMeteoBatchProvider(make_client(stub_server, retries=2))
+    weather = provider.get_weather({'KJFK': (40.64, -73.78), 'EGLL': (51.47, -0.45)})
+    assert weather == {'KJFK': DEFAULT_WEATHER, 'EGLL': DEFAULT_WEATHER}
+    assert "Using defaults" in capsys.readouterr().out
+
+def test_provider_parses_a_live_response(stub_server):
+    provider = OpenMeteoBatchProvider(make_client(stub_server))
+    assert provider.get_weather({'KJFK': (40.64, -73.78)}) == {'KJFK': {'temperature_c': -40.0, 'wind_speed_kts': 54.0}}
+
+def test_sequential_requests_reuse_one_connection(stub_server, sleeps):
+    stub_server.script = [200, 503, 200, 200]
+    client = make_client(stub_server, retries=1)
+    for _ in range(3):
+        client.get_json({})
+    ports = {port for _, port in stub_server.requests}
+    assert len(stub_server.requests) == 4 and len(ports) == 1
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Two-Tier Weather Cache.
+
+Weather lookups are keyed by a rounded lat/lon bucket and the forecast hour, so
+every flight that touches the same airport in the same hour shares one fetch.
+Entries live in an in-memory LRU tier backed by an on-disk SQLite tier, expire
+after a configurable TTL, and are served stale for a grace window while a
+background refresh runs (stale-while-revalidate).
+
+Configuration (environment variables):
+    WEATHER_CACHE_PATH      SQLite file for the disk tier (default: <tmp>/weather_cache.sqlite).
+    WEATHER_CACHE_TTL_S     Seconds an entry is fresh (default: 1800).
+    WEATHER_CACHE_STALE_S   Extra seconds a stale entry may be served while refreshing (default: 3600).
+    WEATHER_CACHE_BUCKET    Lat/lon bucket size in degrees (default: 0.25).
+    WEATHER_CACHE_SIZE      Maximum in-memory entries (default: 4096).
+"""
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict, Counter
+from instrumentation import count
+
+WEATHER_CACHE_PATH = os.getenv('WEATHER_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'weather_cache.sqlite'))
+WEATHER_CACHE_TTL_S = float(os.getenv('WEATHER_CACHE_TTL_S', '1800'))
+WEATHER_CACHE_STALE_S = float(os.getenv('WEATHER_CACHE_STALE_S', '3600'))
+WEATHER_CACHE_BUCKET = float(os.getenv('WEATHER_CACHE_BUCKET', '0.25'))
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', '4096'))
+
+class WeatherCache:
+    """Memory LRU + SQLite cache for weather payloads, with hit/miss counters."""
+
+    def __init__(self, path=WEATHER_CACHE_PATH, ttl_s=WEATHER_CACHE_TTL_S, stale_s=WEATHER_CACHE_STALE_S,
+                 bucket_deg=WEATHER_CACHE_BUCKET, max_entries=WEATHER_CACHE_SIZE, clock=time.time):
+        self.ttl_s, self.stale_s, self.bucket_deg, self.max_entries = ttl_s, stale_s, bucket_deg, max_entries
+        self.clock = clock
+        self.counters = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS weather (kind TEXT, lat REAL, lon REAL, hour INTEGER, "
+                                 "payload TEXT, fetched_at REAL, PRIMARY KEY (kind, lat, lon, hour))")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Weather disk cache disabled ({path}). Error: {e}")
+                self._db = None
+
+    def key(self, lat, lon, hour=None, kind='current'):
+        """Cache key: (kind, lat bucket, lon bucket, forecast hour since the epoch)."""
+        hour = int(self.clock() // 3600) if hour is None else int(hour)
+        snap = lambda x: round(round(x / self.bucket_deg) * self.bucket_deg, 6)
+        return (kind, snap(lat), snap(lon), hour)
+
+    def get_or_fetch(self, lat, lon, fetch, hour=None, kind='current'):
+        """
+        Returns the cached payload for the bucket, calling `fetch()` on a miss. Stale
+        entries inside the grace window are returned immediately and refreshed in the
+        background. Exceptions from `fetch()` on a miss propagate to the caller.
+        """
+        key = self.key(lat, lon, hour, kind)
+        cached = self.peek(key)
+        if cached is not None:
+            payload, is_fresh = cached
+            if not is_fresh:
+                self.refresh_in_background(key, fetch)
+            return payload
+        payload = fetch()
+        self.put(key, payload)
+        return dict(payload)
+
+    def peek(self, key):
+        """
+        Returns (payload, is_fresh) for a key without fetching, or None on a miss or when
+        the entry is past its grace window. Counts the lookup like get_or_fetch does.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            payload, fetched_at = entry
+            age = self.clock() - fetched_at
+            if age <= self.ttl_s:
+                self.counters['hits'] += 1
+                count('weather_cache.hits')
+                return dict(payload), True
+            if age <= self.ttl_s + self.stale_s:
+                self.counters['stale_hits'] += 1
+                count('weather_cache.stale_hits')
+                return dict(payload), False
+        self.counters['misses'] += 1
+        count('weather_cache.misses')
+        return None
+
+    def put(self, key, payload, fetched_at=None):
+        fetched_at = self.clock() if fetched_at is None else fetched_at
+        with self._lock:
+            self._remember(key, (dict(payload), fetched_at))
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO weather VALUES (?, ?, ?, ?, ?, ?)", (*key, json.dumps(payload), fetched_at))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not write weather cache entry. Error: {e}")
+
+    def stats(self):
+        """Counter snapshot plus the overall hit rate."""
+        counts = dict(self.counters)
+        lookups = counts.get('hits', 0) + counts.get('stale_hits', 0) + counts.get('misses', 0)
+        counts['hit_rate'] = round((lookups - counts.get('misses', 0)) / lookups, 4) if lookups else 0.0
+        return counts
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT payload, fetched_at FROM weather WHERE kind=? AND lat=? AND lon=? AND hour=?", key).fetchone()
+            if row is None:
+                return None
+            self.counters['disk_hits'] += 1
+            entry = (json.loads(row[0]), row[1])
+            self._remember(key, entry)
+            return entry
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def refresh_in_background(self, key, fetch):
+        """Re-fetches a key on a daemon thread unless a refresh for it is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(key, fetch())
+                self.counters['refreshes'] += 1
+            except Exception as e:
+                self.counters['refresh_errors'] += 1
+                print(f"Warning: Background weather refresh failed for {key}. Error: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent Weather HTTP Client.
+
+Issues all weather requests for a route at once over a single pooled
+`requests.Session`, with a per-host concurrency limit and retries with
+exponential backoff and jitter. The API is synchronous, so the `@tool`
+functions keep their signatures; the concurrency lives in a thread pool.
+`requests` is imported when the session is first needed, not at module import.
+
+Configuration (environment variables):
+    OPEN_METEO_URL          Forecast endpoint (point at a local stub server for tests).
+    WEATHER_MAX_WORKERS     Thread pool / connection pool size (default: 16).
+    WEATHER_PER_HOST_LIMIT  Concurrent requests allowed per host (default: 8).
+    WEATHER_RETRIES         Retries after the first attempt (default: 2).
+    WEATHER_TIMEOUT_S       Per-request timeout in seconds (default: 10).
+"""
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+OPEN_METEO_URL = os.getenv('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast')
+WEATHER_MAX_WORKERS = int(os.getenv('WEATHER_MAX_WORKERS', '16'))
+WEATHER_PER_HOST_LIMIT = int(os.getenv('WEATHER_PER_HOST_LIMIT', '8'))
+WEATHER_RETRIES = int(os.getenv('WEATHER_RETRIES', '2'))
+WEATHER_TIMEOUT_S = float(os.getenv('WEATHER_TIMEOUT_S', '10'))
+
+def _is_retryable(error):
+    import requests
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+class ConcurrentWeatherClient:
+    """Pooled HTTP client that fans weather requests out over a thread pool."""
+
+    def __init__(self, base_url=OPEN_METEO_URL, max_workers=WEATHER_MAX_WORKERS, per_host_limit=WEATHER_PER_HOST_LIMIT,
+                 retries=WEATHER_RETRIES, timeout_s=WEATHER_TIMEOUT_S, backoff_s=0.25):
+        self.base_url, self.retries, self.timeout_s, self.backoff_s = base_url, retries, timeout_s, backoff_s
+        self.per_host_limit = per_host_limit
+        self.max_workers, self._session = max_workers, None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather')
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The pooled `requests.Session`, created on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    def get_json(self, params, url=None):
+        """GETs `url` (default: the forecast endpoint) with retries; raises requests.RequestException on failure."""
+        import requests
+        url = url or self.base_url
+        for attempt in range(self.retries + 1):
+            try:
+                with self._host_limit(url):
+                    response = self.session.get(url, params=params, timeout=self.timeout_s)
+                    response.raise_for_status()
+                    return response.json()
+            except requests.RequestException as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    raise
+                time.sleep(self.backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def submit(self, task):
+        """Schedules a zero-argument callable on the pool without waiting for it."""
+        return self._executor.submit(task)
+
+    def run_all(self, tasks):
+        """
+        Runs every zero-argument callable in `tasks` ({key: callable}) concurrently and
+        returns {key: result}. A task that raised maps to its exception instead.
+        """
+        futures = {key: self._executor.submit(task) for key, task in tasks.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+        return results
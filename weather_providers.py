@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Pluggable Weather Providers.
+
+A `WeatherProvider` turns a mapping of location keys (usually waypoint names) to
+(lat, lon) into weather records of the form
+`{'temperature_c': float, 'wind_speed_kts': float}`.
+
+- `OpenMeteoBatchProvider` de-duplicates locations by cache bucket, serves what it
+  can from the `WeatherCache`, and fetches the rest with multi-location open-meteo
+  requests (comma-separated latitude/longitude lists), chunked and sent concurrently.
+- `FixtureWeatherProvider` answers from a local JSON file or dict, for tests and
+  offline runs. Set WEATHER_FIXTURE_PATH to make it the default provider.
+
+Configuration (environment variables):
+    WEATHER_FIXTURE_PATH  JSON fixture ({waypoint: record}) to use instead of the live API.
+    WEATHER_BATCH_SIZE    Locations per open-meteo request (default: 50).
+"""
+import os
+import json
+from abc import ABC, abstractmethod
+
+WEATHER_FIXTURE_PATH = os.getenv('WEATHER_FIXTURE_PATH')
+WEATHER_BATCH_SIZE = int(os.getenv('WEATHER_BATCH_SIZE', '50'))
+DEFAULT_WEATHER = {'temperature_c': 15, 'wind_speed_kts': 0}
+
+class WeatherProvider(ABC):
+    """Interface for weather sources used by `get_weather_for_route`."""
+
+    @abstractmethod
+    def get_weather(self, locations):
+        """Maps {key: (lat, lon)} to {key: weather record}. Must return a record for every key."""
+
+class FixtureWeatherProvider(WeatherProvider):
+    """Serves weather from a fixed {key: record} mapping; unknown keys get `default`."""
+
+    def __init__(self, records=None, path=None, default=DEFAULT_WEATHER):
+        if path:
+            with open(path) as f:
+                records = json.load(f)
+        self.records = dict(records or {})
+        self.default = dict(default)
+
+    def get_weather(self, locations):
+        return {key: dict(self.records.get(key, self.default)) for key in locations}
+
+def _parse_current_weather(item):
+    data = item.get('current_weather', {})
+    return {'temperature_c': data.get('temperature'), 'wind_speed_kts': data.get('windspeed') * 0.54}
+
+class OpenMeteoBatchProvider(WeatherProvider):
+    """Live open-meteo provider using cached, chunked multi-location requests."""
+
+    def __init__(self, client, cache=None, batch_size=WEATHER_BATCH_SIZE):
+        self.client, self.cache, self.batch_size = client, cache, batch_size
+
+    def fetch_points(self, points):
+        """One multi-location request for a list of (lat, lon); returns records in the same order."""
+        params = {'latitude': ','.join(str(lat) for lat, _ in points),
+                  'longitude': ','.join(str(lon) for _, lon in points),
+                  'current_weather': 'true'}
+        data = self.client.get_json(params)
+        items = data if isinstance(data, list) else [data]
+        if len(items) != len(points):
+            raise ValueError(f"open-meteo returned {len(items)} results for {len(points)} locations")
+        return [_parse_current_weather(item) for item in items]
+
+    def get_weather(self, locations):
+        buckets = {}
+        for key, (lat, lon) in locations.items():
+            bucket = self.cache.key(lat, lon) if self.cache else (lat, lon)
+            buckets.setdefault(bucket, {'point': (lat, lon), 'keys': []})['keys'].append(key)
+
+        resolved, missing = {}, []
+        for bucket, entry in buckets.items():
+            cached = self.cache.peek(bucket) if self.cache else None
+            if cached is None:
+                missing.append(bucket)
+                continue
+            resolved[bucket], is_fresh = cached
+            if not is_fresh:
+                point = entry['point']
+                self.cache.refresh_in_background(bucket, lambda point=point: self.fetch_points([point])[0])
+
+        chunks = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        tasks = {i: (lambda chunk=chunk: self.fetch_points([buckets[b]['point'] for b in chunk])) for i, chunk in enumerate(chunks)}
+        for i, result in self.client.run_all(tasks).items():
+            if isinstance(result, Exception):
+                print(f"Warning: Could not fetch weather for {len(chunks[i])} location(s). Using defaults. Error: {result}")
+                result = [dict(DEFAULT_WEATHER)] * len(chunks[i])
+            else:
+                for bucket, record in zip(chunks[i], result):
+                    if self.cache: self.cache.put(bucket, record)
+            resolved.update(zip(chunks[i], result))
+
+        return {key: dict(resolved[bucket]) for bucket, entry in buckets.items() for key in entry['keys']}
+
+def default_weather_provider(client, cache=None):
+    """The fixture provider when WEATHER_FIXTURE_PATH is set, otherwise live open-meteo."""
+    if WEATHER_FIXTURE_PATH:
+        return FixtureWeatherProvider(path=WEATHER_FIXTURE_PATH)
+    return OpenMeteoBatchProvider(client, cache)
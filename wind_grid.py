@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Altitude-Resolved Wind and Temperature Grids.
+
+Surface readings say little about conditions at FL290-FL390. This module holds
+u/v wind components and temperature on flight levels as compact float32 NumPy
+arrays shaped (lat x lon x level x time), and interpolates them in one
+vectorized call so segment costs can use the headwind/tailwind component along
+each segment's bearing.
+
+Grids load from:
+    - `.npz` files with arrays lat, lon, level (flight levels, or pressure in hPa
+      with `level_units='hPa'`), time (hours since the epoch), u, v (m/s) and t (K);
+    - NetCDF/GRIB files (ERA5/GFS style variables u, v, t on pressure levels)
+      through xarray, which is an optional dependency (plus cfgrib for GRIB).
+
+Configuration (environment variables):
+    WIND_GRID_PATH  Grid file to load on first use; without it, surface weather is used.
+"""
+import os
+import time
+import itertools
+import functools
+import numpy as np
+
+WIND_GRID_PATH = os.getenv('WIND_GRID_PATH')
+MS_TO_KTS = 1.943844
+
+def pressure_to_flight_level(pressure_hpa):
+    """ISA pressure altitude in flight levels (hundreds of feet) for pressures in hPa."""
+    p = np.asarray(pressure_hpa, dtype=float)
+    troposphere_m = 44330.77 * (1 - (p / 1013.25) ** 0.190263)
+    stratosphere_m = 11000 + 6341.62 * np.log(226.32 / p)
+    return np.where(p >= 226.32, troposphere_m, stratosphere_m) / 0.3048 / 100
+
+def along_track_wind(u, v, bearing_deg):
+    """Wind component along a track (positive = tailwind), in the units of u/v."""
+    bearing = np.radians(bearing_deg)
+    return u * np.sin(bearing) + v * np.cos(bearing)
+
+class WindGrid:
+    """u/v (m/s) and temperature (K) on a regular lat x lon x flight level x time grid."""
+
+    def __init__(self, lat, lon, level, time_h, u, v, t):
+        order = [np.argsort(axis) for axis in (lat, lon, level, time_h)]
+        self.axes = tuple(np.asarray(axis, dtype=float)[o] for axis, o in zip((lat, lon, level, time_h), order))
+        index = np.ix_(*order)
+        self.u, self.v, self.t = (np.asarray(field, dtype=np.float32)[index] for field in (u, v, t))
+        self.max_wind_kts = float(np.sqrt(self.u.astype(float) ** 2 + self.v.astype(float) ** 2).max() * MS_TO_KTS)
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith('.npz'):
+            with np.load(path, allow_pickle=False) as data:
+                level = data['level']
+                if 'level_units' in data and str(data['level_units']) == 'hPa':
+                    level = pressure_to_flight_level(level)
+                return cls(data['lat'], data['lon'], level, data['time'], data['u'], data['v'], data['t'])
+        try:
+            import xarray as xr
+        except ImportError as e:
+            raise ImportError("Loading NetCDF/GRIB wind grids requires `xarray` (and `cfgrib` for GRIB).") from e
+        engine = 'cfgrib' if path.endswith(('.grib', '.grib2', '.grb')) else None
+        with xr.open_dataset(path, engine=engine) as ds:
+            lat_name = 'latitude' if 'latitude' in ds.dims else 'lat'
+            lon_name = 'longitude' if 'longitude' in ds.dims else 'lon'
+            level_name = next(name for name in ('isobaricInhPa', 'level', 'pressure_level') if name in ds.dims)
+            time_name = next((name for name in ('time', 'valid_time') if name in ds.dims), None)
+            if time_name is None:
+                ds = ds.expand_dims(time=[np.datetime64(int(time.time()), 's')])
+                time_name = 'time'
+            dims = (lat_name, lon_name, level_name, time_name)
+            hours = ds[time_name].values.astype('datetime64[s]').astype(float) / 3600
+            fields = [ds[name].transpose(*dims).values for name in ('u', 'v', 't')]
+            return cls(ds[lat_name].values, ds[lon_name].values, pressure_to_flight_level(ds[level_name].values), hours, *fields)
+
+    def save(self, path):
+        lat, lon, level, time_h = self.axes
+        np.savez_compressed(path, lat=lat, lon=lon, level=level, time=time_h, u=self.u, v=self.v, t=self.t)
+
+    def interpolate(self, lat, lon, flight_level, time_h=None):
+        """
+        Returns (u_ms, v_ms, temperature_c) at the given points; arguments broadcast.
+        Queries outside the grid are clamped to its edges.
+        """
+        time_h = time.time() / 3600 if time_h is None else time_h
+        if self.axes[1][-1] > 180:
+            lon = np.mod(lon, 360)  # Grids on 0..360 longitudes (ERA5, GFS).
+        points = [np.asarray(p, dtype=float) for p in np.broadcast_arrays(lat, lon, flight_level, time_h)]
+        indices, fractions = [], []
+        for axis, x in zip(self.axes, points):
+            if len(axis) == 1:
+                indices.append(np.zeros(x.shape, dtype=np.intp))
+                fractions.append(np.zeros(x.shape))
+                continue
+            x = np.clip(x, axis[0], axis[-1])
+            i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            indices.append(i)
+            fractions.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+        u, v, t = (np.zeros(points[0].shape) for _ in range(3))
+        for corner in itertools.product((0, 1), repeat=4):
+            weight = np.ones(points[0].shape)
+            for bit, f in zip(corner, fractions):
+                weight = weight * (f if bit else 1 - f)
+            index = tuple(np.minimum(i + bit, len(axis) - 1) for i, bit, axis in zip(indices, corner, self.axes))
+            u += weight * self.u[index]
+            v += weight * self.v[index]
+            t += weight * self.t[index]
+        return u, v, t - 273.15
+
+    def along_track(self, lat, lon, bearing_deg, flight_levels, time_h=None):
+        """Tailwind component (kts) and temperature (C) for each flight level at one track point."""
+        u, v, temp_c = self.interpolate(lat, lon, np.asarray(flight_levels, dtype=float), time_h)
+        return along_track_wind(u, v, bearing_deg) * MS_TO_KTS, temp_c
+
+@functools.lru_cache(maxsize=None)
+def get_wind_grid(path=None):
+    """The process-wide grid from WIND_GRID_PATH (or `path`), loaded on first use; None if unset."""
+    path = path or WIND_GRID_PATH
+    if not path:
+        return None
+    return WindGrid.load(path)